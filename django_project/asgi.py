@@ -5,3 +5,10 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
 
 application = get_asgi_application()
+
+# Compilar las reglas al arrancar el worker en lugar de en la primera petición
+from django.conf import settings  # noqa: E402
+
+if settings.PRECALENTAR_MOTOR:
+    from recommender.almacen_reglas import precalentar  # noqa: E402
+    precalentar()
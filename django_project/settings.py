@@ -18,6 +18,9 @@ DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
+# Identifica el despliegue en los ETag: un cambio de plantillas invalida las páginas en caché
+VERSION_DESPLIEGUE = os.environ.get('RENDER_GIT_COMMIT', '')
+
 CSRF_TRUSTED_ORIGINS = os.environ.get(
     'CSRF_TRUSTED_ORIGINS',
     'http://localhost:8000,http://127.0.0.1:8000'
@@ -44,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'recommender.almacen_reglas.RecargaReglasMiddleware',
 ]
 
 ROOT_URLCONF = 'django_project.urls'
@@ -189,6 +193,19 @@ LOGGING = {
         },
     },
 }
+# Construir el motor lógico al arrancar cada worker (por defecto, en la primera petición)
+PRECALENTAR_MOTOR = os.environ.get('PRECALENTAR_MOTOR', 'False') == 'True'
+
+# Memorizar también el HTML de la página de resultado del formulario anónimo
+CACHE_FRAGMENTO_RESULTADO = os.environ.get('CACHE_FRAGMENTO_RESULTADO', 'True') == 'True'
+
+# Instrumentación del motor lógico (ver recommender/instrumentacion.py)
+INSTRUMENTACION_REGLAS = {
+    'ACTIVA': os.environ.get('INSTRUMENTAR_REGLAS', 'False') == 'True',
+    'SUMIDERO': os.environ.get('SUMIDERO_INSTRUMENTACION', 'recommender.instrumentacion.SumideroLog'),
+    'INTERVALO_SEGUNDOS': int(os.environ.get('INTERVALO_INSTRUMENTACION', '60')),
+}
+
 LOGIN_URL = 'recommender:login'
 LOGIN_REDIRECT_URL = 'recommender:dashboard'
 LOGOUT_REDIRECT_URL = 'recommender:index'
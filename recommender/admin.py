@@ -5,7 +5,8 @@ from .models import (
     PerfilMedico,
     Rutina,
     RecomendacionMedica,
-    SeguimientoUsuario
+    SeguimientoUsuario,
+    ConjuntoReglas
 )
 
 
@@ -133,3 +134,34 @@ class SeguimientoUsuarioAdmin(admin.ModelAdmin):
             'fields': ('rutina_realizada', 'satisfaccion', 'comentarios')
         }),
     )
+
+
+@admin.register(ConjuntoReglas)
+class ConjuntoReglasAdmin(admin.ModelAdmin):
+    """Admin para ConjuntoReglas."""
+    list_display = ('version', 'activo', 'descripcion', 'fecha_creacion')
+    list_filter = ('activo', 'fecha_creacion')
+    search_fields = ('descripcion',)
+    readonly_fields = ('fecha_creacion',)
+    
+    fieldsets = (
+        ('Versión', {
+            'fields': ('version', 'activo', 'descripcion')
+        }),
+        ('Reglas', {
+            'fields': ('parametros',)
+        }),
+        ('Metadata', {
+            'fields': ('fecha_creacion',)
+        }),
+    )
+    
+    def get_readonly_fields(self, request, obj=None):
+        """
+        Una versión guardada no cambia: los motores se cachean por versión,
+        así que unas reglas nuevas van en un conjunto nuevo.
+        """
+        campos = super().get_readonly_fields(request, obj)
+        if obj is not None:
+            campos = (*campos, 'version', 'parametros')
+        return campos
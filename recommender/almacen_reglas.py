@@ -0,0 +1,122 @@
+"""
+Almacén de conjuntos de reglas versionados.
+
+La versión vigente es el `ConjuntoReglas` activo con mayor número de versión
+(0 si no hay ninguno: reglas por defecto). Cada versión se compila una sola vez
+por worker y se guarda en caché; el cambio de versión se aplica de forma
+atómica reemplazando la referencia al motor vigente, de modo que las
+peticiones en curso terminan con el motor con el que empezaron.
+
+`sincronizar()` se llama al inicio de cada petición (ver
+`RecargaReglasMiddleware`); `obtener_motor()` devuelve el motor vigente sin
+consultar la base de datos.
+
+Nada se compila al importar: el primer motor se construye en la primera
+petición o en `precalentar()`, que el servidor WSGI llama al arrancar si
+PRECALENTAR_MOTOR está activo.
+"""
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from django.db import DatabaseError
+
+from .prolog_engine import MotorProlog, obtener_motor_por_defecto
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_motores: Dict[int, MotorProlog] = {}
+_versiones_invalidas = set()
+_vigente: Optional[Tuple[int, MotorProlog]] = None
+
+
+def _leer_version_activa() -> Tuple[int, Dict]:
+    """Lee de la base de datos la versión activa y sus parámetros."""
+    from .models import ConjuntoReglas
+
+    try:
+        fila = (
+            ConjuntoReglas.objects.filter(activo=True)
+            .order_by('-version')
+            .values_list('version', 'parametros')
+            .first()
+        )
+    except DatabaseError as e:
+        # Tabla aún sin migrar (build, tests): usar las reglas por defecto
+        logger.warning(f"No se pudo leer el conjunto de reglas activo: {e}")
+        return 0, {}
+    return fila if fila else (0, {})
+
+
+def _compilar(version: int, parametros: Dict) -> MotorProlog:
+    """Devuelve el motor compilado de una versión, compilándolo si hace falta."""
+    motor = _motores.get(version)
+    if motor is None:
+        if version == 0:
+            motor = obtener_motor_por_defecto()
+        else:
+            motor = MotorProlog(parametros, version=version)
+            logger.info(f"Reglas v{version} compiladas.")
+        _motores[version] = motor
+    return motor
+
+
+def sincronizar() -> MotorProlog:
+    """
+    Comprueba la versión activa y, si cambió, cambia al motor de esa versión.
+
+    Returns:
+        Motor vigente tras la comprobación
+    """
+    global _vigente
+    version, parametros = _leer_version_activa()
+    vigente = _vigente
+    if vigente is not None and (vigente[0] == version or version in _versiones_invalidas):
+        return vigente[1]
+
+    with _lock:
+        if _vigente is None or _vigente[0] != version:
+            try:
+                motor = _compilar(version, parametros)
+            except ValueError as e:
+                # Parámetros inválidos: seguir con el motor vigente
+                logger.error(f"Conjunto de reglas v{version} inválido: {e}")
+                _versiones_invalidas.add(version)
+                if _vigente is not None:
+                    return _vigente[1]
+                motor = _compilar(0, {})
+                version = 0
+            _vigente = (version, motor)
+        return _vigente[1]
+
+
+def obtener_motor() -> MotorProlog:
+    """Devuelve el motor vigente; sincroniza si aún no hay ninguno."""
+    vigente = _vigente
+    if vigente is None:
+        return sincronizar()
+    return vigente[1]
+
+
+def precalentar() -> MotorProlog:
+    """Construye el motor vigente por adelantado (hook de arranque del worker)."""
+    motor = sincronizar()
+    logger.info(f"Motor lógico precalentado (reglas v{motor.version}).")
+    return motor
+
+
+def version_vigente() -> int:
+    """Versión del conjunto de reglas del motor vigente."""
+    return obtener_motor().version
+
+
+class RecargaReglasMiddleware:
+    """Aplica la versión de reglas activa al inicio de cada petición."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sincronizar()
+        return self.get_response(request)
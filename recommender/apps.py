@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class RecommenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recommender'
+
+    def ready(self):
+        from django.conf import settings
+
+        from . import catalogo  # noqa: F401  (señales de versión del catálogo)
+        from . import progreso  # noqa: F401  (señales del resumen de progreso)
+        from . import versiones  # noqa: F401  (señales de versión por usuario)
+        from . import instrumentacion
+        instrumentacion.configurar(getattr(settings, 'INSTRUMENTACION_REGLAS', None))
@@ -0,0 +1,209 @@
+"""
+Instantáneas versionadas del catálogo de rutinas e índices derivados.
+
+Cada alta, cambio o baja de una `Rutina` incrementa `VersionCatalogo` en la
+misma transacción (señales de abajo). Cada worker guarda una
+`InstantaneaCatalogo` de las rutinas activas por versión; todo lo que se
+deriva del catálogo (diccionarios de rutinas, índices de seguridad y de
+facetas, máscaras de contraindicaciones) se calcula una vez por instantánea.
+
+Índice de seguridad: las reglas de seguridad solo dependen del usuario a
+través de tres condiciones booleanas (edad avanzada, obesidad, principiante),
+es decir, de la región de (edad, IMC, nivel) en la que cae. Por cada una de
+las 8 regiones se precalcula un bitset con las rutinas elegibles, así que
+filtrar por seguridad es una consulta y un AND de enteros, sin evaluar
+reglas por rutina.
+
+Los cambios hechos con `QuerySet.update()` o `bulk_create()` no disparan las
+señales: después de usarlos hay que llamar a `incrementar_version_catalogo()`.
+"""
+import re
+import threading
+from itertools import product
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import instrumentacion
+from .ejercicios import plan_de
+from .models import Rutina, VersionCatalogo
+from .nucleo_reglas import CondicionesUsuario, NucleoSeguridad
+
+
+def version_catalogo() -> Tuple[int, Any]:
+    """
+    Versión vigente del catálogo.
+
+    Returns:
+        Tupla (version, fecha_actualizacion); (0, None) si aún no existe la fila
+    """
+    fila = VersionCatalogo.objects.filter(pk=1).values_list('version', 'fecha_actualizacion').first()
+    return fila if fila else (0, None)
+
+
+def incrementar_version_catalogo() -> None:
+    """Marca el catálogo como modificado (en la transacción en curso)."""
+    actualizadas = VersionCatalogo.objects.filter(pk=1).update(
+        version=F('version') + 1,
+        fecha_actualizacion=timezone.now()
+    )
+    if not actualizadas:
+        VersionCatalogo.objects.get_or_create(pk=1)
+
+
+def minutos_de_duracion(duracion: str) -> int:
+    """Minutos de un texto de duración ('45 minutos' -> 45; 0 si no hay número)."""
+    numero = re.search(r'\d+', duracion or '')
+    return int(numero.group()) if numero else 0
+
+
+@receiver(pre_save, sender=Rutina)
+def _materializar_campos(sender, instance, **kwargs):
+    # El plan y los minutos se materializan al escribir el catálogo; las vistas solo los leen
+    instance.plan_semanal = plan_de(instance)
+    if not instance.duracion_minutos:
+        instance.duracion_minutos = minutos_de_duracion(instance.duracion)
+
+
+@receiver(post_save, sender=Rutina)
+@receiver(post_delete, sender=Rutina)
+def _rutina_modificada(sender, **kwargs):
+    incrementar_version_catalogo()
+
+
+def rutina_a_dict(rutina: Rutina) -> Dict:
+    """Convierte una rutina a diccionario para las funciones puras y el motor lógico."""
+    return {
+        'id': rutina.id,
+        'nombre': rutina.nombre,
+        'nivel': rutina.nivel,
+        'objetivo': rutina.objetivo,
+        'intensidad': rutina.intensidad,
+        'dias_semana': rutina.dias_semana,
+        'duracion': rutina.duracion,
+        'duracion_minutos': rutina.duracion_minutos,
+        'calorias_estimadas': rutina.calorias_estimadas,
+        'restricciones_medicas': rutina.restricciones_medicas,
+        'condiciones_contraindicadas': rutina.condiciones_contraindicadas or [],
+    }
+
+
+def posiciones(bits: int) -> List[int]:
+    """Posiciones de los bits activos, de menor a mayor."""
+    resultado = []
+    while bits:
+        bajo = bits & -bits
+        resultado.append(bajo.bit_length() - 1)
+        bits ^= bajo
+    return resultado
+
+
+class IndiceSeguridad:
+    """
+    Rutinas elegibles por región de condiciones de usuario, como bitsets.
+
+    El bit i corresponde a la rutina i de la instantánea.
+    """
+
+    def __init__(self, nucleo: NucleoSeguridad, rutinas: Iterable[Dict]):
+        rutinas = list(rutinas)
+        self._regiones: Dict[CondicionesUsuario, Tuple[int, Tuple[str, ...]]] = {}
+        for combinacion in product((False, True), repeat=3):
+            condiciones = CondicionesUsuario(*combinacion)
+            # Precalcular no es un disparo de reglas por un usuario
+            with instrumentacion.suspendida():
+                mascara, razones = nucleo.evaluar_lote(condiciones, rutinas)
+            bits = sum(1 << i for i, segura in enumerate(mascara) if segura)
+            self._regiones[condiciones] = (bits, tuple(razones))
+
+    def elegibles(self, condiciones: CondicionesUsuario) -> int:
+        """Bitset de rutinas seguras para las condiciones."""
+        return self._regiones[condiciones][0]
+
+    def razones(self, condiciones: CondicionesUsuario) -> Tuple[str, ...]:
+        """Código de razón de cada rutina para las condiciones."""
+        return self._regiones[condiciones][1]
+
+
+class InstantaneaCatalogo:
+    """
+    Rutinas activas de una versión del catálogo y sus índices.
+
+    Es de solo lectura y se comparte entre peticiones e hilos.
+    """
+
+    def __init__(self, clave: Tuple, rutinas: Iterable[Rutina]):
+        self.clave = clave
+        self.version = clave[0]
+        self.rutinas: Tuple[Rutina, ...] = tuple(rutinas)
+        self.dicts: Tuple[Dict, ...] = tuple(rutina_a_dict(r) for r in self.rutinas)
+        self.posicion = {r.id: i for i, r in enumerate(self.rutinas)}
+        self.todas = (1 << len(self.rutinas)) - 1
+
+        # Bitset de rutinas que contraindican cada condición de salud
+        self._contraindicadas: Dict[str, int] = {}
+        for i, datos in enumerate(self.dicts):
+            for condicion in datos['condiciones_contraindicadas']:
+                self._contraindicadas[condicion] = self._contraindicadas.get(condicion, 0) | (1 << i)
+
+        self._indices: Dict[Tuple, IndiceSeguridad] = {}
+        self._facetas = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rutinas)
+
+    def indice_seguridad(self, nucleo: NucleoSeguridad) -> IndiceSeguridad:
+        """Índice de seguridad de la instantánea para un núcleo de reglas."""
+        indice = self._indices.get(nucleo.clave)
+        if indice is None:
+            with self._lock:
+                indice = self._indices.get(nucleo.clave)
+                if indice is None:
+                    indice = IndiceSeguridad(nucleo, self.dicts)
+                    self._indices[nucleo.clave] = indice
+        return indice
+
+    def indice_facetas(self):
+        """Índice de facetas y rangos de la instantánea (ver facetas.IndiceFacetas)."""
+        if self._facetas is None:
+            from .facetas import IndiceFacetas
+            with self._lock:
+                if self._facetas is None:
+                    self._facetas = IndiceFacetas(self.dicts)
+        return self._facetas
+
+    def permitidas(self, condiciones_salud: Optional[Iterable[str]]) -> int:
+        """Bitset de rutinas no contraindicadas por ninguna condición de salud."""
+        bloqueadas = 0
+        for condicion in condiciones_salud or ():
+            bloqueadas |= self._contraindicadas.get(condicion, 0)
+        return self.todas & ~bloqueadas
+
+    def seleccionar(self, bits: int) -> List[Rutina]:
+        """Rutinas del bitset, en el orden del catálogo."""
+        return [self.rutinas[i] for i in posiciones(bits)]
+
+
+_lock = threading.Lock()
+_instantanea: Optional[InstantaneaCatalogo] = None
+
+
+def obtener_instantanea() -> InstantaneaCatalogo:
+    """
+    Instantánea de las rutinas activas de la versión vigente del catálogo.
+
+    Cuesta una consulta (la versión) mientras el catálogo no cambie.
+    """
+    global _instantanea
+    clave = version_catalogo()
+    instantanea = _instantanea
+    if instantanea is not None and instantanea.clave == clave:
+        return instantanea
+    with _lock:
+        if _instantanea is None or _instantanea.clave != clave:
+            _instantanea = InstantaneaCatalogo(clave, Rutina.objects.filter(activa=True))
+        return _instantanea
@@ -0,0 +1,174 @@
+"""
+Versiones vectorizadas (NumPy) de las reglas de `processor` y `logic_rules`.
+
+Para exportaciones analíticas, recomendación nocturna por lotes y análisis de
+impacto de reglas sobre cohortes enteras: cada función recibe arrays (edades,
+pesos, alturas, días) y devuelve arrays, sin un bucle de Python por usuario.
+
+Las categorías se codifican como enteros pequeños, índices en las tuplas
+CLASIFICACIONES_IMC, NIVELES, OBJETIVOS e INTENSIDADES (ver `codificar` y
+`decodificar`). Cada función devuelve exactamente lo mismo que su versión
+escalar aplicada elemento a elemento; las pruebas lo comprueban.
+
+NumPy es opcional: este módulo no se importa en las peticiones web y, si
+NumPy no está instalado, sus funciones lanzan ImportError.
+"""
+from typing import Dict, Optional, Sequence
+
+from .parametros_reglas import PARAMETROS_POR_DEFECTO
+from .reglas_compiladas import CLASIFICACIONES_IMC, NIVELES, OBJETIVOS
+
+try:
+    import numpy as np
+    NUMPY_DISPONIBLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    np = None
+    NUMPY_DISPONIBLE = False
+
+INTENSIDADES = ('baja', 'media', 'alta')
+
+# Límites de clasificar_imc (fijos, no son parámetros de las reglas)
+LIMITES_IMC = (18.5, 25, 30)
+
+BAJO_PESO, NORMAL, SOBREPESO, OBESIDAD = range(len(CLASIFICACIONES_IMC))
+PRINCIPIANTE, INTERMEDIO, AVANZADO = range(len(NIVELES))
+BAJA, MEDIA, ALTA = range(len(INTENSIDADES))
+OBJETIVO_PESO = OBJETIVOS.index('peso')
+OBJETIVO_MUSCULACION = OBJETIVOS.index('musculacion')
+
+
+def _requerir_numpy():
+    if not NUMPY_DISPONIBLE:
+        raise ImportError('Las funciones de cohortes necesitan NumPy (pip install numpy)')
+
+
+def codificar(valores: Sequence[str], categorias: Sequence[str]):
+    """
+    Convierte etiquetas en códigos.
+
+    Args:
+        valores: Etiquetas (p. ej. niveles de los usuarios)
+        categorias: Tupla de categorías (p. ej. NIVELES)
+
+    Returns:
+        Array de uint8 con el índice de cada etiqueta; len(categorias) para
+        las desconocidas
+    """
+    _requerir_numpy()
+    indices = {categoria: i for i, categoria in enumerate(categorias)}
+    desconocida = len(categorias)
+    return np.fromiter(
+        (indices.get(valor, desconocida) for valor in valores), dtype=np.uint8, count=len(valores)
+    )
+
+
+def decodificar(codigos, categorias: Sequence[str]):
+    """Convierte códigos en etiquetas (array de objetos); None para los desconocidos."""
+    _requerir_numpy()
+    tabla = np.array(list(categorias) + [None], dtype=object)
+    return tabla[np.asarray(codigos)]
+
+
+def calcular_imc(pesos, alturas):
+    """
+    IMC de cada usuario (processor.calcular_imc).
+
+    Args:
+        pesos: Pesos en kilogramos
+        alturas: Alturas en metros
+
+    Returns:
+        Array de float64
+    """
+    _requerir_numpy()
+    # float_power usa pow() de libm como `altura ** 2` en Python; `alturas ** 2`
+    # multiplicaría y a veces difiere en el último bit
+    return np.asarray(pesos, dtype=np.float64) / np.float_power(np.asarray(alturas, dtype=np.float64), 2)
+
+
+def clasificar_imc(imcs):
+    """
+    Clasificación de cada IMC (processor.clasificar_imc).
+
+    Returns:
+        Códigos en CLASIFICACIONES_IMC
+    """
+    _requerir_numpy()
+    # side='right': un IMC igual al límite pasa a la clase siguiente, como `<` en la escalar.
+    # NaN queda al final (obesidad), igual que en la escalar.
+    return np.searchsorted(LIMITES_IMC, np.asarray(imcs, dtype=np.float64), side='right').astype(np.uint8)
+
+
+def determinar_nivel_usuario(edades, dias_disponibles, clasificaciones, parametros: Optional[Dict] = None):
+    """
+    Nivel de cada usuario (logic_rules.determinar_nivel_usuario).
+
+    Args:
+        edades: Edades
+        dias_disponibles: Días disponibles para entrenar
+        clasificaciones: Códigos de clasificación del IMC (ver `clasificar_imc`)
+        parametros: Parámetros del conjunto de reglas (opcional)
+
+    Returns:
+        Códigos en NIVELES
+    """
+    _requerir_numpy()
+    p = parametros or PARAMETROS_POR_DEFECTO
+    edades = np.asarray(edades)
+    dias = np.asarray(dias_disponibles)
+    clasificaciones = np.asarray(clasificaciones)
+
+    principiante = (
+        (edades > p['edad_madura']) | (dias < p['dias_minimos_intermedio']) | (clasificaciones == OBESIDAD)
+    )
+    avanzado = (
+        (dias >= p['dias_minimos_avanzado']) & (edades < p['edad_maxima_avanzado'])
+        & ((clasificaciones == NORMAL) | (clasificaciones == SOBREPESO))
+    )
+    return np.select([principiante, avanzado], [PRINCIPIANTE, AVANZADO], INTERMEDIO).astype(np.uint8)
+
+
+def determinar_objetivo_recomendado(objetivos, clasificaciones):
+    """
+    Objetivo recomendado de cada usuario (logic_rules.determinar_objetivo_recomendado).
+
+    Args:
+        objetivos: Códigos en OBJETIVOS del objetivo declarado (ver `codificar`)
+        clasificaciones: Códigos de clasificación del IMC
+
+    Returns:
+        Códigos en OBJETIVOS; un objetivo declarado desconocido se conserva
+    """
+    _requerir_numpy()
+    clasificaciones = np.asarray(clasificaciones)
+    return np.select(
+        [(clasificaciones == OBESIDAD) | (clasificaciones == SOBREPESO), clasificaciones == BAJO_PESO],
+        [OBJETIVO_PESO, OBJETIVO_MUSCULACION],
+        np.asarray(objetivos, dtype=np.int64),
+    ).astype(np.uint8)
+
+
+def determinar_intensidad_segura(edades, clasificaciones, niveles, parametros: Optional[Dict] = None):
+    """
+    Intensidad segura de cada usuario (logic_rules.determinar_intensidad_segura).
+
+    Args:
+        edades: Edades
+        clasificaciones: Códigos de clasificación del IMC
+        niveles: Códigos en NIVELES
+        parametros: Parámetros del conjunto de reglas (opcional)
+
+    Returns:
+        Códigos en INTENSIDADES
+    """
+    _requerir_numpy()
+    p = parametros or PARAMETROS_POR_DEFECTO
+    edades = np.asarray(edades)
+    niveles = np.asarray(niveles)
+
+    baja = (
+        (edades > p['edad_madura']) | (np.asarray(clasificaciones) == OBESIDAD)
+        | ((niveles == PRINCIPIANTE) & (edades <= p['edad_madura']))
+    )
+    alta = (niveles == AVANZADO) & (edades < p['edad_maxima_alta_intensidad'])
+    return np.select([baja, alta], [BAJA, ALTA], MEDIA).astype(np.uint8)
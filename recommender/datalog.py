@@ -0,0 +1,341 @@
+"""
+Evaluador Datalog semi-ingenuo (bottom-up) en Python puro.
+
+PARADIGMA LÓGICO: un programa es un conjunto de hechos y reglas Horn; el
+evaluador calcula todas sus consecuencias hasta el punto fijo.
+
+- Los hechos se guardan en relaciones (conjuntos de tuplas) con índices hash
+  por las posiciones de argumento que las reglas consultan ligadas.
+- Evaluación semi-ingenua: en cada iteración, cada regla recursiva se evalúa
+  solo contra los hechos nuevos de la iteración anterior (el "delta").
+- Negación estratificada: un predicado negado se calcula entero en un estrato
+  anterior al de la regla que lo niega.
+
+Ejemplo:
+
+    X, Y, Z = Var('X'), Var('Y'), Var('Z')
+    programa = Programa([
+        Regla(Atomo('camino', X, Y), [Atomo('arista', X, Y)]),
+        Regla(Atomo('camino', X, Z), [Atomo('camino', X, Y), Atomo('arista', Y, Z)]),
+    ])
+    base = programa.evaluar({'arista': [(1, 2), (2, 3)]})
+    base.tuplas('camino')  # {(1, 2), (2, 3), (1, 3)}
+"""
+import operator
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+
+_SIN_LIGAR = object()
+
+OPERADORES = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+class Var:
+    """Variable lógica; dos variables con el mismo nombre son la misma."""
+
+    __slots__ = ('nombre',)
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+
+    def __eq__(self, otra):
+        return isinstance(otra, Var) and otra.nombre == self.nombre
+
+    def __hash__(self):
+        return hash(('Var', self.nombre))
+
+    def __repr__(self):
+        return self.nombre
+
+
+class Atomo:
+    """Predicado aplicado a argumentos (variables o constantes)."""
+
+    def __init__(self, predicado: str, *args):
+        self.predicado = predicado
+        self.args = args
+
+    def variables(self) -> Set[Var]:
+        return {a for a in self.args if isinstance(a, Var)}
+
+    def __repr__(self):
+        return f"{self.predicado}({', '.join(map(repr, self.args))})"
+
+
+class No:
+    """Literal negado: se cumple si el átomo (ya ligado) no es un hecho."""
+
+    def __init__(self, atomo: Atomo):
+        self.atomo = atomo
+
+    def variables(self) -> Set[Var]:
+        return self.atomo.variables()
+
+
+class Comparacion:
+    """Comparación entre variables ligadas y/o constantes (p. ej. E > 60)."""
+
+    def __init__(self, operador: str, izquierda, derecha):
+        if operador not in OPERADORES:
+            raise ValueError(f"Operador de comparación desconocido: {operador}")
+        self.operador = operador
+        self.izquierda = izquierda
+        self.derecha = derecha
+
+    def variables(self) -> Set[Var]:
+        return {a for a in (self.izquierda, self.derecha) if isinstance(a, Var)}
+
+
+class Regla:
+    """
+    Regla Horn `cabeza <= cuerpo`.
+
+    Raises:
+        ValueError: Si la regla no es segura: toda variable de la cabeza, de una
+            negación o de una comparación debe aparecer en un átomo positivo
+    """
+
+    def __init__(self, cabeza: Atomo, cuerpo: Sequence):
+        self.cabeza = cabeza
+        self.cuerpo = list(cuerpo)
+        self.positivos = [lit for lit in self.cuerpo if isinstance(lit, Atomo)]
+        self.filtros = [lit for lit in self.cuerpo if not isinstance(lit, Atomo)]
+
+        ligadas = set().union(*(a.variables() for a in self.positivos))
+        libres = (cabeza.variables() | set().union(*(f.variables() for f in self.filtros))) - ligadas
+        if libres:
+            nombres = ', '.join(sorted(v.nombre for v in libres))
+            raise ValueError(f"Regla insegura para {cabeza.predicado}: {nombres} sin ligar")
+
+        self._planes: Dict[Optional[int], List] = {}
+
+    def plan(self, delta: Optional[int] = None) -> List:
+        """
+        Orden de evaluación del cuerpo: el átomo delta (si lo hay) primero, y
+        cada filtro en cuanto todas sus variables quedan ligadas.
+        """
+        if delta not in self._planes:
+            positivos = list(self.positivos)
+            if delta is not None:
+                positivos.insert(0, positivos.pop(delta))
+            pendientes = list(self.filtros)
+            ligadas: Set[Var] = set()
+            plan = []
+            for atomo in positivos:
+                plan.append(atomo)
+                ligadas |= atomo.variables()
+                listos = [f for f in pendientes if f.variables() <= ligadas]
+                plan.extend(listos)
+                pendientes = [f for f in pendientes if f not in listos]
+            self._planes[delta] = plan
+        return self._planes[delta]
+
+
+class Relacion:
+    """Conjunto de tuplas de un predicado con índices hash por posiciones."""
+
+    def __init__(self):
+        self.tuplas: Set[Tuple] = set()
+        self._indices: Dict[Tuple[int, ...], Dict[Tuple, List[Tuple]]] = {}
+
+    def agregar(self, tupla: Tuple) -> bool:
+        """Agrega una tupla; devuelve False si ya estaba."""
+        if tupla in self.tuplas:
+            return False
+        self.tuplas.add(tupla)
+        for posiciones, indice in self._indices.items():
+            indice[tuple(tupla[i] for i in posiciones)].append(tupla)
+        return True
+
+    def buscar(self, posiciones: Tuple[int, ...], clave: Tuple) -> Iterable[Tuple]:
+        """Tuplas cuyos valores en `posiciones` son `clave` (crea el índice la primera vez)."""
+        if not posiciones:
+            return self.tuplas
+        indice = self._indices.get(posiciones)
+        if indice is None:
+            indice = defaultdict(list)
+            for tupla in self.tuplas:
+                indice[tuple(tupla[i] for i in posiciones)].append(tupla)
+            self._indices[posiciones] = indice
+        return indice.get(clave, ())
+
+
+class BaseHechos:
+    """Relaciones por predicado: hechos cargados y derivados."""
+
+    def __init__(self):
+        self._relaciones: Dict[str, Relacion] = defaultdict(Relacion)
+
+    def relacion(self, predicado: str) -> Relacion:
+        return self._relaciones[predicado]
+
+    def cargar(self, predicado: str, tuplas: Iterable[Tuple]) -> None:
+        """Carga hechos en bloque."""
+        relacion = self._relaciones[predicado]
+        for tupla in tuplas:
+            relacion.agregar(tuple(tupla))
+
+    def tuplas(self, predicado: str) -> Set[Tuple]:
+        return self._relaciones[predicado].tuplas
+
+
+def _valor(termino, ligaduras: Dict[Var, Any]):
+    return ligaduras[termino] if isinstance(termino, Var) else termino
+
+
+def _unificar(atomo: Atomo, tupla: Tuple, ligaduras: Dict[Var, Any]) -> Optional[Dict[Var, Any]]:
+    """Extiende las ligaduras para que el átomo coincida con la tupla, o None."""
+    if len(tupla) != len(atomo.args):
+        return None
+    nuevas = ligaduras
+    for termino, valor in zip(atomo.args, tupla):
+        if isinstance(termino, Var):
+            actual = nuevas.get(termino, _SIN_LIGAR)
+            if actual is _SIN_LIGAR:
+                if nuevas is ligaduras:
+                    nuevas = dict(ligaduras)
+                nuevas[termino] = valor
+            elif actual != valor:
+                return None
+        elif termino != valor:
+            return None
+    return nuevas
+
+
+def _resolver(plan: List, paso: int, ligaduras: Dict[Var, Any], base: BaseHechos,
+              delta: Optional[Set[Tuple]]) -> Iterator[Dict[Var, Any]]:
+    """Recorre el plan del cuerpo y genera cada ligadura que lo satisface."""
+    if paso == len(plan):
+        yield ligaduras
+        return
+
+    literal = plan[paso]
+    if isinstance(literal, Comparacion):
+        if OPERADORES[literal.operador](_valor(literal.izquierda, ligaduras),
+                                        _valor(literal.derecha, ligaduras)):
+            yield from _resolver(plan, paso + 1, ligaduras, base, delta)
+        return
+    if isinstance(literal, No):
+        tupla = tuple(_valor(a, ligaduras) for a in literal.atomo.args)
+        if tupla not in base.tuplas(literal.atomo.predicado):
+            yield from _resolver(plan, paso + 1, ligaduras, base, delta)
+        return
+
+    if paso == 0 and delta is not None:
+        candidatas = delta
+    else:
+        # Posiciones ya determinadas (constantes o variables ligadas) -> índice hash
+        posiciones, clave = [], []
+        for i, termino in enumerate(literal.args):
+            if not isinstance(termino, Var):
+                posiciones.append(i)
+                clave.append(termino)
+            elif termino in ligaduras:
+                posiciones.append(i)
+                clave.append(ligaduras[termino])
+        candidatas = base.relacion(literal.predicado).buscar(tuple(posiciones), tuple(clave))
+
+    for tupla in candidatas:
+        extendidas = _unificar(literal, tupla, ligaduras)
+        if extendidas is not None:
+            yield from _resolver(plan, paso + 1, extendidas, base, delta)
+
+
+class Programa:
+    """
+    Programa Datalog estratificado.
+
+    Raises:
+        ValueError: Si el programa no es estratificable (recursión a través
+            de una negación)
+    """
+
+    def __init__(self, reglas: Sequence[Regla]):
+        self.reglas = list(reglas)
+        self.estratos = self._estratificar()
+
+    def _estratificar(self) -> List[List[Regla]]:
+        derivados = {r.cabeza.predicado for r in self.reglas}
+        estrato = {p: 0 for p in derivados}
+        for _ in range(len(derivados) + 1):
+            cambio = False
+            for regla in self.reglas:
+                minimo = estrato[regla.cabeza.predicado]
+                for literal in regla.cuerpo:
+                    if isinstance(literal, Atomo) and literal.predicado in derivados:
+                        minimo = max(minimo, estrato[literal.predicado])
+                    elif isinstance(literal, No) and literal.atomo.predicado in derivados:
+                        minimo = max(minimo, estrato[literal.atomo.predicado] + 1)
+                if minimo > estrato[regla.cabeza.predicado]:
+                    estrato[regla.cabeza.predicado] = minimo
+                    cambio = True
+            if not cambio:
+                break
+        else:
+            raise ValueError("Programa no estratificable: recursión a través de una negación")
+
+        estratos = defaultdict(list)
+        for regla in self.reglas:
+            estratos[estrato[regla.cabeza.predicado]].append(regla)
+        return [estratos[n] for n in sorted(estratos)]
+
+    def evaluar(self, hechos: Optional[Dict[str, Iterable[Tuple]]] = None,
+                base: Optional[BaseHechos] = None) -> BaseHechos:
+        """
+        Calcula el punto fijo del programa.
+
+        Args:
+            hechos: Hechos a cargar en bloque, por predicado
+            base: Base de hechos existente a completar (opcional)
+
+        Returns:
+            Base con los hechos cargados y todos los derivados
+        """
+        base = base or BaseHechos()
+        for predicado, tuplas in (hechos or {}).items():
+            base.cargar(predicado, tuplas)
+        for reglas in self.estratos:
+            self._evaluar_estrato(reglas, base)
+        return base
+
+    def _evaluar_estrato(self, reglas: List[Regla], base: BaseHechos) -> None:
+        del_estrato = {r.cabeza.predicado for r in reglas}
+
+        # Primera ronda: todas las reglas contra la base completa
+        delta = self._derivar(
+            ((regla, None) for regla in reglas), base, {}
+        )
+
+        # Rondas siguientes: cada átomo recursivo, de uno en uno, contra el delta
+        while any(delta.values()):
+            tareas = (
+                (regla, i)
+                for regla in reglas
+                for i, atomo in enumerate(regla.positivos)
+                if atomo.predicado in del_estrato and delta.get(atomo.predicado)
+            )
+            delta = self._derivar(tareas, base, delta)
+
+    @staticmethod
+    def _derivar(tareas, base: BaseHechos, delta: Dict[str, Set[Tuple]]) -> Dict[str, Set[Tuple]]:
+        nuevos: Dict[str, Set[Tuple]] = defaultdict(set)
+        for regla, posicion in tareas:
+            plan = regla.plan(posicion)
+            fuente = delta[regla.positivos[posicion].predicado] if posicion is not None else None
+            existentes = base.tuplas(regla.cabeza.predicado)
+            for ligaduras in _resolver(plan, 0, {}, base, fuente):
+                tupla = tuple(_valor(a, ligaduras) for a in regla.cabeza.args)
+                if tupla not in existentes:
+                    nuevos[regla.cabeza.predicado].add(tupla)
+        # Insertar al final de la ronda: los índices no cambian mientras se recorren
+        for predicado, tuplas in nuevos.items():
+            base.cargar(predicado, tuplas)
+        return nuevos
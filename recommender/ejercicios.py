@@ -0,0 +1,498 @@
+"""
+Registro de ejercicios completados y contadores de progreso.
+
+Cada ejercicio completado es una fila de `EjercicioCompletado` (única por
+usuario, rutina, fecha, día y ejercicio). Marcar o desmarcar un ejercicio es:
+
+1. Un INSERT o un DELETE de esa fila; la restricción única decide qué toque
+   concurrente gana, sin leer ni reescribir listas.
+2. Si la fila cambió, un UPDATE con expresiones F del contador del día
+   (`SeguimientoEjercicio`), otro del de la semana (`ProgresoSemanal`) y
+   otro del del mes (`ProgresoMensual`). Semana y mes llevan también los
+   días completados: el toque que completa un día (o lo deja incompleto)
+   suma (o resta) uno.
+
+El progreso del día, de la semana y del mes se lee de esas filas de
+contadores. `calcular_actividad()` los recalcula desde cero a partir de
+`EjercicioCompletado` (ver el comando `reconstruir_actividad`).
+
+El plan semanal de cada rutina se guarda ya normalizado (ver
+`normalizar_plan`) al cargar o modificar el catálogo, de modo que las vistas
+lo leen sin escribir nada.
+
+`registrar_lote()` aplica de una vez los toques que un cliente acumuló sin
+conexión: estados explícitos (no alternancias) con la marca de tiempo del
+cliente, así que reenviar un lote es idempotente y un toque antiguo no pisa
+uno más reciente ya aplicado a la misma fila. La marca del último marcado
+vive en la fila de `EjercicioCompletado`; la del último desmarcado, en
+`EjercicioDesmarcado` (la fila del ejercicio ya no existe).
+"""
+import calendar
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Value, When
+
+from .models import (
+    EjercicioCompletado,
+    EjercicioDesmarcado,
+    ProgresoMensual,
+    ProgresoSemanal,
+    Rutina,
+    SeguimientoEjercicio,
+)
+from .versiones import incrementar_version_usuario
+
+
+class ProgresoEjercicios(NamedTuple):
+    """Contadores del día y de la semana tras marcar ejercicios."""
+    completados_dia: int
+    totales_dia: int
+    completados_semana: int
+    totales_semana: int
+
+    @property
+    def completado(self) -> bool:
+        return dia_completo(self.completados_dia, self.totales_dia)
+
+    @property
+    def progreso_dia(self) -> float:
+        return round(self.completados_dia / self.totales_dia * 100, 2) if self.totales_dia else 0.0
+
+    @property
+    def progreso_semanal(self) -> float:
+        return round(self.completados_semana / self.totales_semana * 100, 2) if self.totales_semana else 0
+
+
+DIAS_SEMANA = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+
+
+def es_descanso(texto: str) -> bool:
+    """True si el texto de un día del plan es un día de descanso."""
+    return texto.strip().lower().startswith('descanso')
+
+
+def normalizar_plan(plan_semanal: Optional[Dict], ejercicios=None, dias_semana: int = 0) -> Dict[str, List[str]]:
+    """
+    Plan semanal en forma normalizada: {día: [ejercicio, ...]} en orden de la semana.
+
+    Un día escrito como texto es un único ejercicio ('Caminata + estiramientos
+    30 min' pasa a ['Caminata + estiramientos 30 min']) y los días de descanso
+    ('Descanso', 'Descanso activo (caminata)') no entran en el plan: no son
+    ejercicios que marcar ni cuentan en los totales. Sin plan, reparte la
+    lista de ejercicios de la rutina en sus primeros `dias_semana` días. Es
+    idempotente.
+
+    Args:
+        plan_semanal: Plan tal como esté guardado
+        ejercicios: Ejercicios de la rutina
+        dias_semana: Días por semana de la rutina
+
+    Returns:
+        Diccionario con días de DIAS_SEMANA y listas de textos no vacías
+    """
+    plan = {}
+    for dia, contenido in (plan_semanal or {}).items():
+        if isinstance(contenido, str):
+            contenido = [contenido]
+        elif not isinstance(contenido, (list, tuple)):
+            continue
+        lista = [texto for texto in (str(e).strip()[:200] for e in contenido) if texto and not es_descanso(texto)]
+        if lista:
+            plan[dia] = lista
+    if not plan:
+        lista = [str(e)[:200] for e in ejercicios] if isinstance(ejercicios, list) else []
+        plan = {
+            dia: lista or [f'Ejercicio {i + 1}']
+            for i, dia in enumerate(DIAS_SEMANA[:dias_semana or 0])
+        }
+    orden = {dia: i for i, dia in enumerate(DIAS_SEMANA)}
+    return dict(sorted(plan.items(), key=lambda par: orden.get(par[0], len(orden))))
+
+
+def plan_de(rutina: Rutina) -> Dict[str, List[str]]:
+    """Plan normalizado de una rutina (sin escribirlo)."""
+    return normalizar_plan(rutina.plan_semanal, rutina.ejercicios, rutina.dias_semana)
+
+
+def inicio_de_semana(fecha: date) -> date:
+    """Lunes de la semana de `fecha`."""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def ejercicios_del_dia(plan_semanal: Dict, dia_semana: str) -> List[str]:
+    """Ejercicios programados para un día del plan (lista vacía si no hay)."""
+    ejercicios = (plan_semanal or {}).get(dia_semana, [])
+    return list(ejercicios) if isinstance(ejercicios, list) else []
+
+
+def total_ejercicios_plan(plan_semanal: Dict) -> int:
+    """Ejercicios programados en toda la semana."""
+    return sum(len(ejercicios_del_dia(plan_semanal, dia)) for dia in (plan_semanal or {}))
+
+
+def inicio_de_mes(fecha: date) -> date:
+    """Primer día del mes de `fecha`."""
+    return fecha.replace(day=1)
+
+
+def total_ejercicios_mes(plan_semanal: Dict, mes: date) -> int:
+    """Ejercicios programados en el mes natural de `mes` (cada día según su día de la semana)."""
+    dias = calendar.monthrange(mes.year, mes.month)[1]
+    primero = inicio_de_mes(mes).weekday()
+    return sum(
+        len(ejercicios_del_dia(plan_semanal, DIAS_SEMANA[(primero + i) % 7]))
+        for i in range(dias)
+    )
+
+
+def dia_completo(num_completados: int, num_totales: int) -> bool:
+    """True si el día tenía ejercicios programados y se completaron todos."""
+    return num_totales > 0 and num_completados == num_totales
+
+
+def _sumar(modelo, filtro: Dict, delta: int, crear: Dict, **extra) -> None:
+    """
+    Suma `delta` a num_completados de la fila de contadores `filtro`.
+
+    Si la fila no existe y delta es positivo la crea con `crear`; si otro
+    toque la crea a la vez, vuelve a intentar la actualización.
+    """
+    nuevo = F('num_completados') + delta
+    if modelo is SeguimientoEjercicio:
+        # Mismo criterio que dia_completo(): un día sin ejercicios no está completo
+        extra['completado'] = Case(
+            When(num_totales=nuevo, num_totales__gt=0, then=Value(True)), default=Value(False)
+        )
+    if modelo.objects.filter(**filtro).update(num_completados=nuevo, **extra) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**filtro, **crear, num_completados=delta)
+    except IntegrityError:
+        modelo.objects.filter(**filtro).update(num_completados=nuevo, **extra)
+
+
+def ajustar_contadores(usuario, rutina: Rutina, fecha: date, dia_semana: str, delta: int) -> None:
+    """Aplica `delta` ejercicios completados a los contadores del día, la semana y el mes."""
+    if not delta:
+        return
+    plan = plan_de(rutina)
+    ejercicios_dia = ejercicios_del_dia(plan, dia_semana)
+    filtro_dia = {'usuario': usuario, 'rutina': rutina, 'fecha': fecha, 'dia_semana': dia_semana}
+    _sumar(
+        SeguimientoEjercicio,
+        filtro_dia,
+        delta,
+        {
+            'ejercicios_totales': ejercicios_dia,
+            'num_totales': len(ejercicios_dia),
+            'completado': dia_completo(delta, len(ejercicios_dia)),
+        },
+    )
+
+    # La fila del día sigue bloqueada por el UPDATE: leerla da el valor tras este toque
+    fila = SeguimientoEjercicio.objects.filter(**filtro_dia).values_list('num_completados', 'num_totales').first()
+    cambio_dias = 0
+    if fila is not None:
+        completados, totales = fila
+        cambio_dias = int(dia_completo(completados, totales)) - int(dia_completo(completados - delta, totales))
+    dias = {'dias_completados': F('dias_completados') + cambio_dias} if cambio_dias else {}
+
+    _sumar(
+        ProgresoSemanal,
+        {'usuario': usuario, 'rutina': rutina, 'inicio_semana': inicio_de_semana(fecha)},
+        delta,
+        {'num_totales': total_ejercicios_plan(plan), 'dias_completados': max(cambio_dias, 0)},
+        **dias,
+    )
+    mes = inicio_de_mes(fecha)
+    _sumar(
+        ProgresoMensual,
+        {'usuario': usuario, 'rutina': rutina, 'mes': mes},
+        delta,
+        {'num_totales': total_ejercicios_mes(plan, mes), 'dias_completados': max(cambio_dias, 0)},
+        **dias,
+    )
+    incrementar_version_usuario(usuario.pk, 'ejercicios')
+
+
+def registrar_ejercicio(
+    usuario, rutina: Rutina, fecha: date, dia_semana: str, ejercicio: str,
+    completado: Optional[bool] = None
+) -> int:
+    """
+    Marca o desmarca un ejercicio y actualiza los contadores.
+
+    Args:
+        completado: True para marcar, False para desmarcar, None para alternar
+
+    Returns:
+        Cambio en el número de ejercicios completados (-1, 0 o 1)
+    """
+    clave = {
+        'usuario': usuario, 'rutina': rutina, 'fecha': fecha,
+        'dia_semana': dia_semana, 'ejercicio': ejercicio,
+    }
+    with transaction.atomic():
+        delta = 0
+        if completado is not False:
+            try:
+                with transaction.atomic():
+                    EjercicioCompletado.objects.create(**clave)
+                delta = 1
+            except IntegrityError:
+                # Ya estaba marcado
+                pass
+        if not delta and completado is not True:
+            delta = -EjercicioCompletado.objects.filter(**clave).delete()[0]
+        ajustar_contadores(usuario, rutina, fecha, dia_semana, delta)
+    return delta
+
+
+def progreso_ejercicios(usuario, rutina: Rutina, fecha: date, dia_semana: str) -> ProgresoEjercicios:
+    """Contadores del día y de su semana (una lectura de cada fila)."""
+    dia = (
+        SeguimientoEjercicio.objects
+        .filter(usuario=usuario, rutina=rutina, fecha=fecha, dia_semana=dia_semana)
+        .values_list('num_completados', 'num_totales')
+        .first()
+    )
+    semana = (
+        ProgresoSemanal.objects
+        .filter(usuario=usuario, rutina=rutina, inicio_semana=inicio_de_semana(fecha))
+        .values_list('num_completados', 'num_totales')
+        .first()
+    )
+    plan = plan_de(rutina)
+    return ProgresoEjercicios(
+        *(dia or (0, len(ejercicios_del_dia(plan, dia_semana)))),
+        *(semana or (0, total_ejercicios_plan(plan))),
+    )
+
+
+class OperacionEjercicio(NamedTuple):
+    """Un toque registrado en el cliente."""
+    rutina_id: int
+    fecha: date
+    dia_semana: str
+    ejercicio: str
+    completado: bool
+    marca: Optional[int] = None  # ms desde epoch en el cliente
+
+
+# Intentos de un lote que choca con toques concurrentes antes de rendirse
+INTENTOS_LOTE = 3
+
+
+def _es_anterior(marca: Optional[int], marca_fila: Optional[int]) -> bool:
+    """True si la operación es más antigua que el último toque aplicado a la fila."""
+    return marca is not None and marca_fila is not None and marca < marca_fila
+
+
+def registrar_lote(
+    usuario, operaciones: Iterable[OperacionEjercicio], rutinas: Dict[int, Rutina]
+) -> Tuple[int, Set[Tuple[int, date, str]]]:
+    """
+    Aplica un lote de toques en una transacción con escrituras masivas.
+
+    De varias operaciones sobre el mismo ejercicio gana la de marca más
+    reciente, y una operación más antigua que el último toque ya aplicado
+    (marcado o desmarcado) se descarta. Si un toque concurrente inserta una
+    de las filas del lote, el lote se repite: la segunda vez esa fila ya se
+    lee bloqueada y se compara con su marca como las demás.
+
+    Args:
+        usuario: Usuario que envía el lote
+        operaciones: Toques del cliente
+        rutinas: Rutinas del lote por id
+
+    Returns:
+        Tupla (operaciones que cambiaron algo, días afectados como
+        (rutina_id, fecha, dia_semana))
+
+    Raises:
+        IntegrityError: Si el lote sigue chocando con toques concurrentes
+            tras INTENTOS_LOTE intentos
+    """
+    # La última operación de cada ejercicio (por marca; a igualdad, por orden de llegada)
+    ultimas: Dict[Tuple, OperacionEjercicio] = {}
+    for _, operacion in sorted(
+        enumerate(operaciones), key=lambda par: (par[1].marca is not None, par[1].marca or 0, par[0])
+    ):
+        ultimas[operacion[:4]] = operacion
+    if not ultimas:
+        return 0, set()
+
+    for intento in range(INTENTOS_LOTE):
+        try:
+            with transaction.atomic():
+                cambios = _aplicar_lote(usuario, ultimas, rutinas)
+            break
+        except IntegrityError:
+            # Un toque concurrente insertó alguna de estas filas mientras tanto
+            if intento == INTENTOS_LOTE - 1:
+                raise
+    return cambios, {clave[:3] for clave in ultimas}
+
+
+def _clave_fila(fila) -> Tuple:
+    """Clave (rutina_id, fecha, dia_semana, ejercicio) de una fila de ejercicio marcado o desmarcado."""
+    return (fila.rutina_id, fila.fecha, fila.dia_semana, fila.ejercicio)
+
+
+def _aplicar_lote(usuario, ultimas: Dict[Tuple, OperacionEjercicio], rutinas: Dict[int, Rutina]) -> int:
+    """Un intento de `registrar_lote` (dentro de una transacción); devuelve las filas cambiadas."""
+    filtro = {
+        'usuario': usuario,
+        'rutina_id__in': {clave[0] for clave in ultimas},
+        'fecha__in': {clave[1] for clave in ultimas},
+        'ejercicio__in': {clave[3] for clave in ultimas},
+    }
+    existentes = {
+        _clave_fila(fila): fila for fila in EjercicioCompletado.objects.select_for_update().filter(**filtro)
+    }
+    desmarcados = {
+        _clave_fila(fila): fila for fila in EjercicioDesmarcado.objects.select_for_update().filter(**filtro)
+    }
+
+    nuevas, actualizadas, borrar = [], [], []
+    nuevos_desmarcados, desmarcados_actualizados = [], []
+    for clave, operacion in ultimas.items():
+        fila = existentes.get(clave)
+        desmarcado = desmarcados.get(clave)
+        # El último toque aplicado: el marcado de la fila o, si no hay fila, el último desmarcado
+        if fila is not None:
+            ultima_marca = fila.marca_cliente
+        else:
+            ultima_marca = desmarcado.marca_cliente if desmarcado is not None else None
+        if _es_anterior(operacion.marca, ultima_marca):
+            continue
+        if operacion.completado:
+            if fila is None:
+                nuevas.append(EjercicioCompletado(
+                    usuario=usuario, rutina_id=clave[0], fecha=clave[1], dia_semana=clave[2],
+                    ejercicio=clave[3], marca_cliente=operacion.marca,
+                ))
+            elif operacion.marca is not None:
+                fila.marca_cliente = operacion.marca
+                actualizadas.append(fila)
+            continue
+
+        if fila is not None:
+            borrar.append(fila)
+        if operacion.marca is None:
+            continue
+        if desmarcado is None:
+            nuevos_desmarcados.append(EjercicioDesmarcado(
+                usuario=usuario, rutina_id=clave[0], fecha=clave[1], dia_semana=clave[2],
+                ejercicio=clave[3], marca_cliente=operacion.marca,
+            ))
+        elif desmarcado.marca_cliente < operacion.marca:
+            desmarcado.marca_cliente = operacion.marca
+            desmarcados_actualizados.append(desmarcado)
+
+    EjercicioCompletado.objects.bulk_create(nuevas)
+    EjercicioDesmarcado.objects.bulk_create(nuevos_desmarcados)
+    EjercicioCompletado.objects.bulk_update(actualizadas, ['marca_cliente'])
+    EjercicioDesmarcado.objects.bulk_update(desmarcados_actualizados, ['marca_cliente'])
+    EjercicioCompletado.objects.filter(pk__in=[fila.pk for fila in borrar]).delete()
+
+    deltas: Dict[Tuple[int, date, str], int] = {}
+    for fila in nuevas:
+        dia = (fila.rutina_id, fila.fecha, fila.dia_semana)
+        deltas[dia] = deltas.get(dia, 0) + 1
+    for fila in borrar:
+        dia = (fila.rutina_id, fila.fecha, fila.dia_semana)
+        deltas[dia] = deltas.get(dia, 0) - 1
+    for (rutina_id, fecha, dia_semana), delta in deltas.items():
+        ajustar_contadores(usuario, rutinas[rutina_id], fecha, dia_semana, delta)
+
+    return len(nuevas) + len(borrar)
+
+
+class ActividadCalculada(NamedTuple):
+    """Contadores recalculados desde `EjercicioCompletado`, por clave natural."""
+    # (usuario_id, rutina_id, fecha, dia_semana) -> (completados, totales)
+    dias: Dict[Tuple, Tuple[int, int]]
+    # (usuario_id, rutina_id, inicio_semana) -> (completados, totales, dias_completados)
+    semanas: Dict[Tuple, Tuple[int, int, int]]
+    # (usuario_id, rutina_id, mes) -> (completados, totales, dias_completados)
+    meses: Dict[Tuple, Tuple[int, int, int]]
+
+
+def calcular_actividad(usuario_ids: Optional[Iterable[int]] = None) -> ActividadCalculada:
+    """
+    Recalcula los completados de día, semana y mes a partir de las filas de
+    ejercicios completados.
+
+    Los totales programados son los que ya guarda cada fila de contadores
+    (fijados con el plan vigente cuando se creó), así que editar el plan de
+    una rutina no reescribe el historial; solo una fila que falta toma los
+    del plan actual. Los días que ya tienen fila entran aunque no les quede
+    ningún ejercicio completado (con cero).
+
+    Args:
+        usuario_ids: Usuarios a recalcular (todos si es None)
+
+    Returns:
+        ActividadCalculada con los valores esperados de cada fila
+    """
+    completados = EjercicioCompletado.objects.all()
+    existentes = SeguimientoEjercicio.objects.all()
+    semanas_guardadas = ProgresoSemanal.objects.all()
+    meses_guardados = ProgresoMensual.objects.all()
+    if usuario_ids is not None:
+        usuario_ids = list(usuario_ids)
+        completados = completados.filter(usuario_id__in=usuario_ids)
+        existentes = existentes.filter(usuario_id__in=usuario_ids)
+        semanas_guardadas = semanas_guardadas.filter(usuario_id__in=usuario_ids)
+        meses_guardados = meses_guardados.filter(usuario_id__in=usuario_ids)
+
+    por_dia: Dict[Tuple, int] = {}
+    totales_dia: Dict[Tuple, int] = {}
+    for *clave, totales in existentes.values_list(
+        'usuario_id', 'rutina_id', 'fecha', 'dia_semana', 'num_totales'
+    ).iterator():
+        por_dia[tuple(clave)] = 0
+        totales_dia[tuple(clave)] = totales
+    for fila in completados.values('usuario_id', 'rutina_id', 'fecha', 'dia_semana').annotate(n=Count('id')):
+        por_dia[(fila['usuario_id'], fila['rutina_id'], fila['fecha'], fila['dia_semana'])] = fila['n']
+
+    totales_semana = {
+        tuple(clave): totales
+        for *clave, totales in semanas_guardadas.values_list('usuario_id', 'rutina_id', 'inicio_semana', 'num_totales')
+    }
+    totales_mes = {
+        tuple(clave): totales
+        for *clave, totales in meses_guardados.values_list('usuario_id', 'rutina_id', 'mes', 'num_totales')
+    }
+    planes = {
+        rutina.pk: plan_de(rutina)
+        for rutina in Rutina.objects.filter(pk__in={clave[1] for clave in por_dia})
+    }
+
+    dias, semanas, meses = {}, {}, {}
+    for (usuario_id, rutina_id, fecha, dia_semana), n in por_dia.items():
+        plan = planes[rutina_id]
+        clave_dia = (usuario_id, rutina_id, fecha, dia_semana)
+        totales = totales_dia.get(clave_dia)
+        if totales is None:
+            totales = len(ejercicios_del_dia(plan, dia_semana))
+        dias[clave_dia] = (n, totales)
+        completo = int(dia_completo(n, totales))
+
+        semana = (usuario_id, rutina_id, inicio_de_semana(fecha))
+        if semana not in totales_semana:
+            totales_semana[semana] = total_ejercicios_plan(plan)
+        actual = semanas.get(semana, (0, totales_semana[semana], 0))
+        semanas[semana] = (actual[0] + n, actual[1], actual[2] + completo)
+
+        mes = (usuario_id, rutina_id, inicio_de_mes(fecha))
+        if mes not in totales_mes:
+            totales_mes[mes] = total_ejercicios_mes(plan, mes[2])
+        actual = meses.get(mes, (0, totales_mes[mes], 0))
+        meses[mes] = (actual[0] + n, actual[1], actual[2] + completo)
+
+    return ActividadCalculada(dias, semanas, meses)
@@ -0,0 +1,204 @@
+"""
+Exploración del catálogo: filtros, facetas y paginación por clave.
+
+La página de resultados sale de la tabla `Rutina` con los filtros en SQL y
+paginación por clave (`id > cursor`, sin OFFSET), así que pedir la página
+100 cuesta lo mismo que la primera.
+
+Los recuentos por faceta y el resumen estadístico salen de un
+`IndiceFacetas` que se construye una vez por versión del catálogo (ver
+`InstantaneaCatalogo.indice_facetas`):
+
+- Faceta (nivel, objetivo, intensidad, días): un bitset de rutinas por valor.
+- Rango (días, duración, calorías): los valores distintos ordenados y, por
+  cada uno, el bitset acumulado de las rutinas con valor menor o igual; un
+  rango es una búsqueda binaria y dos operaciones de bits.
+
+El recuento de cada valor de una faceta aplica todos los filtros salvo el de
+esa misma faceta, de modo que se puede ampliar la selección sin vaciarla.
+"""
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .catalogo import posiciones
+from .memo import MemoLRU
+
+FACETAS = ('nivel', 'objetivo', 'intensidad', 'dias_semana')
+RANGOS = ('dias_semana', 'duracion_minutos', 'calorias_estimadas')
+
+# Parámetros GET de cada rango: (mínimo, máximo)
+PARAMETROS_RANGO = {
+    'dias_semana': ('dias_min', 'dias_max'),
+    'duracion_minutos': ('duracion_min', 'duracion_max'),
+    'calorias_estimadas': ('calorias_min', 'calorias_max'),
+}
+
+Rango = Tuple[Optional[int], Optional[int]]
+
+
+class FiltroCatalogo(NamedTuple):
+    """Filtros de exploración; hashable para memorizar recuentos."""
+    nivel: Tuple[str, ...] = ()
+    objetivo: Tuple[str, ...] = ()
+    intensidad: Tuple[str, ...] = ()
+    dias_semana: Rango = (None, None)
+    duracion_minutos: Rango = (None, None)
+    calorias_estimadas: Rango = (None, None)
+
+
+def _entero(texto: Optional[str], nombre: str) -> Optional[int]:
+    if texto in (None, ''):
+        return None
+    try:
+        return int(texto)
+    except ValueError:
+        raise ValueError(f'{nombre} debe ser un número entero')
+
+
+def leer_filtro(parametros) -> FiltroCatalogo:
+    """
+    Filtro a partir de los parámetros GET.
+
+    Los multivalor aceptan el parámetro repetido o separado por comas
+    (`?nivel=principiante&nivel=intermedio` o `?nivel=principiante,intermedio`).
+
+    Raises:
+        ValueError: Si un límite de rango no es un entero
+    """
+    valores = {}
+    for campo in ('nivel', 'objetivo', 'intensidad'):
+        elegidos = {
+            valor.strip()
+            for parametro in parametros.getlist(campo)
+            for valor in parametro.split(',')
+            if valor.strip()
+        }
+        valores[campo] = tuple(sorted(elegidos))
+    for campo, (minimo, maximo) in PARAMETROS_RANGO.items():
+        valores[campo] = (
+            _entero(parametros.get(minimo), minimo),
+            _entero(parametros.get(maximo), maximo),
+        )
+    return FiltroCatalogo(**valores)
+
+
+def filtrar_queryset(rutinas, filtro: FiltroCatalogo):
+    """Aplica el filtro a un QuerySet de rutinas (en SQL)."""
+    for campo in ('nivel', 'objetivo', 'intensidad'):
+        if getattr(filtro, campo):
+            rutinas = rutinas.filter(**{f'{campo}__in': getattr(filtro, campo)})
+    for campo in RANGOS:
+        minimo, maximo = getattr(filtro, campo)
+        if minimo is not None:
+            rutinas = rutinas.filter(**{f'{campo}__gte': minimo})
+        if maximo is not None:
+            rutinas = rutinas.filter(**{f'{campo}__lte': maximo})
+    return rutinas
+
+
+class IndiceFacetas:
+    """
+    Bitsets de facetas y rangos de las rutinas de una instantánea.
+
+    El bit i corresponde a la rutina i de la instantánea.
+    """
+
+    def __init__(self, rutinas: Iterable[Dict]):
+        rutinas = list(rutinas)
+        self.todas = (1 << len(rutinas)) - 1
+
+        self._valores: Dict[str, Dict] = {campo: {} for campo in FACETAS}
+        for i, datos in enumerate(rutinas):
+            for campo in FACETAS:
+                valores = self._valores[campo]
+                valores[datos[campo]] = valores.get(datos[campo], 0) | (1 << i)
+
+        self._numeros = {campo: tuple(datos[campo] or 0 for datos in rutinas) for campo in RANGOS}
+        self._escalas: Dict[str, Tuple[List[int], List[int]]] = {}
+        for campo in RANGOS:
+            por_valor: Dict[int, int] = {}
+            for i, numero in enumerate(self._numeros[campo]):
+                por_valor[numero] = por_valor.get(numero, 0) | (1 << i)
+            ordenados = sorted(por_valor)
+            acumulados, bits = [], 0
+            for numero in ordenados:
+                bits |= por_valor[numero]
+                acumulados.append(bits)
+            self._escalas[campo] = (ordenados, acumulados)
+
+        self._recuentos = MemoLRU(capacidad=256)
+
+    def limites(self) -> Dict[str, Rango]:
+        """Mínimo y máximo de cada campo de rango en todo el catálogo."""
+        return {
+            campo: (ordenados[0], ordenados[-1]) if ordenados else (None, None)
+            for campo, (ordenados, _) in self._escalas.items()
+        }
+
+    def _rango(self, campo: str, rango: Rango) -> int:
+        ordenados, acumulados = self._escalas[campo]
+        minimo, maximo = rango
+        hasta = bisect_right(ordenados, maximo) if maximo is not None else len(ordenados)
+        bits = acumulados[hasta - 1] if hasta else 0
+        desde = bisect_left(ordenados, minimo) if minimo is not None else 0
+        if desde:
+            bits &= ~acumulados[desde - 1]
+        return bits
+
+    def _bits(self, filtro: FiltroCatalogo, excluir: Optional[str] = None) -> int:
+        """Bitset de las rutinas que cumplen el filtro, sin la restricción `excluir`."""
+        bits = self.todas
+        for campo in ('nivel', 'objetivo', 'intensidad'):
+            elegidos = getattr(filtro, campo)
+            if elegidos and campo != excluir:
+                valores = self._valores[campo]
+                union = 0
+                for valor in elegidos:
+                    union |= valores.get(valor, 0)
+                bits &= union
+        for campo in RANGOS:
+            rango = getattr(filtro, campo)
+            if rango != (None, None) and campo != excluir:
+                bits &= self._rango(campo, rango)
+        return bits
+
+    def seleccion(self, filtro: FiltroCatalogo) -> int:
+        """Bitset de las rutinas que cumplen el filtro."""
+        return self._bits(filtro)
+
+    def _resumen(self, bits: int) -> Dict:
+        """Mismas claves que processor.generar_resumen_estadistico."""
+        elegidas = posiciones(bits)
+        total = len(elegidas)
+        if not total:
+            return {'total': 0, 'duracion_promedio': 0, 'dias_promedio': 0}
+        duraciones = self._numeros['duracion_minutos']
+        dias = self._numeros['dias_semana']
+        return {
+            'total': total,
+            'duracion_promedio': round(sum(duraciones[i] for i in elegidas) / total, 1),
+            'dias_promedio': round(sum(dias[i] for i in elegidas) / total, 1),
+        }
+
+    def _calcular(self, filtro: FiltroCatalogo) -> Tuple[Dict, Dict]:
+        facetas = {}
+        for campo in FACETAS:
+            base = self._bits(filtro, excluir=campo)
+            facetas[campo] = {
+                valor: (bits & base).bit_count()
+                for valor, bits in sorted(self._valores[campo].items())
+            }
+        return facetas, self._resumen(self._bits(filtro))
+
+    def recuentos(self, filtro: FiltroCatalogo) -> Tuple[Dict, Dict]:
+        """
+        Recuentos por faceta y resumen de las rutinas filtradas.
+
+        Args:
+            filtro: Filtro de exploración
+
+        Returns:
+            Tupla (facetas, resumen): facetas es {campo: {valor: recuento}};
+            resumen tiene total, duracion_promedio y dias_promedio
+        """
+        return self._recuentos.obtener(filtro, lambda: self._calcular(filtro))
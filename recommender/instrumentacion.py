@@ -0,0 +1,230 @@
+"""
+Instrumentación del motor lógico.
+
+Registra, por proceso:
+
+- Cuántas veces se dispara cada regla (`contar_regla`).
+- Histogramas de latencia por método (decorador `medir`).
+- Cuántas veces se cae a una ruta de respaldo y por qué (`registrar_fallback`).
+
+Desactivada (por defecto) cada punto de medición se reduce a comprobar un
+booleano. Activada, las mediciones se acumulan en memoria y se entregan a un
+sumidero intercambiable cada `intervalo` segundos o al llamar a `volcar()`.
+
+Configuración (settings.INSTRUMENTACION_REGLAS, leída al arrancar la app):
+
+    {'ACTIVA': True, 'SUMIDERO': 'recommender.instrumentacion.SumideroLog',
+     'INTERVALO_SEGUNDOS': 60}
+"""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Límites superiores de las cubetas de latencia, en milisegundos
+CUBETAS_MS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+# Consultado en cada punto de medición: debe ser lo único que cueste desactivado
+activa = False
+
+
+class Sumidero:
+    """Destino de las mediciones; las subclases implementan `exportar`."""
+
+    def exportar(self, instantanea: Dict) -> None:
+        raise NotImplementedError
+
+
+class SumideroLog(Sumidero):
+    """Escribe cada instantánea como una línea JSON en el log."""
+
+    def exportar(self, instantanea: Dict) -> None:
+        logger.info("Instrumentación de reglas: %s", json.dumps(instantanea, sort_keys=True))
+
+
+class SumideroMemoria(Sumidero):
+    """Guarda las instantáneas en una lista (pruebas y depuración)."""
+
+    def __init__(self):
+        self.instantaneas = []
+
+    def exportar(self, instantanea: Dict) -> None:
+        self.instantaneas.append(instantanea)
+
+
+class _Registro:
+    """Acumuladores de un intervalo de exportación."""
+
+    def __init__(self):
+        self.reglas: Dict[str, int] = {}
+        self.latencias: Dict[str, list] = {}
+        self.fallbacks: Dict[str, Dict[str, int]] = {}
+
+    def instantanea(self) -> Dict:
+        return {
+            'reglas': dict(self.reglas),
+            'latencias': {
+                metodo: {
+                    'cubetas_ms': dict(zip(map(str, CUBETAS_MS + ('inf',)), cubetas)),
+                    'total': total,
+                    'suma_ms': round(suma, 3),
+                }
+                for metodo, (cubetas, total, suma) in self.latencias.items()
+            },
+            'fallbacks': {destino: dict(causas) for destino, causas in self.fallbacks.items()},
+        }
+
+
+_lock = threading.Lock()
+_registro = _Registro()
+_sumidero: Sumidero = SumideroLog()
+_intervalo: Optional[float] = None
+_proximo_volcado = 0.0
+_hilo = threading.local()
+
+
+def activar(sumidero: Optional[Sumidero] = None, intervalo: Optional[float] = None) -> None:
+    """
+    Activa la instrumentación.
+
+    Args:
+        sumidero: Destino de las mediciones (por defecto `SumideroLog`)
+        intervalo: Segundos entre volcados automáticos; None para volcar solo a mano
+    """
+    global activa, _sumidero, _intervalo, _proximo_volcado
+    with _lock:
+        _sumidero = sumidero or SumideroLog()
+        _intervalo = intervalo
+        _proximo_volcado = time.monotonic() + intervalo if intervalo else 0.0
+        activa = True
+
+
+def desactivar() -> None:
+    """Desactiva la instrumentación y descarta lo acumulado."""
+    global activa, _registro
+    with _lock:
+        activa = False
+        _registro = _Registro()
+
+
+def configurar(configuracion: Optional[Dict]) -> None:
+    """Activa la instrumentación según settings.INSTRUMENTACION_REGLAS."""
+    if not configuracion or not configuracion.get('ACTIVA'):
+        return
+    from django.utils.module_loading import import_string
+
+    ruta = configuracion.get('SUMIDERO', 'recommender.instrumentacion.SumideroLog')
+    activar(import_string(ruta)(), configuracion.get('INTERVALO_SEGUNDOS', 60))
+
+
+@contextmanager
+def suspendida():
+    """No registra nada en el hilo actual (p. ej. al compilar las reglas)."""
+    anterior = getattr(_hilo, 'suspendida', False)
+    _hilo.suspendida = True
+    try:
+        yield
+    finally:
+        _hilo.suspendida = anterior
+
+
+def _registrando() -> bool:
+    return activa and not getattr(_hilo, 'suspendida', False)
+
+
+def contar_regla(regla: str) -> None:
+    """Registra que una regla se disparó; en caliente, comprobar antes `activa`."""
+    if not _registrando():
+        return
+    with _lock:
+        _registro.reglas[regla] = _registro.reglas.get(regla, 0) + 1
+    _quizas_volcar()
+
+
+def contar_reglas(reglas) -> None:
+    """Registra varios disparos de una vez (p. ej. las razones de un lote)."""
+    if not _registrando():
+        return
+    with _lock:
+        for regla in reglas:
+            _registro.reglas[regla] = _registro.reglas.get(regla, 0) + 1
+    _quizas_volcar()
+
+
+def registrar_fallback(destino: str, causa: str) -> None:
+    """
+    Registra una caída a una ruta de respaldo.
+
+    Args:
+        destino: Método de respaldo usado (p. ej. '_determinar_intensidad_directa')
+        causa: Motivo: 'sin_respuesta', 'fuera_de_dominio' o el nombre de la excepción
+    """
+    if not _registrando():
+        return
+    with _lock:
+        causas = _registro.fallbacks.setdefault(destino, {})
+        causas[causa] = causas.get(causa, 0) + 1
+    _quizas_volcar()
+
+
+def _registrar_latencia(metodo: str, segundos: float) -> None:
+    milisegundos = segundos * 1000
+    with _lock:
+        entrada = _registro.latencias.get(metodo)
+        if entrada is None:
+            entrada = _registro.latencias[metodo] = [[0] * (len(CUBETAS_MS) + 1), 0, 0.0]
+        entrada[0][bisect_left(CUBETAS_MS, milisegundos)] += 1
+        entrada[1] += 1
+        entrada[2] += milisegundos
+    _quizas_volcar()
+
+
+def medir(metodo: str) -> Callable:
+    """Decorador: registra la latencia de cada llamada bajo el nombre `metodo`."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not activa:
+                return funcion(*args, **kwargs)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                if not getattr(_hilo, 'suspendida', False):
+                    _registrar_latencia(metodo, time.perf_counter() - inicio)
+        return envoltura
+    return decorador
+
+
+def instantanea() -> Dict:
+    """Devuelve una copia de lo acumulado sin reiniciarlo."""
+    with _lock:
+        return _registro.instantanea()
+
+
+def volcar() -> Dict:
+    """Entrega lo acumulado al sumidero y empieza un intervalo nuevo."""
+    global _registro, _proximo_volcado
+    with _lock:
+        registro, _registro = _registro, _Registro()
+        sumidero = _sumidero
+        if _intervalo:
+            _proximo_volcado = time.monotonic() + _intervalo
+    datos = registro.instantanea()
+    try:
+        sumidero.exportar(datos)
+    except Exception as e:
+        # Un sumidero roto no debe tumbar la recomendación
+        logger.error(f"Error exportando la instrumentación de reglas: {e}")
+    return datos
+
+
+def _quizas_volcar() -> None:
+    if _intervalo and time.monotonic() >= _proximo_volcado:
+        volcar()
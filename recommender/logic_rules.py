@@ -12,12 +12,38 @@ IMPORTANTE:
 Estas reglas están pensadas para ser coherentes con el comportamiento del
 motor Prolog (`MotorProlog`) pero no dependen directamente de pyswip,
 lo que mantiene el sistema robusto aunque Prolog no esté disponible.
+
+Los umbrales salen de los parámetros del conjunto de reglas activo
+(`parametros_reglas`); si no se indican se usan los valores por defecto.
 """
 
-from typing import Dict, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
+
+from . import instrumentacion
+from .instrumentacion import medir
+from .nucleo_reglas import (
+    RAZON_EDAD_INTENSIDAD,
+    RAZON_NIVEL_AVANZADO,
+    RAZON_OBESIDAD_DIAS,
+    RAZON_SEGURA,
+    CondicionesUsuario,
+    nucleo_seguridad,
+)
+from .parametros_reglas import PARAMETROS_POR_DEFECTO
+
+# Mensajes de validación de la vista pública (las reglas están en nucleo_reglas)
+MENSAJES_VALIDACION = {
+    RAZON_SEGURA: 'Rutina segura y adecuada',
+    RAZON_EDAD_INTENSIDAD: 'Intensidad muy alta para tu edad',
+    RAZON_OBESIDAD_DIAS: 'Demasiados días de entrenamiento para comenzar',
+    RAZON_NIVEL_AVANZADO: 'Rutina demasiado avanzada para tu nivel actual',
+}
 
 
-def determinar_nivel_usuario(edad: int, dias_disponibles: int, imc_clasificacion: str) -> str:
+@medir('logic_rules.determinar_nivel_usuario')
+def determinar_nivel_usuario(
+    edad: int, dias_disponibles: int, imc_clasificacion: str, parametros: Optional[Dict] = None
+) -> str:
     """
     Determina el nivel del usuario (reglas lógicas en Python puro).
     
@@ -25,17 +51,24 @@ def determinar_nivel_usuario(edad: int, dias_disponibles: int, imc_clasificacion
         edad: Edad del usuario
         dias_disponibles: Días disponibles para entrenar
         imc_clasificacion: Clasificación del IMC
+        parametros: Parámetros del conjunto de reglas (opcional)
         
     Returns:
         Nivel del usuario: 'principiante', 'intermedio' o 'avanzado'
     """
+    p = parametros or PARAMETROS_POR_DEFECTO
     # Reglas simples coherentes con el modelo lógico general
-    if edad > 50 or dias_disponibles < 3 or imc_clasificacion == 'obesidad':
-        return 'principiante'
-    elif dias_disponibles >= 5 and edad < 30 and imc_clasificacion in ['normal', 'sobrepeso']:
-        return 'avanzado'
+    if edad > p['edad_madura'] or dias_disponibles < p['dias_minimos_intermedio'] or imc_clasificacion == 'obesidad':
+        nivel = 'principiante'
+    elif (dias_disponibles >= p['dias_minimos_avanzado'] and edad < p['edad_maxima_avanzado']
+            and imc_clasificacion in ['normal', 'sobrepeso']):
+        nivel = 'avanzado'
     else:
-        return 'intermedio'
+        nivel = 'intermedio'
+    
+    if instrumentacion.activa:
+        instrumentacion.contar_regla(f'logic_rules.nivel.{nivel}')
+    return nivel
 
 
 def determinar_objetivo_recomendado(objetivo_usuario: str, imc_clasificacion: str) -> str:
@@ -51,14 +84,21 @@ def determinar_objetivo_recomendado(objetivo_usuario: str, imc_clasificacion: st
     """
     # Reglas simples coherentes con el motor lógico
     if imc_clasificacion in ['obesidad', 'sobrepeso']:
-        return 'peso'
+        regla, objetivo = 'sobrepeso', 'peso'
     elif imc_clasificacion == 'bajo_peso':
-        return 'musculacion'
+        regla, objetivo = 'bajo_peso', 'musculacion'
     else:
-        return objetivo_usuario
+        regla, objetivo = 'declarado', objetivo_usuario
+    
+    if instrumentacion.activa:
+        instrumentacion.contar_regla(f'logic_rules.objetivo.{regla}')
+    return objetivo
 
 
-def determinar_intensidad_segura(edad: int, imc_clasificacion: str, nivel: str) -> str:
+@medir('logic_rules.determinar_intensidad_segura')
+def determinar_intensidad_segura(
+    edad: int, imc_clasificacion: str, nivel: str, parametros: Optional[Dict] = None
+) -> str:
     """
     Determina la intensidad segura (reglas lógicas en Python puro).
     
@@ -66,74 +106,135 @@ def determinar_intensidad_segura(edad: int, imc_clasificacion: str, nivel: str)
         edad: Edad del usuario
         imc_clasificacion: Clasificación del IMC
         nivel: Nivel del usuario
+        parametros: Parámetros del conjunto de reglas (opcional)
         
     Returns:
         Intensidad segura: 'baja', 'media' o 'alta'
     """
+    p = parametros or PARAMETROS_POR_DEFECTO
     # Reglas coherentes con las de Prolog
-    if edad > 50 or imc_clasificacion == 'obesidad' or (nivel == 'principiante' and edad <= 50):
-        return 'baja'
-    elif nivel == 'avanzado' and edad < 40:
-        return 'alta'
+    if (edad > p['edad_madura'] or imc_clasificacion == 'obesidad'
+            or (nivel == 'principiante' and edad <= p['edad_madura'])):
+        intensidad = 'baja'
+    elif nivel == 'avanzado' and edad < p['edad_maxima_alta_intensidad']:
+        intensidad = 'alta'
     else:
-        return 'media'
+        intensidad = 'media'
+    
+    if instrumentacion.activa:
+        instrumentacion.contar_regla(f'logic_rules.intensidad.{intensidad}')
+    return intensidad
 
 
-def validar_seguridad_rutina(rutina: dict, usuario_data: dict) -> Tuple[bool, str]:
+@medir('logic_rules.validar_seguridad_rutina')
+def validar_seguridad_rutina(
+    rutina: dict, usuario_data: dict, parametros: Optional[Dict] = None
+) -> Tuple[bool, str]:
     """
     Valida si una rutina es segura (reglas lógicas en Python puro).
     
     Args:
         rutina: Diccionario con datos de la rutina
         usuario_data: Diccionario con datos del usuario
+        parametros: Parámetros del conjunto de reglas (opcional)
         
     Returns:
         Tupla (es_seguro, razón)
     """
-    edad = usuario_data.get('edad', 0)
-    imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
-    nivel_usuario_val = usuario_data.get('nivel_recomendado', 'principiante')
-    rutina_intensidad_val = rutina.get('intensidad', 'media')
-    rutina_dias_val = rutina.get('dias_semana', 3)
-    rutina_nivel_val = rutina.get('nivel', 'intermedio')
+    return validar_seguridad_rutinas(
+        [rutina], condiciones_validacion(usuario_data, parametros), parametros
+    )[0]
+
+
+def condiciones_validacion(usuario_data: dict, parametros: Optional[Dict] = None) -> CondicionesUsuario:
+    """
+    Condiciones de seguridad de la vista pública: usa la clasificación del IMC
+    y el nivel recomendado (no el declarado). Calcularlas una vez por petición.
+    
+    Args:
+        usuario_data: Diccionario con datos del usuario
+        parametros: Parámetros del conjunto de reglas (opcional)
+        
+    Returns:
+        CondicionesUsuario para el núcleo de reglas
+    """
+    p = parametros or PARAMETROS_POR_DEFECTO
+    return CondicionesUsuario(
+        edad_avanzada=usuario_data.get('edad', 0) > p['edad_avanzada'],
+        obesidad=usuario_data.get('imc_clasificacion', 'normal') == 'obesidad',
+        principiante=usuario_data.get('nivel_recomendado', 'principiante') == 'principiante',
+    )
+
+
+def validar_seguridad_rutinas(
+    rutinas: list, condiciones: CondicionesUsuario, parametros: Optional[Dict] = None
+) -> list:
+    """
+    Valida varias rutinas con las mismas condiciones (ver `condiciones_validacion`).
     
-    # Validación directa (más simple y confiable)
-    if edad > 60 and rutina_intensidad_val == 'alta':
-        return (False, 'Intensidad muy alta para tu edad')
-    if imc_clasificacion == 'obesidad' and rutina_dias_val > 5:
-        return (False, 'Demasiados días de entrenamiento para comenzar')
-    if nivel_usuario_val == 'principiante' and rutina_nivel_val == 'avanzado':
-        return (False, 'Rutina demasiado avanzada para tu nivel actual')
+    Returns:
+        Lista de tuplas (es_seguro, razón), una por rutina
+    """
+    _, razones = nucleo_seguridad(parametros).evaluar_lote(condiciones, rutinas)
+    return [(razon == RAZON_SEGURA, MENSAJES_VALIDACION[razon]) for razon in razones]
+
+
+# Códigos de explicación de una recomendación, en el orden en que se explican
+EXPLICACION_NIVEL = 'nivel'
+EXPLICACION_OBJETIVO = 'objetivo'
+EXPLICACION_DIAS = 'dias'
+EXPLICACION_INTENSIDAD_EDAD = 'intensidad_edad'
+EXPLICACION_PESO_IMC = 'peso_imc'
+
+
+def codigos_explicacion(
+    usuario_data: dict, rutina: dict, parametros: Optional[Dict] = None
+) -> List[str]:
+    """
+    Motivos por los que se recomendó la rutina, como códigos (EXPLICACION_*).
     
-    return (True, 'Rutina segura y adecuada')
+    Args:
+        usuario_data: Datos del usuario
+        rutina: Rutina recomendada
+        parametros: Parámetros del conjunto de reglas (opcional)
+        
+    Returns:
+        Lista de códigos, vacía si ningún motivo aplica
+    """
+    p = parametros or PARAMETROS_POR_DEFECTO
+    motivos = [
+        (EXPLICACION_NIVEL, rutina.get('nivel') == usuario_data.get('nivel_recomendado')),
+        (EXPLICACION_OBJETIVO, rutina.get('objetivo') == usuario_data.get('objetivo_recomendado')),
+        (EXPLICACION_DIAS, rutina.get('dias_semana', 0) <= usuario_data.get('dias_disponibles', 0)),
+        (EXPLICACION_INTENSIDAD_EDAD,
+         usuario_data.get('edad', 0) > p['edad_madura'] and rutina.get('intensidad') == 'baja'),
+        (EXPLICACION_PESO_IMC,
+         usuario_data.get('imc_clasificacion') in ['sobrepeso', 'obesidad'] and rutina.get('objetivo') == 'peso'),
+    ]
+    return [codigo for codigo, aplica in motivos if aplica]
 
 
-def generar_explicacion_recomendacion(usuario_data: dict, rutina: dict) -> str:
+def generar_explicacion_recomendacion(
+    usuario_data: dict, rutina: dict, parametros: Optional[Dict] = None
+) -> str:
     """
     Genera una explicación lógica de por qué se recomendó esta rutina.
     
     Args:
         usuario_data: Datos del usuario
         rutina: Rutina recomendada
+        parametros: Parámetros del conjunto de reglas (opcional)
         
     Returns:
         Explicación detallada
     """
-    explicaciones = []
-    
-    if rutina.get('nivel') == usuario_data.get('nivel_recomendado'):
-        explicaciones.append(f"✓ Nivel {rutina['nivel']} adecuado para tu experiencia")
-    
-    if rutina.get('objetivo') == usuario_data.get('objetivo_recomendado'):
-        explicaciones.append(f"✓ Alineada con tu objetivo de {rutina['objetivo']}")
-    
-    if rutina.get('dias_semana', 0) <= usuario_data.get('dias_disponibles', 0):
-        explicaciones.append(f"✓ Compatible con tu disponibilidad de {usuario_data['dias_disponibles']} días")
-    
-    if usuario_data.get('edad', 0) > 50 and rutina.get('intensidad') == 'baja':
-        explicaciones.append("✓ Intensidad baja recomendada por tu edad")
-    
-    if usuario_data.get('imc_clasificacion') in ['sobrepeso', 'obesidad'] and rutina.get('objetivo') == 'peso':
-        explicaciones.append("✓ Enfocada en pérdida de peso según tu IMC")
+    textos = {
+        EXPLICACION_NIVEL: lambda: f"✓ Nivel {rutina['nivel']} adecuado para tu experiencia",
+        EXPLICACION_OBJETIVO: lambda: f"✓ Alineada con tu objetivo de {rutina['objetivo']}",
+        EXPLICACION_DIAS: lambda: f"✓ Compatible con tu disponibilidad de {usuario_data['dias_disponibles']} días",
+        EXPLICACION_INTENSIDAD_EDAD: lambda: "✓ Intensidad baja recomendada por tu edad",
+        EXPLICACION_PESO_IMC: lambda: "✓ Enfocada en pérdida de peso según tu IMC",
+    }
+    explicaciones = [textos[codigo]() for codigo in codigos_explicacion(usuario_data, rutina, parametros)]
     
     return '\n'.join(explicaciones) if explicaciones else 'Rutina compatible con tu perfil'
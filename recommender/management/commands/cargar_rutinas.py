@@ -4,6 +4,7 @@ Comando de management para cargar rutinas desde datos.py a la base de datos.
 from django.core.management.base import BaseCommand
 from recommender.models import Rutina
 from recommender.datos import RUTINAS
+from recommender.ejercicios import normalizar_plan
 
 
 class Command(BaseCommand):
@@ -48,8 +49,16 @@ class Command(BaseCommand):
                 'objetivo': rutina_data['objetivo'],
                 'ejercicios': rutina_data['ejercicios'],
                 'duracion': duracion,
+                'duracion_minutos': rutina_data.get('duracion_minutos', 30),
                 'intensidad': rutina_data['intensidad'],
                 'calorias_estimadas': calorias_estimadas,
+                # El plan de datos.py es descriptivo ('HIIT + Burpees', 'Descanso');
+                # el que se sigue reparte los ejercicios en los días de la rutina
+                'plan_semanal': normalizar_plan(
+                    None,
+                    rutina_data['ejercicios'],
+                    rutina_data['dias_semana']
+                ),
                 'activa': True,
             }
             
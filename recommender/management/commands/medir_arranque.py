@@ -0,0 +1,106 @@
+"""
+Comando de management para medir el coste de arranque de un worker.
+
+Importa la aplicación en un intérprete nuevo con `python -X importtime` y
+reporta el coste de importación por módulo, y después mide por separado la
+construcción del motor lógico (que ya no ocurre al importar).
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Línea de -X importtime: "import time:  self [us] | cumulative | imported package"
+PATRON_IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+CODIGO_ARRANQUE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def parsear_importtime(salida: str):
+    """
+    Convierte la salida de `-X importtime` en una lista de mediciones.
+
+    Args:
+        salida: Texto de stderr del intérprete
+
+    Returns:
+        Lista de tuplas (modulo, propio_ms, acumulado_ms, profundidad)
+    """
+    mediciones = []
+    for linea in salida.splitlines():
+        coincidencia = PATRON_IMPORTTIME.match(linea)
+        if coincidencia:
+            propio, acumulado, sangria, modulo = coincidencia.groups()
+            mediciones.append((
+                modulo,
+                int(propio) / 1000,
+                int(acumulado) / 1000,
+                (len(sangria) - 1) // 2,
+            ))
+    return mediciones
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de importación por módulo y el de construcción del motor lógico'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Número de módulos a mostrar (por defecto 15)',
+        )
+        parser.add_argument(
+            '--orden',
+            choices=('propio', 'acumulado'),
+            default='propio',
+            help='Ordenar por tiempo propio o acumulado del módulo',
+        )
+
+    def handle(self, *args, **options):
+        entorno = dict(os.environ)
+        entorno.setdefault('DJANGO_SETTINGS_MODULE', 'django_project.settings')
+
+        inicio = time.perf_counter()
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CODIGO_ARRANQUE],
+            capture_output=True,
+            text=True,
+            env=entorno,
+        )
+        total_ms = (time.perf_counter() - inicio) * 1000
+        if proceso.returncode != 0:
+            raise CommandError(f'El arranque de prueba falló:\n{proceso.stderr[-2000:]}')
+
+        mediciones = parsear_importtime(proceso.stderr)
+        columna = 1 if options['orden'] == 'propio' else 2
+        mediciones_ordenadas = sorted(mediciones, key=lambda m: m[columna], reverse=True)
+
+        self.stdout.write(f'Arranque del intérprete + django.setup() + URLs: {total_ms:.0f} ms')
+        self.stdout.write(f'\nMódulos más costosos (orden: {options["orden"]}):')
+        self.stdout.write(f'{"propio ms":>10} {"acumulado ms":>13}  módulo')
+        for modulo, propio, acumulado, _ in mediciones_ordenadas[:options['top']]:
+            self.stdout.write(f'{propio:>10.1f} {acumulado:>13.1f}  {modulo}')
+
+        propios = [m for m in mediciones if m[0].startswith('recommender')]
+        if propios:
+            self.stdout.write('\nMódulos de la aplicación:')
+            for modulo, propio, acumulado, _ in sorted(propios, key=lambda m: m[2], reverse=True):
+                self.stdout.write(f'{propio:>10.1f} {acumulado:>13.1f}  {modulo}')
+
+        # La construcción del motor es perezosa: medirla aparte
+        from recommender import prolog_engine
+
+        inicio = time.perf_counter()
+        prolog_engine.MotorProlog()
+        motor_ms = (time.perf_counter() - inicio) * 1000
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✓ Construcción del motor lógico (primer uso): {motor_ms:.0f} ms')
+        )
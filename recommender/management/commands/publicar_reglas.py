@@ -0,0 +1,60 @@
+"""
+Comando de management para publicar una nueva versión de las reglas médicas.
+
+El archivo JSON contiene los parámetros a sobrescribir, por ejemplo:
+
+    {"edad_avanzada": 65, "dias_maximos_obesidad": 4}
+
+Los workers aplican la versión nueva en su siguiente petición.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+from django.db.models import Max
+
+from recommender.models import ConjuntoReglas
+from recommender.prolog_engine import MotorProlog
+
+
+class Command(BaseCommand):
+    help = 'Publica una nueva versión del conjunto de reglas médicas desde un archivo JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Archivo JSON con los parámetros de las reglas')
+        parser.add_argument(
+            '--descripcion',
+            default='',
+            help='Motivo del cambio de reglas',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8') as f:
+                parametros = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f'No se pudo leer el archivo de reglas: {e}')
+
+        if not isinstance(parametros, dict):
+            raise CommandError('El archivo debe contener un objeto JSON de parámetros')
+
+        ultima = ConjuntoReglas.objects.aggregate(Max('version'))['version__max'] or 0
+
+        # Compilar una vez aquí para detectar errores antes de que lo hagan los workers
+        try:
+            MotorProlog(parametros, version=ultima + 1)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            conjunto = ConjuntoReglas.objects.create(
+                version=ultima + 1,
+                parametros=parametros,
+                descripcion=options['descripcion'],
+            )
+        except IntegrityError:
+            raise CommandError('Otra versión se publicó al mismo tiempo; vuelve a intentarlo')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Reglas v{conjunto.version} publicadas')
+        )
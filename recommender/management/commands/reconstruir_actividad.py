@@ -0,0 +1,116 @@
+"""
+Comando de management para reconstruir o verificar los contadores de actividad.
+
+Recalcula los contadores de día (`SeguimientoEjercicio`), semana
+(`ProgresoSemanal`) y mes (`ProgresoMensual`) a partir de las filas de
+`EjercicioCompletado` y los compara con los mantenidos de forma incremental.
+Los totales programados de cada fila se conservan (editar el plan de una
+rutina no reescribe el historial); solo se recuentan los completados:
+
+    python manage.py reconstruir_actividad              # corrige las diferencias
+    python manage.py reconstruir_actividad --verificar  # solo informa
+    python manage.py reconstruir_actividad --usuario ana
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recommender.ejercicios import calcular_actividad, dia_completo
+from recommender.models import (
+    ProgresoMensual,
+    ProgresoSemanal,
+    SeguimientoEjercicio,
+    UsuarioPersonalizado,
+)
+
+# Modelo, campos de la clave natural y campos de contadores de cada nivel
+NIVELES = (
+    ('dias', SeguimientoEjercicio, ('usuario_id', 'rutina_id', 'fecha', 'dia_semana'),
+     ('num_completados', 'num_totales')),
+    ('semanas', ProgresoSemanal, ('usuario_id', 'rutina_id', 'inicio_semana'),
+     ('num_completados', 'num_totales', 'dias_completados')),
+    ('meses', ProgresoMensual, ('usuario_id', 'rutina_id', 'mes'),
+     ('num_completados', 'num_totales', 'dias_completados')),
+)
+
+
+def valores_esperados(clave, calculados, actual):
+    """Contadores que debería tener una fila; una fila sin actividad queda a cero."""
+    if clave in calculados:
+        return calculados[clave]
+    # Sin ejercicios completados: se conservan los programados
+    return (0, actual[1], 0)
+
+
+def contadores(modelo, campos, valores):
+    """Campos a escribir en una fila (el día lleva además su indicador `completado`)."""
+    cambios = dict(zip(campos, valores))
+    if modelo is SeguimientoEjercicio:
+        cambios['completado'] = dia_completo(*valores)
+    return cambios
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye (o verifica) los contadores de día, semana y mes a partir de los ejercicios completados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='No escribe nada; termina con error si algún contador difiere',
+        )
+        parser.add_argument(
+            '--usuario',
+            help='Solo este usuario (username)',
+        )
+
+    def handle(self, *args, **options):
+        usuario_ids = None
+        if options['usuario']:
+            usuario = UsuarioPersonalizado.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f'No existe el usuario {options["usuario"]}')
+            usuario_ids = [usuario.pk]
+
+        with transaction.atomic():
+            actividad = calcular_actividad(usuario_ids)
+            revisados = corregidos = 0
+            for nivel, modelo, clave_campos, campos in NIVELES:
+                calculados = getattr(actividad, nivel)
+                filas = modelo.objects.all()
+                if usuario_ids is not None:
+                    filas = filas.filter(usuario_id__in=usuario_ids)
+                guardadas = {
+                    tuple(fila[:len(clave_campos)]): (fila[-1], tuple(fila[len(clave_campos):-1]))
+                    for fila in filas.values_list(*clave_campos, *campos, 'pk')
+                }
+
+                for clave, (pk, actual) in guardadas.items():
+                    revisados += 1
+                    esperados = valores_esperados(clave, calculados, actual)
+                    if actual == esperados:
+                        continue
+                    corregidos += 1
+                    if options['verificar']:
+                        self.stdout.write(f'  {modelo.__name__} {clave}: {actual} en lugar de {esperados}')
+                        continue
+                    modelo.objects.filter(pk=pk).update(**contadores(modelo, campos, esperados))
+
+                # Filas que faltan
+                for clave, esperados in calculados.items():
+                    if clave in guardadas or not esperados[0]:
+                        continue
+                    revisados += 1
+                    corregidos += 1
+                    if options['verificar']:
+                        self.stdout.write(f'  {modelo.__name__} {clave}: falta la fila')
+                        continue
+                    modelo.objects.create(**dict(zip(clave_campos, clave)), **contadores(modelo, campos, esperados))
+
+            if options['verificar']:
+                if corregidos:
+                    raise CommandError(f'{corregidos} de {revisados} contadores no coinciden con los ejercicios completados')
+                self.stdout.write(self.style.SUCCESS(f'✓ {revisados} contadores verificados'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'✓ {revisados} contadores revisados, {corregidos} reconstruidos'
+                ))
@@ -0,0 +1,74 @@
+"""
+Comando de management para reconstruir o verificar los resúmenes de progreso.
+
+Recalcula el resumen de cada usuario con una agregación en la base de datos
+y lo compara con la fila mantenida de forma incremental:
+
+    python manage.py reconstruir_progreso              # corrige las diferencias
+    python manage.py reconstruir_progreso --verificar  # solo informa
+"""
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommender.models import ResumenProgreso, UsuarioPersonalizado
+from recommender.progreso import anotar_agregados, valores_agregados
+
+
+def diferencias(resumen, valores):
+    """Campos del resumen que no coinciden con los agregados (la suma con tolerancia)."""
+    if resumen is None:
+        return sorted(valores)
+    distintos = []
+    for campo, valor in valores.items():
+        actual = getattr(resumen, campo)
+        if campo == 'suma_imc':
+            if not math.isclose(actual, valor, rel_tol=1e-9, abs_tol=1e-6):
+                distintos.append(campo)
+        elif actual != valor:
+            distintos.append(campo)
+    return distintos
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye (o verifica) los resúmenes de progreso a partir de los seguimientos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='No escribe nada; termina con error si algún resumen difiere',
+        )
+
+    def handle(self, *args, **options):
+        usuarios = anotar_agregados(
+            UsuarioPersonalizado.objects.select_related('resumen_progreso').order_by('pk')
+        )
+        revisados = corregidos = 0
+        for usuario in usuarios.iterator():
+            try:
+                resumen = usuario.resumen_progreso
+            except ResumenProgreso.DoesNotExist:
+                resumen = None
+            valores = valores_agregados(usuario)
+            if resumen is None and not valores['total_seguimientos']:
+                continue
+            revisados += 1
+
+            distintos = diferencias(resumen, valores)
+            if not distintos:
+                continue
+            corregidos += 1
+            if options['verificar']:
+                self.stdout.write(f'  {usuario.username}: difiere en {", ".join(distintos)}')
+            else:
+                ResumenProgreso.objects.update_or_create(usuario=usuario, defaults=valores)
+
+        if options['verificar']:
+            if corregidos:
+                raise CommandError(f'{corregidos} de {revisados} resúmenes no coinciden con los seguimientos')
+            self.stdout.write(self.style.SUCCESS(f'✓ {revisados} resúmenes verificados'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {revisados} resúmenes revisados, {corregidos} reconstruidos'
+            ))
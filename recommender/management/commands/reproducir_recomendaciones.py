@@ -0,0 +1,192 @@
+"""
+Comando de management para grabar y reproducir entradas del motor.
+
+Grabar (en producción), sin datos identificables:
+
+    python manage.py reproducir_recomendaciones grabar entradas.jsonl.gz
+
+Reproducir contra dos builds del motor y comparar latencias y rankings:
+
+    python manage.py reproducir_recomendaciones comparar entradas.jsonl.gz \\
+        --base v3 --candidato v4
+
+Un build es 'vigente', 'defecto', 'alternativo' (motor en Python puro), 'vN'
+(versión N del conjunto de reglas), una ruta importable a una fábrica que
+devuelve un motor, o un .json guardado con --guardar. Lo último permite
+comparar dos revisiones del código: se guarda el resultado con una y se
+compara desde la otra.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from recommender import reproduccion
+from recommender.almacen_reglas import obtener_motor, version_vigente
+from recommender.catalogo import obtener_instantanea
+from recommender.models import ConjuntoReglas, PerfilMedico, UsuarioPersonalizado
+from recommender.motor_recomendacion import MotorRecomendacion
+from recommender.prolog_engine import MotorLogicoAlternativo, MotorProlog
+
+
+def construir_motor(build: str):
+    """
+    Construye el motor de un build.
+
+    Args:
+        build: 'vigente', 'defecto', 'alternativo', 'vN' o ruta a una fábrica
+
+    Raises:
+        CommandError: Si el build no existe
+    """
+    if build == 'vigente':
+        return obtener_motor()
+    if build == 'defecto':
+        return MotorProlog()
+    if build == 'alternativo':
+        return MotorLogicoAlternativo()
+    if build[:1] == 'v' and build[1:].isdigit():
+        version = int(build[1:])
+        conjunto = ConjuntoReglas.objects.filter(version=version).first()
+        if conjunto is None:
+            raise CommandError(f'No existe la versión de reglas {version}')
+        return MotorProlog(conjunto.parametros, version=version)
+    try:
+        return import_string(build)()
+    except ImportError as e:
+        raise CommandError(f'Build de motor desconocido "{build}": {e}')
+
+
+class Command(BaseCommand):
+    help = 'Graba entradas anónimas del motor y las reproduce contra dos builds'
+
+    def add_arguments(self, parser):
+        acciones = parser.add_subparsers(dest='accion', required=True)
+
+        grabar = acciones.add_parser('grabar', help='Graba las entradas de los usuarios registrados')
+        grabar.add_argument('archivo', help='Archivo de salida (JSON Lines con gzip)')
+        grabar.add_argument('--limite', type=int, default=None, help='Máximo de usuarios a grabar')
+
+        comparar = acciones.add_parser('comparar', help='Reproduce una grabación con dos builds')
+        comparar.add_argument('archivo', help='Archivo escrito por "grabar"')
+        comparar.add_argument('--base', default='vigente', help='Build de referencia')
+        comparar.add_argument('--candidato', default='vigente', help='Build a evaluar')
+        comparar.add_argument('-k', type=int, default=3, help='Tamaño del top-k a comparar')
+        comparar.add_argument('--guardar', help='Guarda el resultado del candidato en este .json')
+        comparar.add_argument('--ejemplos', type=int, default=10, help='Diferencias a mostrar')
+        comparar.add_argument(
+            '--estricto',
+            action='store_true',
+            help='Termina con error si algún ranking difiere',
+        )
+
+    def handle(self, *args, **options):
+        if options['accion'] == 'grabar':
+            self._grabar(options)
+        else:
+            self._comparar(options)
+
+    def _grabar(self, options):
+        motor = obtener_motor()
+        recomendador = MotorRecomendacion()
+        usuarios = (
+            UsuarioPersonalizado.objects
+            .filter(altura__isnull=False, peso__isnull=False)
+            .select_related('perfil_medico')
+            .order_by('pk')
+        )
+        if options['limite']:
+            usuarios = usuarios[:options['limite']]
+
+        def entradas():
+            for usuario in usuarios.iterator():
+                try:
+                    perfil = usuario.perfil_medico
+                except PerfilMedico.DoesNotExist:
+                    perfil = None
+                usuario_dict = recomendador._usuario_a_dict(usuario, perfil, motor)
+                yield reproduccion.anonimizar(usuario_dict, usuario.condiciones_salud)
+
+        catalogo = obtener_instantanea()
+        total = reproduccion.grabar(options['archivo'], entradas(), {
+            'catalogo_version': catalogo.version,
+            'reglas_version': version_vigente(),
+            'fecha': timezone.now().isoformat(),
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {total} entradas grabadas en {options["archivo"]} (catálogo v{catalogo.version})'
+        ))
+
+    def _comparar(self, options):
+        try:
+            cabecera, entradas = reproduccion.cargar(options['archivo'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo leer la grabación: {e}')
+
+        catalogo = obtener_instantanea()
+        if cabecera.get('catalogo_version') != catalogo.version:
+            self.stdout.write(self.style.WARNING(
+                f'La grabación es del catálogo v{cabecera.get("catalogo_version")} y el actual es '
+                f'v{catalogo.version}: los rankings pueden no ser comparables con producción'
+            ))
+
+        base = self._ejecutar(options['base'], entradas, catalogo, options['k'])
+        candidato = self._ejecutar(options['candidato'], entradas, catalogo, options['k'])
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as f:
+                json.dump(candidato, f)
+
+        self.stdout.write(f'\n{len(entradas)} entradas, top-{options["k"]}')
+        self.stdout.write(f'{"etapa":<15} {"base p50/p95/p99 ms":>28} {"candidato p50/p95/p99 ms":>28} {"p50":>7}')
+        for etapa in reproduccion.ETAPAS:
+            a = base['latencias_ms'][etapa]
+            b = candidato['latencias_ms'][etapa]
+            mejora = f'{a["p50"] / b["p50"]:.2f}x' if b['p50'] else '-'
+            self.stdout.write(
+                f'{etapa:<15} {self._percentiles(a):>28} {self._percentiles(b):>28} {mejora:>7}'
+            )
+
+        try:
+            diferencias = reproduccion.comparar_salidas(base['salidas'], candidato['salidas'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not diferencias['topk']:
+            self.stdout.write(self.style.SUCCESS('\n✓ Rankings idénticos en todas las entradas'))
+            return
+
+        self.stdout.write(self.style.WARNING(
+            f'\nDiferencias: top-1 en {diferencias["top1"]} entradas, '
+            f'top-{options["k"]} en {diferencias["topk"]}'
+        ))
+        for indice, a, b in diferencias['ejemplos'][:options['ejemplos']]:
+            self.stdout.write(f'  #{indice}: {a} -> {b}  {json.dumps(entradas[indice], sort_keys=True)}')
+        if options['estricto']:
+            raise CommandError('Los rankings del candidato difieren de los de la base')
+
+    def _ejecutar(self, build, entradas, catalogo, k):
+        """Reproduce las entradas con un build, o carga el resultado guardado."""
+        if build.endswith('.json'):
+            try:
+                with open(build, encoding='utf-8') as f:
+                    resultado = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f'No se pudo leer el resultado guardado {build}: {e}')
+            if resultado.get('k') != k:
+                raise CommandError(f'{build} se guardó con k={resultado.get("k")}, no k={k}')
+            return resultado
+
+        motor = construir_motor(build)
+        latencias, salidas = reproduccion.reproducir(entradas, motor, catalogo, k)
+        return {
+            'build': build,
+            'k': k,
+            'catalogo_version': catalogo.version,
+            'latencias_ms': reproduccion.resumir_latencias(latencias),
+            'salidas': salidas,
+        }
+
+    @staticmethod
+    def _percentiles(resumen):
+        return f'{resumen["p50"]:.3f}/{resumen["p95"]:.3f}/{resumen["p99"]:.3f}'
@@ -0,0 +1,72 @@
+"""
+Memoización acotada (LRU) segura entre hilos.
+
+Pensada para resultados de funciones puras sobre dominios pequeños (p. ej.
+la evaluación de condiciones médicas por celda de reglas): los valores
+guardados deben ser inmutables, porque se comparten entre llamadores.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+class MemoLRU:
+    """
+    Diccionario acotado que descarta la entrada usada hace más tiempo.
+
+    Args:
+        capacidad: Número máximo de entradas
+    """
+
+    def __init__(self, capacidad: int = 1024):
+        if capacidad < 1:
+            raise ValueError("La capacidad del memo debe ser al menos 1")
+        self.capacidad = capacidad
+        self._entradas: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor memorizado de `clave` o lo calcula y lo guarda.
+
+        El cálculo se hace fuera del lock: dos hilos pueden calcular la misma
+        clave a la vez, y se queda el primer valor guardado.
+        """
+        with self._lock:
+            try:
+                valor = self._entradas[clave]
+            except KeyError:
+                self.fallos += 1
+            else:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return valor
+
+        valor = calcular()
+        with self._lock:
+            valor = self._entradas.setdefault(clave, valor)
+            self._entradas.move_to_end(clave)
+            if len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+        return valor
+
+    def limpiar(self) -> None:
+        """Vacía el memo y reinicia las estadísticas."""
+        with self._lock:
+            self._entradas.clear()
+            self.aciertos = 0
+            self.fallos = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos, fallos, tamaño y tasa de aciertos."""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'tamano': len(self._entradas),
+                'capacidad': self.capacidad,
+                'tasa_aciertos': self.aciertos / total if total else 0.0,
+            }
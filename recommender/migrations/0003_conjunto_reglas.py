@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0002_rutina_condiciones_contraindicadas_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConjuntoReglas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(help_text='Versión del conjunto de reglas (creciente)', unique=True)),
+                ('parametros', models.JSONField(blank=True, default=dict, help_text='Umbrales que sobrescriben los valores por defecto de las reglas')),
+                ('descripcion', models.TextField(blank=True, help_text='Motivo del cambio de reglas')),
+                ('activo', models.BooleanField(default=True, help_text='Solo los conjuntos activos pueden ser la versión vigente')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Conjunto de Reglas',
+                'verbose_name_plural': 'Conjuntos de Reglas',
+                'ordering': ['-version'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:25
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def crear_version_inicial(apps, schema_editor):
+    VersionCatalogo = apps.get_model('recommender', 'VersionCatalogo')
+    VersionCatalogo.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0003_conjunto_reglas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1, help_text='Se incrementa con cada cambio del catálogo de rutinas')),
+                ('fecha_actualizacion', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento del último cambio del catálogo')),
+            ],
+            options={
+                'verbose_name': 'Versión del Catálogo',
+                'verbose_name_plural': 'Versión del Catálogo',
+            },
+        ),
+        migrations.RunPython(crear_version_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0004_version_catalogo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenProgreso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_seguimientos', models.PositiveIntegerField(default=0)),
+                ('suma_imc', models.FloatField(default=0.0, help_text='Suma del IMC de todos los seguimientos')),
+                ('imc_inicial', models.FloatField(blank=True, help_text='IMC del seguimiento más antiguo', null=True)),
+                ('imc_final', models.FloatField(blank=True, help_text='IMC del seguimiento más reciente', null=True)),
+                ('fecha_ultimo', models.DateField(blank=True, help_text='Fecha del seguimiento más reciente', null=True)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_progreso', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen de Progreso',
+                'verbose_name_plural': 'Resúmenes de Progreso',
+            },
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:35
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def migrar_completados(apps, schema_editor):
+    """Pasa las listas JSON de ejercicios completados a filas y contadores."""
+    SeguimientoEjercicio = apps.get_model('recommender', 'SeguimientoEjercicio')
+    EjercicioCompletado = apps.get_model('recommender', 'EjercicioCompletado')
+    ProgresoSemanal = apps.get_model('recommender', 'ProgresoSemanal')
+
+    semanas = {}
+    totales_rutina = {}
+    for seguimiento in SeguimientoEjercicio.objects.select_related('rutina').iterator():
+        completados = list(dict.fromkeys(str(e)[:200] for e in seguimiento.ejercicios_completados or []))
+        EjercicioCompletado.objects.bulk_create([
+            EjercicioCompletado(
+                usuario_id=seguimiento.usuario_id,
+                rutina_id=seguimiento.rutina_id,
+                fecha=seguimiento.fecha,
+                dia_semana=seguimiento.dia_semana,
+                ejercicio=ejercicio,
+            )
+            for ejercicio in completados
+        ])
+        seguimiento.num_completados = len(completados)
+        seguimiento.num_totales = len(seguimiento.ejercicios_totales or [])
+        seguimiento.save(update_fields=['num_completados', 'num_totales'])
+
+        plan = seguimiento.rutina.plan_semanal or {}
+        totales_rutina[seguimiento.rutina_id] = sum(
+            len(ejercicios) for ejercicios in plan.values() if isinstance(ejercicios, list)
+        )
+        inicio = seguimiento.fecha - timedelta(days=seguimiento.fecha.weekday())
+        clave = (seguimiento.usuario_id, seguimiento.rutina_id, inicio)
+        semanas[clave] = semanas.get(clave, 0) + len(completados)
+
+    ProgresoSemanal.objects.bulk_create([
+        ProgresoSemanal(
+            usuario_id=usuario_id,
+            rutina_id=rutina_id,
+            inicio_semana=inicio,
+            num_completados=completados,
+            num_totales=totales_rutina[rutina_id],
+        )
+        for (usuario_id, rutina_id, inicio), completados in semanas.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0005_resumen_progreso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seguimientoejercicio',
+            name='num_completados',
+            field=models.PositiveIntegerField(default=0, help_text='Ejercicios completados en este día'),
+        ),
+        migrations.AddField(
+            model_name='seguimientoejercicio',
+            name='num_totales',
+            field=models.PositiveIntegerField(default=0, help_text='Ejercicios programados para este día'),
+        ),
+        migrations.CreateModel(
+            name='ProgresoSemanal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio_semana', models.DateField(help_text='Lunes de la semana')),
+                ('num_completados', models.PositiveIntegerField(default=0, help_text='Ejercicios completados en la semana')),
+                ('num_totales', models.PositiveIntegerField(default=0, help_text='Ejercicios programados en la semana')),
+                ('rutina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_semanales', to='recommender.rutina')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_semanales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progreso Semanal',
+                'verbose_name_plural': 'Progresos Semanales',
+            },
+        ),
+        migrations.CreateModel(
+            name='EjercicioCompletado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Fecha del entrenamiento')),
+                ('dia_semana', models.CharField(help_text='Día de la semana (Lunes, Martes, etc.)', max_length=20)),
+                ('ejercicio', models.CharField(help_text='Nombre del ejercicio completado', max_length=200)),
+                ('fecha_registro', models.DateTimeField(auto_now_add=True)),
+                ('rutina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejercicios_completados', to='recommender.rutina')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejercicios_completados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ejercicio Completado',
+                'verbose_name_plural': 'Ejercicios Completados',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='progresosemanal',
+            constraint=models.UniqueConstraint(fields=('usuario', 'rutina', 'inicio_semana'), name='progreso_semanal_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='ejerciciocompletado',
+            constraint=models.UniqueConstraint(fields=('usuario', 'rutina', 'fecha', 'dia_semana', 'ejercicio'), name='ejercicio_completado_unico'),
+        ),
+        migrations.RunPython(migrar_completados, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='seguimientoejercicio',
+            name='ejercicios_completados',
+        ),
+    ]
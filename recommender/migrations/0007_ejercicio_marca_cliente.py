@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0006_ejercicios_completados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ejerciciocompletado',
+            name='marca_cliente',
+            field=models.BigIntegerField(blank=True, help_text='Momento del toque en el cliente (ms desde epoch), en sincronizaciones por lotes', null=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:10
+
+from django.db import migrations
+
+DIAS_SEMANA = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+
+
+def normalizar_planes(apps, schema_editor):
+    """Guarda el plan semanal de cada rutina como {día: [ejercicio, ...]}."""
+    Rutina = apps.get_model('recommender', 'Rutina')
+    orden = {dia: i for i, dia in enumerate(DIAS_SEMANA)}
+    for rutina in Rutina.objects.iterator():
+        plan = {}
+        for dia, contenido in (rutina.plan_semanal or {}).items():
+            if isinstance(contenido, str):
+                contenido = [contenido]
+            elif not isinstance(contenido, (list, tuple)):
+                continue
+            lista = [
+                texto for texto in (str(e).strip()[:200] for e in contenido)
+                if texto and not texto.lower().startswith('descanso')
+            ]
+            if lista:
+                plan[dia] = lista
+        if not plan:
+            ejercicios = rutina.ejercicios if isinstance(rutina.ejercicios, list) else []
+            lista = [str(e)[:200] for e in ejercicios]
+            plan = {
+                dia: lista or [f'Ejercicio {i + 1}']
+                for i, dia in enumerate(DIAS_SEMANA[:rutina.dias_semana or 0])
+            }
+        plan = dict(sorted(plan.items(), key=lambda par: orden.get(par[0], len(orden))))
+        if plan != rutina.plan_semanal:
+            rutina.plan_semanal = plan
+            rutina.save(update_fields=['plan_semanal'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0007_ejercicio_marca_cliente'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalizar_planes, migrations.RunPython.noop),
+    ]
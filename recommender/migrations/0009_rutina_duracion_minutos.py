@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:40
+
+import re
+
+from django.db import migrations, models
+
+
+def rellenar_duracion(apps, schema_editor):
+    """Toma los minutos del texto de duración ('45 minutos' -> 45)."""
+    Rutina = apps.get_model('recommender', 'Rutina')
+    for rutina in Rutina.objects.iterator():
+        numero = re.search(r'\d+', rutina.duracion or '')
+        if numero:
+            rutina.duracion_minutos = int(numero.group())
+            rutina.save(update_fields=['duracion_minutos'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0008_normalizar_plan_semanal'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rutina',
+            name='duracion_minutos',
+            field=models.PositiveIntegerField(default=0, help_text='Duración por sesión en minutos (para filtrar y ordenar)'),
+        ),
+        migrations.RunPython(rellenar_duracion, migrations.RunPython.noop),
+    ]
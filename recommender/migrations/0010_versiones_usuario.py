@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0009_rutina_duracion_minutos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionesUsuario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('perfil', models.PositiveBigIntegerField(default=0, help_text='Cambios del usuario o de su perfil médico')),
+                ('recomendaciones', models.PositiveBigIntegerField(default=0, help_text='Cambios de sus recomendaciones')),
+                ('seguimientos', models.PositiveBigIntegerField(default=0, help_text='Cambios de sus seguimientos')),
+                ('ejercicios', models.PositiveBigIntegerField(default=0, help_text='Ejercicios marcados o desmarcados')),
+                ('fecha_actualizacion', models.DateTimeField(default=django.utils.timezone.now, help_text='Momento del último cambio de cualquiera de los contadores')),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='versiones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Versiones de Usuario',
+                'verbose_name_plural': 'Versiones de Usuarios',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0010_versiones_usuario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recomendacionmedica',
+            index=models.Index(fields=['usuario', '-fecha_recomendacion', '-id'], name='recomendacion_historial_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0011_recomendacion_historial_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='seguimientousuario',
+            index=models.Index(fields=['usuario', '-fecha', '-id'], name='seguimiento_historial_idx'),
+        ),
+    ]
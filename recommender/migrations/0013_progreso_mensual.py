@@ -0,0 +1,93 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:51
+
+import calendar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+DIAS_SEMANA = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+
+
+def calcular_rollups(apps, schema_editor):
+    """Días completados por semana y contadores mensuales a partir de los contadores diarios."""
+    SeguimientoEjercicio = apps.get_model('recommender', 'SeguimientoEjercicio')
+    ProgresoSemanal = apps.get_model('recommender', 'ProgresoSemanal')
+    ProgresoMensual = apps.get_model('recommender', 'ProgresoMensual')
+
+    planes = {}
+    semanas = {}
+    meses = {}
+    for dia in SeguimientoEjercicio.objects.select_related('rutina').iterator():
+        planes.setdefault(dia.rutina_id, dia.rutina.plan_semanal or {})
+        completo = int(dia.num_totales > 0 and dia.num_completados == dia.num_totales)
+        if completo:
+            inicio = dia.fecha - timedelta(days=dia.fecha.weekday())
+            clave = (dia.usuario_id, dia.rutina_id, inicio)
+            semanas[clave] = semanas.get(clave, 0) + 1
+        clave = (dia.usuario_id, dia.rutina_id, dia.fecha.replace(day=1))
+        completados, dias = meses.get(clave, (0, 0))
+        meses[clave] = (completados + dia.num_completados, dias + completo)
+
+    for (usuario_id, rutina_id, inicio), dias in semanas.items():
+        ProgresoSemanal.objects.filter(
+            usuario_id=usuario_id,
+            rutina_id=rutina_id,
+            inicio_semana=inicio,
+        ).update(dias_completados=dias)
+
+    def programados(plan, mes):
+        primero = mes.weekday()
+        return sum(
+            len(plan.get(DIAS_SEMANA[(primero + i) % 7]) or [])
+            for i in range(calendar.monthrange(mes.year, mes.month)[1])
+        )
+
+    ProgresoMensual.objects.bulk_create([
+        ProgresoMensual(
+            usuario_id=usuario_id,
+            rutina_id=rutina_id,
+            mes=mes,
+            num_completados=completados,
+            num_totales=programados(planes[rutina_id], mes),
+            dias_completados=dias,
+        )
+        for (usuario_id, rutina_id, mes), (completados, dias) in meses.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0012_seguimiento_historial_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='progresosemanal',
+            name='dias_completados',
+            field=models.PositiveIntegerField(default=0, help_text='Días de la semana con todos sus ejercicios completados'),
+        ),
+        migrations.CreateModel(
+            name='ProgresoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primer día del mes')),
+                ('num_completados', models.PositiveIntegerField(default=0, help_text='Ejercicios completados en el mes')),
+                ('num_totales', models.PositiveIntegerField(default=0, help_text='Ejercicios programados en el mes')),
+                ('dias_completados', models.PositiveIntegerField(default=0, help_text='Días del mes con todos sus ejercicios completados')),
+                ('rutina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_mensuales', to='recommender.rutina')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_mensuales', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Progreso Mensual',
+                'verbose_name_plural': 'Progresos Mensuales',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='progresomensual',
+            constraint=models.UniqueConstraint(fields=('usuario', 'rutina', 'mes'), name='progreso_mensual_unico'),
+        ),
+        migrations.RunPython(calcular_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0013_progreso_mensual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjercicioDesmarcado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(help_text='Fecha del entrenamiento')),
+                ('dia_semana', models.CharField(help_text='Día de la semana (Lunes, Martes, etc.)', max_length=20)),
+                ('ejercicio', models.CharField(help_text='Nombre del ejercicio desmarcado', max_length=200)),
+                ('marca_cliente', models.BigIntegerField(help_text='Momento del desmarcado en el cliente (ms desde epoch)')),
+                ('rutina', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejercicios_desmarcados', to='recommender.rutina')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ejercicios_desmarcados', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Ejercicio Desmarcado',
+                'verbose_name_plural': 'Ejercicios Desmarcados',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='ejerciciodesmarcado',
+            constraint=models.UniqueConstraint(fields=('usuario', 'rutina', 'fecha', 'dia_semana', 'ejercicio'), name='ejercicio_desmarcado_unico'),
+        ),
+    ]
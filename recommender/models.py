@@ -183,6 +183,10 @@ class Rutina(models.Model):
         max_length=50,
         help_text="Duración estimada por sesión (ej: 45 minutos)"
     )
+    duracion_minutos = models.PositiveIntegerField(
+        default=0,
+        help_text="Duración por sesión en minutos (para filtrar y ordenar)"
+    )
     intensidad = models.CharField(
         max_length=20,
         choices=INTENSIDAD_OPCIONES,
@@ -265,6 +269,13 @@ class RecomendacionMedica(models.Model):
         verbose_name = 'Recomendación Médica'
         verbose_name_plural = 'Recomendaciones Médicas'
         ordering = ['-fecha_recomendacion']
+        indexes = [
+            # Historial paginado por clave (ver paginacion.py)
+            models.Index(
+                fields=['usuario', '-fecha_recomendacion', '-id'],
+                name='recomendacion_historial_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"Recomendación para {self.usuario.username} - {self.rutina_recomendada.nombre}"
@@ -316,6 +327,10 @@ class SeguimientoUsuario(models.Model):
         verbose_name = 'Seguimiento'
         verbose_name_plural = 'Seguimientos'
         ordering = ['-fecha']
+        indexes = [
+            # Historial paginado por clave y serie por fechas (ver paginacion.py)
+            models.Index(fields=['usuario', '-fecha', '-id'], name='seguimiento_historial_idx'),
+        ]
     
     def __str__(self):
         return f"Seguimiento de {self.usuario.username} - {self.fecha}"
@@ -343,14 +358,19 @@ class SeguimientoEjercicio(models.Model):
         max_length=20,
         help_text="Día de la semana (Lunes, Martes, etc.)"
     )
-    ejercicios_completados = models.JSONField(
-        default=list,
-        help_text="Lista de ejercicios completados en este día"
-    )
     ejercicios_totales = models.JSONField(
         default=list,
         help_text="Lista de todos los ejercicios programados para este día"
     )
+    # Contadores mantenidos al marcar ejercicios (ver ejercicios.py)
+    num_completados = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios completados en este día"
+    )
+    num_totales = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios programados para este día"
+    )
     completado = models.BooleanField(
         default=False,
         help_text="Indica si el día completo fue completado"
@@ -372,10 +392,349 @@ class SeguimientoEjercicio(models.Model):
     
     def calcular_progreso_dia(self) -> float:
         """Calcula el porcentaje de progreso del día (0-100)."""
-        if not self.ejercicios_totales:
+        if not self.num_totales:
             return 0.0
-        completados = len(self.ejercicios_completados)
-        totales = len(self.ejercicios_totales)
-        if totales == 0:
+        return round((self.num_completados / self.num_totales) * 100, 2)
+
+
+class EjercicioCompletado(models.Model):
+    """
+    Un ejercicio marcado como completado en un día de entrenamiento.
+    
+    Una fila por ejercicio y día: marcar es un INSERT y desmarcar un DELETE,
+    y la restricción única evita duplicados entre toques concurrentes.
+    """
+    usuario = models.ForeignKey(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='ejercicios_completados'
+    )
+    rutina = models.ForeignKey(
+        Rutina,
+        on_delete=models.CASCADE,
+        related_name='ejercicios_completados'
+    )
+    fecha = models.DateField(
+        help_text="Fecha del entrenamiento"
+    )
+    dia_semana = models.CharField(
+        max_length=20,
+        help_text="Día de la semana (Lunes, Martes, etc.)"
+    )
+    ejercicio = models.CharField(
+        max_length=200,
+        help_text="Nombre del ejercicio completado"
+    )
+    marca_cliente = models.BigIntegerField(
+        null=True,
+        blank=True,
+        help_text="Momento del toque en el cliente (ms desde epoch), en sincronizaciones por lotes"
+    )
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Ejercicio Completado'
+        verbose_name_plural = 'Ejercicios Completados'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'rutina', 'fecha', 'dia_semana', 'ejercicio'],
+                name='ejercicio_completado_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.ejercicio} ({self.dia_semana} {self.fecha})"
+
+
+class EjercicioDesmarcado(models.Model):
+    """
+    Último desmarcado sincronizado por lotes de un ejercicio y día.
+    
+    Desmarcar borra la fila de EjercicioCompletado y con ella su marca de
+    tiempo; esta fila la conserva para que un marcado más antiguo que llegue
+    después (reenviado o reordenado) no vuelva a marcar el ejercicio.
+    """
+    usuario = models.ForeignKey(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='ejercicios_desmarcados'
+    )
+    rutina = models.ForeignKey(
+        Rutina,
+        on_delete=models.CASCADE,
+        related_name='ejercicios_desmarcados'
+    )
+    fecha = models.DateField(
+        help_text="Fecha del entrenamiento"
+    )
+    dia_semana = models.CharField(
+        max_length=20,
+        help_text="Día de la semana (Lunes, Martes, etc.)"
+    )
+    ejercicio = models.CharField(
+        max_length=200,
+        help_text="Nombre del ejercicio desmarcado"
+    )
+    marca_cliente = models.BigIntegerField(
+        help_text="Momento del desmarcado en el cliente (ms desde epoch)"
+    )
+    
+    class Meta:
+        verbose_name = 'Ejercicio Desmarcado'
+        verbose_name_plural = 'Ejercicios Desmarcados'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'rutina', 'fecha', 'dia_semana', 'ejercicio'],
+                name='ejercicio_desmarcado_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.ejercicio} desmarcado ({self.dia_semana} {self.fecha})"
+
+
+class ProgresoSemanal(models.Model):
+    """
+    Contadores de ejercicios de una rutina en una semana (lunes a domingo).
+    
+    Se mantienen al marcar ejercicios: el progreso semanal es la lectura de
+    una fila.
+    """
+    usuario = models.ForeignKey(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='progresos_semanales'
+    )
+    rutina = models.ForeignKey(
+        Rutina,
+        on_delete=models.CASCADE,
+        related_name='progresos_semanales'
+    )
+    inicio_semana = models.DateField(
+        help_text="Lunes de la semana"
+    )
+    num_completados = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios completados en la semana"
+    )
+    num_totales = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios programados en la semana"
+    )
+    dias_completados = models.PositiveIntegerField(
+        default=0,
+        help_text="Días de la semana con todos sus ejercicios completados"
+    )
+    
+    class Meta:
+        verbose_name = 'Progreso Semanal'
+        verbose_name_plural = 'Progresos Semanales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'rutina', 'inicio_semana'],
+                name='progreso_semanal_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.rutina.nombre} (semana del {self.inicio_semana})"
+    
+    def calcular_progreso(self) -> float:
+        """Calcula el porcentaje de progreso de la semana (0-100)."""
+        if not self.num_totales:
+            return 0.0
+        return round((self.num_completados / self.num_totales) * 100, 2)
+
+
+class ProgresoMensual(models.Model):
+    """
+    Contadores de ejercicios de una rutina en un mes natural.
+    
+    Se mantienen al marcar ejercicios, como ProgresoSemanal; los informes
+    mensuales leen estas filas en lugar de recorrer los seguimientos diarios.
+    """
+    usuario = models.ForeignKey(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='progresos_mensuales'
+    )
+    rutina = models.ForeignKey(
+        Rutina,
+        on_delete=models.CASCADE,
+        related_name='progresos_mensuales'
+    )
+    mes = models.DateField(
+        help_text="Primer día del mes"
+    )
+    num_completados = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios completados en el mes"
+    )
+    num_totales = models.PositiveIntegerField(
+        default=0,
+        help_text="Ejercicios programados en el mes"
+    )
+    dias_completados = models.PositiveIntegerField(
+        default=0,
+        help_text="Días del mes con todos sus ejercicios completados"
+    )
+    
+    class Meta:
+        verbose_name = 'Progreso Mensual'
+        verbose_name_plural = 'Progresos Mensuales'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'rutina', 'mes'],
+                name='progreso_mensual_unico'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.usuario.username} - {self.rutina.nombre} ({self.mes:%Y-%m})"
+    
+    def calcular_progreso(self) -> float:
+        """Calcula el porcentaje de progreso del mes (0-100)."""
+        if not self.num_totales:
             return 0.0
-        return round((completados / totales) * 100, 2)
+        return round((self.num_completados / self.num_totales) * 100, 2)
+
+
+class ConjuntoReglas(models.Model):
+    """
+    Conjunto versionado de parámetros de las reglas médicas.
+    
+    Los workers usan la versión activa más alta; publicar una versión nueva
+    se aplica en la siguiente petición sin reiniciar (ver almacen_reglas).
+    """
+    version = models.PositiveIntegerField(
+        unique=True,
+        help_text="Versión del conjunto de reglas (creciente)"
+    )
+    parametros = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Umbrales que sobrescriben los valores por defecto de las reglas"
+    )
+    descripcion = models.TextField(
+        blank=True,
+        help_text="Motivo del cambio de reglas"
+    )
+    activo = models.BooleanField(
+        default=True,
+        help_text="Solo los conjuntos activos pueden ser la versión vigente"
+    )
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = 'Conjunto de Reglas'
+        verbose_name_plural = 'Conjuntos de Reglas'
+        ordering = ['-version']
+    
+    def __str__(self):
+        return f"Reglas v{self.version}{'' if self.activo else ' (inactivo)'}"
+    
+    def clean(self):
+        """Valida los parámetros antes de guardarlos."""
+        from django.core.exceptions import ValidationError
+        from .parametros_reglas import normalizar_parametros
+        try:
+            normalizar_parametros(self.parametros)
+        except ValueError as e:
+            raise ValidationError({'parametros': str(e)})
+
+
+class VersionCatalogo(models.Model):
+    """
+    Versión del catálogo de rutinas (fila única).
+    
+    Se incrementa en la misma transacción que cualquier alta, cambio o baja
+    de una rutina (ver catalogo.py); los índices y cachés derivados del
+    catálogo se construyen por versión.
+    """
+    version = models.PositiveBigIntegerField(
+        default=1,
+        help_text="Se incrementa con cada cambio del catálogo de rutinas"
+    )
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now,
+        help_text="Momento del último cambio del catálogo"
+    )
+    
+    class Meta:
+        verbose_name = 'Versión del Catálogo'
+        verbose_name_plural = 'Versión del Catálogo'
+    
+    def __str__(self):
+        return f"Catálogo v{self.version}"
+
+
+class VersionesUsuario(models.Model):
+    """
+    Contadores de versión de los datos de un usuario.
+    
+    Cada grupo de datos tiene su contador, que se incrementa en la misma
+    transacción que el cambio (ver versiones.py). Las vistas derivan de ellos
+    el ETag y el Last-Modified sin consultar los datos.
+    """
+    usuario = models.OneToOneField(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='versiones'
+    )
+    perfil = models.PositiveBigIntegerField(default=0, help_text="Cambios del usuario o de su perfil médico")
+    recomendaciones = models.PositiveBigIntegerField(default=0, help_text="Cambios de sus recomendaciones")
+    seguimientos = models.PositiveBigIntegerField(default=0, help_text="Cambios de sus seguimientos")
+    ejercicios = models.PositiveBigIntegerField(default=0, help_text="Ejercicios marcados o desmarcados")
+    fecha_actualizacion = models.DateTimeField(
+        default=timezone.now,
+        help_text="Momento del último cambio de cualquiera de los contadores"
+    )
+    
+    class Meta:
+        verbose_name = 'Versiones de Usuario'
+        verbose_name_plural = 'Versiones de Usuarios'
+    
+    def __str__(self):
+        return f"Versiones de {self.usuario.username}"
+
+
+class ResumenProgreso(models.Model):
+    """
+    Resumen acumulado de los seguimientos de un usuario.
+    
+    Se actualiza de forma incremental al registrar cada seguimiento (ver
+    progreso.py), así que el progreso se lee de una sola fila sin recorrer
+    el historial.
+    """
+    usuario = models.OneToOneField(
+        UsuarioPersonalizado,
+        on_delete=models.CASCADE,
+        related_name='resumen_progreso'
+    )
+    total_seguimientos = models.PositiveIntegerField(default=0)
+    suma_imc = models.FloatField(
+        default=0.0,
+        help_text="Suma del IMC de todos los seguimientos"
+    )
+    imc_inicial = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="IMC del seguimiento más antiguo"
+    )
+    imc_final = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="IMC del seguimiento más reciente"
+    )
+    fecha_ultimo = models.DateField(
+        null=True,
+        blank=True,
+        help_text="Fecha del seguimiento más reciente"
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen de Progreso'
+        verbose_name_plural = 'Resúmenes de Progreso'
+    
+    def __str__(self):
+        return f"Progreso de {self.usuario.username} ({self.total_seguimientos} seguimientos)"
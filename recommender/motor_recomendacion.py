@@ -3,7 +3,6 @@ Motor de Recomendación Híbrido.
 Integra los tres paradigmas: Imperativo, Funcional y Lógico.
 """
 from typing import Dict, List, Optional, Tuple
-from functools import reduce
 from django.db.models import QuerySet
 
 from .models import Rutina, UsuarioPersonalizado, RecomendacionMedica, PerfilMedico
@@ -11,10 +10,12 @@ from .processor import (
     calcular_imc, 
     clasificar_imc,
     calcular_compatibilidad,
-    filtrar_rutinas_por_seguridad,
     calcular_calorias_estimadas
 )
-from .prolog_engine import motor_prolog
+from .progreso import obtener_progreso
+from .almacen_reglas import obtener_motor
+from .catalogo import InstantaneaCatalogo, obtener_instantanea
+from .nucleo_reglas import RAZON_SEGURA
 from . import logic_rules
 
 
@@ -26,8 +27,10 @@ class MotorRecomendacion:
     - Lógico: Inferencia médica con Prolog
     """
     
-    def __init__(self):
-        self.motor_prolog = motor_prolog
+    @property
+    def motor_prolog(self):
+        """Motor lógico de la versión de reglas vigente."""
+        return obtener_motor()
     
     def generar_recomendacion_completa(self, usuario: UsuarioPersonalizado) -> Dict:
         """
@@ -56,48 +59,40 @@ class MotorRecomendacion:
         self._actualizar_perfil_medico(usuario, perfil_medico)
         
         # 4. Análisis de perfil médico (lógico - Prolog)
-        evaluacion_medica = self.motor_prolog.evaluar_condiciones(
-            self._usuario_a_dict(usuario, perfil_medico)
-        )
+        # El motor se fija para toda la petición y cada regla se evalúa una sola vez
+        motor = self.motor_prolog
+        usuario_dict = self._usuario_a_dict(usuario, perfil_medico, motor)
+        evaluacion_medica = motor.evaluar_condiciones(usuario_dict)
+        perfil_reglas = {**usuario_dict, **evaluacion_medica}
         
-        # 5. Filtrado funcional de rutinas seguras
-        todas_rutinas = Rutina.objects.filter(activa=True)
+        # 5. Filtrado de rutinas seguras sobre la instantánea del catálogo
+        catalogo = obtener_instantanea()
         
         # Si no hay rutinas, intentar cargarlas automáticamente
-        if todas_rutinas.count() == 0:
+        if not catalogo:
             import logging
             logger = logging.getLogger(__name__)
             logger.warning("No hay rutinas en BD, intentando cargar desde datos.py")
             try:
                 from django.core.management import call_command
                 call_command('cargar_rutinas', verbosity=0)
-                todas_rutinas = Rutina.objects.filter(activa=True)
-                logger.info(f"Rutinas cargadas: {todas_rutinas.count()}")
+                catalogo = obtener_instantanea()
+                logger.info(f"Rutinas cargadas: {len(catalogo)}")
             except Exception as e:
                 logger.error(f"Error cargando rutinas: {str(e)}")
         
-        if todas_rutinas.count() == 0:
+        if not catalogo:
             return {
                 'error': 'No hay rutinas disponibles en el sistema. Por favor, contacta al administrador.',
                 'precauciones': evaluacion_medica.get('precauciones', [])
             }
         
-        # Filtrar por condiciones de salud primero
-        rutinas_lista = list(todas_rutinas)
-        condiciones_salud = usuario.condiciones_salud or []
-        if condiciones_salud:
-            rutinas_dict = [self._rutina_a_dict(r) for r in rutinas_lista]
-            rutinas_filtradas_dict = self._filtrar_rutinas_por_condiciones_salud(
-                rutinas_dict,
-                condiciones_salud
-            )
-            rutinas_ids_filtradas = {r['id'] for r in rutinas_filtradas_dict}
-            rutinas_lista = [r for r in rutinas_lista if r.id in rutinas_ids_filtradas]
-        
-        rutinas_seguras = self._filtrar_rutinas_seguras(
-            rutinas_lista,
-            usuario,
-            evaluacion_medica
+        rutinas_dicts = {datos['id']: datos for datos in catalogo.dicts}
+        rutinas_seguras, razones_seguridad = self._filtrar_rutinas_seguras(
+            catalogo,
+            perfil_reglas,
+            usuario.condiciones_salud or [],
+            motor
         )
         
         if not rutinas_seguras:
@@ -109,8 +104,8 @@ class MotorRecomendacion:
         # 6. Cálculo de compatibilidad (funcional)
         rutinas_compatibles = self._calcular_compatibilidad_rutinas(
             rutinas_seguras,
-            usuario,
-            evaluacion_medica
+            perfil_reglas,
+            rutinas_dicts
         )
         
         if not rutinas_compatibles:
@@ -123,16 +118,14 @@ class MotorRecomendacion:
         rutina_recomendada, score = rutinas_compatibles[0]
         
         # 8. Generación de explicación médica (lógico)
-        explicacion = self.motor_prolog.generar_explicacion_medica(
-            self._usuario_a_dict(usuario, perfil_medico),
-            self._rutina_a_dict(rutina_recomendada)
+        explicacion = motor.generar_explicacion_medica(
+            usuario_dict,
+            rutinas_dicts[rutina_recomendada.id]
         )
         
-        # 9. Validación de seguridad final (lógico)
-        es_seguro, razon_seguridad = self.motor_prolog.evaluar_seguridad_rutina(
-            self._usuario_a_dict(usuario, perfil_medico),
-            self._rutina_a_dict(rutina_recomendada)
-        )
+        # 9. Validación de seguridad final (lógico): ya evaluada en el filtrado
+        razon = razones_seguridad[rutina_recomendada.id]
+        es_seguro, razon_seguridad = razon == RAZON_SEGURA, motor.nucleo.mensajes[razon]
         
         # 10. Crear recomendación en BD (imperativo)
         recomendacion = RecomendacionMedica.objects.create(
@@ -182,77 +175,43 @@ class MotorRecomendacion:
             perfil.clasificacion_imc = clasificacion
             perfil.save()
     
-    def _filtrar_rutinas_por_condiciones_salud(
-        self, rutinas: List[Dict], condiciones_salud: List[str]
-    ) -> List[Dict]:
-        """
-        Filtra rutinas que están contraindicadas por las condiciones de salud del usuario.
-        
-        PARADIGMA FUNCIONAL: Filtrado puro sin efectos secundarios.
-        """
-        if not condiciones_salud:
-            return rutinas
-        
-        def es_rutina_segura(rutina: Dict) -> bool:
-            condiciones_contraindicadas = rutina.get('condiciones_contraindicadas', [])
-            if not condiciones_contraindicadas:
-                return True
-            
-            # Verificar si alguna condición del usuario está en las contraindicadas
-            for condicion_usuario in condiciones_salud:
-                if condicion_usuario in condiciones_contraindicadas:
-                    return False
-            return True
-        
-        return list(filter(es_rutina_segura, rutinas))
-    
     def _filtrar_rutinas_seguras(
         self, 
-        rutinas: List[Rutina], 
-        usuario: UsuarioPersonalizado,
-        evaluacion_medica: Dict
-    ) -> List[Rutina]:
-        """
-        Filtra rutinas seguras usando paradigma funcional.
+        catalogo: InstantaneaCatalogo, 
+        perfil_reglas: Dict,
+        condiciones_salud: List[str],
+        motor
+    ) -> Tuple[List[Rutina], Dict[int, str]]:
         """
-        usuario_dict = self._usuario_a_dict(usuario)
-        usuario_dict.update(evaluacion_medica)
-        
-        rutinas_lista = list(rutinas)
+        Filtra rutinas seguras y no contraindicadas con los índices del catálogo.
         
-        # Filtrar por seguridad usando función pura
-        def es_rutina_segura(rutina: Rutina) -> bool:
-            rutina_dict = self._rutina_a_dict(rutina)
-            es_seguro, _ = self.motor_prolog.evaluar_seguridad_rutina(
-                usuario_dict,
-                rutina_dict
-            )
-            return es_seguro
+        Las reglas de seguridad ya están precalculadas por región de usuario:
+        basta elegir la región y cruzar su bitset con el de contraindicaciones.
         
-        # Usar filter (paradigma funcional)
-        return list(filter(es_rutina_segura, rutinas_lista))
+        Returns:
+            Tupla (rutinas seguras, código de razón por id de rutina)
+        """
+        condiciones = motor.nucleo.condiciones(perfil_reglas)
+        indice = catalogo.indice_seguridad(motor.nucleo)
+        bits = indice.elegibles(condiciones) & catalogo.permitidas(condiciones_salud)
+        razones = indice.razones(condiciones)
+        return (
+            catalogo.seleccionar(bits),
+            {r.id: razon for r, razon in zip(catalogo.rutinas, razones)}
+        )
     
     def _calcular_compatibilidad_rutinas(
         self,
         rutinas: List[Rutina],
-        usuario: UsuarioPersonalizado,
-        evaluacion_medica: Dict
+        perfil_reglas: Dict,
+        rutinas_dicts: Dict[int, Dict]
     ) -> List[Tuple[Rutina, float]]:
         """
         Calcula compatibilidad de rutinas usando paradigma funcional.
         """
-        usuario_dict = self._usuario_a_dict(usuario)
-        usuario_dict.update(evaluacion_medica)
-        
         # Mapear rutinas a tuplas (rutina, score) usando map
         rutinas_puntuadas = list(map(
-            lambda r: (
-                r,
-                calcular_compatibilidad(
-                    self._rutina_a_dict(r),
-                    usuario_dict
-                )
-            ),
+            lambda r: (r, calcular_compatibilidad(rutinas_dicts[r.id], perfil_reglas)),
             rutinas
         ))
         
@@ -276,8 +235,15 @@ class MotorRecomendacion:
         
         return alternativas[:limite]
     
-    def _usuario_a_dict(self, usuario: UsuarioPersonalizado, perfil: Optional[PerfilMedico] = None) -> Dict:
-        """Convierte usuario a diccionario para procesamiento."""
+    def _usuario_a_dict(
+        self, usuario: UsuarioPersonalizado, perfil: Optional[PerfilMedico] = None, motor=None
+    ) -> Dict:
+        """
+        Convierte usuario a diccionario para procesamiento.
+        
+        La intensidad recomendada la decide el motor lógico (evaluar_condiciones),
+        así que aquí solo se infieren el nivel y el objetivo recomendados.
+        """
         if perfil is None:
             try:
                 perfil = usuario.perfil_medico
@@ -299,25 +265,7 @@ class MotorRecomendacion:
                 imc = 25.0
                 imc_clasificacion = 'normal'
         
-        # Calcular nivel, objetivo e intensidad recomendados usando logic_rules
-        nivel_recomendado = logic_rules.determinar_nivel_usuario(
-            edad,
-            usuario.dias_entrenamiento or 3,
-            imc_clasificacion
-        )
-        
-        objetivo_recomendado = logic_rules.determinar_objetivo_recomendado(
-            usuario.objetivos or 'salud',
-            imc_clasificacion
-        )
-        
-        intensidad_recomendada = logic_rules.determinar_intensidad_segura(
-            edad,
-            imc_clasificacion,
-            nivel_recomendado
-        )
-        
-        return {
+        datos = {
             'id': usuario.id,
             'edad': edad,
             'peso': usuario.peso or 70.0,
@@ -325,69 +273,41 @@ class MotorRecomendacion:
             'imc': imc,
             'imc_clasificacion': imc_clasificacion,
             'nivel_experiencia': usuario.nivel_experiencia or 'principiante',
-            'nivel_recomendado': nivel_recomendado,
             'objetivos': usuario.objetivos or 'salud',
-            'objetivo_recomendado': objetivo_recomendado,
-            'intensidad_recomendada': intensidad_recomendada,
             'dias_disponibles': usuario.dias_entrenamiento or 3,
             'condiciones_medicas': usuario.condiciones_medicas or '',
             'restricciones': usuario.restricciones or ''
         }
+        datos.update(self._perfil_recomendado(datos, (motor or self.motor_prolog).parametros))
+        return datos
     
-    def _rutina_a_dict(self, rutina: Rutina) -> Dict:
-        """Convierte rutina a diccionario para procesamiento."""
+    def _perfil_recomendado(self, datos: Dict, parametros: Dict) -> Dict:
+        """
+        Nivel y objetivo recomendados (logic_rules) a partir de los datos del usuario.
+        
+        Args:
+            datos: Datos del usuario (edad, imc_clasificacion, objetivos, dias_disponibles)
+            parametros: Parámetros de las reglas del motor en uso
+        """
         return {
-            'id': rutina.id,
-            'nombre': rutina.nombre,
-            'nivel': rutina.nivel,
-            'objetivo': rutina.objetivo,
-            'intensidad': rutina.intensidad,
-            'dias_semana': rutina.dias_semana,
-            'duracion': rutina.duracion,
-            'calorias_estimadas': rutina.calorias_estimadas,
-            'restricciones_medicas': rutina.restricciones_medicas
+            'nivel_recomendado': logic_rules.determinar_nivel_usuario(
+                datos['edad'],
+                datos['dias_disponibles'],
+                datos['imc_clasificacion'],
+                parametros
+            ),
+            'objetivo_recomendado': logic_rules.determinar_objetivo_recomendado(
+                datos['objetivos'],
+                datos['imc_clasificacion']
+            ),
         }
     
+    
     def calcular_progreso_promedio(self, usuario: UsuarioPersonalizado) -> Dict:
         """
-        Calcula progreso promedio usando reduce (paradigma funcional).
+        Progreso de IMC del usuario, leído de su resumen acumulado (ver progreso.py).
         """
-        seguimientos = usuario.seguimientos.all()
-        
-        if not seguimientos:
-            return {
-                'promedio_imc': 0,
-                'total_seguimientos': 0,
-                'tendencia': 'sin_datos'
-            }
-        
-        # Usar reduce para calcular promedio
-        suma_imc = reduce(
-            lambda acc, s: acc + s.imc_actual,
-            seguimientos,
-            0.0
-        )
-        
-        promedio_imc = suma_imc / len(seguimientos)
-        
-        # Calcular tendencia
-        if len(seguimientos) >= 2:
-            imc_inicial = seguimientos.last().imc_actual
-            imc_final = seguimientos.first().imc_actual
-            if imc_final < imc_inicial:
-                tendencia = 'mejora'
-            elif imc_final > imc_inicial:
-                tendencia = 'empeora'
-            else:
-                tendencia = 'estable'
-        else:
-            tendencia = 'insuficiente_datos'
-        
-        return {
-            'promedio_imc': round(promedio_imc, 2),
-            'total_seguimientos': len(seguimientos),
-            'tendencia': tendencia
-        }
+        return obtener_progreso(usuario)
 
 
 # Instancia global del motor
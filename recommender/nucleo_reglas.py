@@ -0,0 +1,135 @@
+"""
+Núcleo compilado de las reglas de seguridad.
+
+Las tres reglas de seguridad (edad avanzada e intensidad alta, obesidad y
+demasiados días, principiante y rutina avanzada) se implementan solo aquí.
+`logic_rules`, `MotorProlog`, `MotorLogicoAlternativo` y `processor` delegan
+en este núcleo:
+
+1. Cada llamador reduce los datos del usuario a `CondicionesUsuario` (tres
+   booleanos), una sola vez por petición.
+2. El núcleo aplica las reglas a una o varias rutinas comparando solo los
+   atributos de cada rutina.
+
+Hay un núcleo por conjunto de parámetros, con los umbrales y los mensajes ya
+resueltos; `nucleo_seguridad()` los guarda en caché (único punto de
+invalidación si cambian las reglas).
+"""
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import instrumentacion
+from .parametros_reglas import PARAMETROS_POR_DEFECTO, normalizar_parametros
+
+
+# Códigos de razón de la evaluación de seguridad
+RAZON_SEGURA = 'segura'
+RAZON_EDAD_INTENSIDAD = 'edad_intensidad_alta'
+RAZON_OBESIDAD_DIAS = 'obesidad_demasiados_dias'
+RAZON_NIVEL_AVANZADO = 'nivel_demasiado_avanzado'
+
+# Orden de precedencia de las razones de rechazo (el de las reglas)
+ORDEN_RAZONES = (RAZON_EDAD_INTENSIDAD, RAZON_OBESIDAD_DIAS, RAZON_NIVEL_AVANZADO)
+
+# Los mensajes pueden citar parámetros de las reglas (ver mensaje_seguridad)
+MENSAJES_SEGURIDAD = {
+    RAZON_SEGURA: "Rutina segura y adecuada",
+    RAZON_EDAD_INTENSIDAD: "Intensidad alta no recomendada para mayores de {edad_avanzada:g} años",
+    RAZON_OBESIDAD_DIAS: "Demasiados días de entrenamiento para comenzar con obesidad",
+    RAZON_NIVEL_AVANZADO: "Rutina demasiado avanzada para tu nivel actual",
+}
+
+
+def mensaje_seguridad(razon: str, parametros: Optional[Dict] = None) -> str:
+    """Devuelve el mensaje legible de un código de razón de seguridad."""
+    return MENSAJES_SEGURIDAD[razon].format(**(parametros or PARAMETROS_POR_DEFECTO))
+
+
+class CondicionesUsuario(NamedTuple):
+    """Condiciones del usuario que intervienen en las reglas de seguridad."""
+    edad_avanzada: bool
+    obesidad: bool
+    principiante: bool
+
+
+class NucleoSeguridad:
+    """
+    Reglas de seguridad compiladas para un conjunto de parámetros.
+
+    Args:
+        parametros: Parámetros completos de las reglas (ver parametros_reglas)
+    """
+
+    def __init__(self, parametros: Dict):
+        self.parametros = parametros
+        self.clave = tuple(sorted(parametros.items()))
+        self.edad_avanzada = parametros['edad_avanzada']
+        self.imc_obesidad = parametros['imc_obesidad']
+        self.dias_maximos_obesidad = parametros['dias_maximos_obesidad']
+        self.mensajes = {razon: mensaje_seguridad(razon, parametros) for razon in MENSAJES_SEGURIDAD}
+
+    def condiciones(self, usuario_data: Dict) -> CondicionesUsuario:
+        """
+        Condiciones a partir de los datos del usuario del motor lógico
+        (edad, IMC numérico y nivel de experiencia declarado).
+        """
+        return CondicionesUsuario(
+            edad_avanzada=usuario_data.get('edad', 30) > self.edad_avanzada,
+            obesidad=usuario_data.get('imc', 25.0) > self.imc_obesidad,
+            principiante=usuario_data.get('nivel_experiencia', 'principiante') == 'principiante',
+        )
+
+    def razon(self, condiciones: CondicionesUsuario, rutina: Dict) -> str:
+        """Código de la primera regla que rechaza la rutina, o RAZON_SEGURA."""
+        if condiciones.edad_avanzada and rutina.get('intensidad', 'media') == 'alta':
+            return RAZON_EDAD_INTENSIDAD
+        if condiciones.obesidad and rutina.get('dias_semana', 3) > self.dias_maximos_obesidad:
+            return RAZON_OBESIDAD_DIAS
+        if condiciones.principiante and rutina.get('nivel', 'principiante') == 'avanzado':
+            return RAZON_NIVEL_AVANZADO
+        return RAZON_SEGURA
+
+    def evaluar(self, condiciones: CondicionesUsuario, rutina: Dict) -> Tuple[bool, str]:
+        """
+        Evalúa una rutina.
+
+        Returns:
+            Tupla (es_segura, mensaje)
+        """
+        razon = self.razon(condiciones, rutina)
+        if instrumentacion.activa:
+            instrumentacion.contar_regla(f'seguridad.{razon}')
+        return razon == RAZON_SEGURA, self.mensajes[razon]
+
+    def evaluar_lote(
+        self, condiciones: CondicionesUsuario, rutinas: Iterable[Dict]
+    ) -> Tuple[List[bool], List[str]]:
+        """
+        Evalúa varias rutinas para las mismas condiciones.
+
+        Returns:
+            Tupla (mascara, razones): un booleano por rutina y su código de razón
+        """
+        razones = [self.razon(condiciones, rutina) for rutina in rutinas]
+        if instrumentacion.activa:
+            instrumentacion.contar_reglas(f'seguridad.{razon}' for razon in razones)
+        return [razon == RAZON_SEGURA for razon in razones], razones
+
+
+@lru_cache(maxsize=32)
+def _nucleo_por_clave(clave: Tuple) -> NucleoSeguridad:
+    return NucleoSeguridad(dict(clave))
+
+
+def nucleo_seguridad(parametros: Optional[Dict] = None) -> NucleoSeguridad:
+    """
+    Devuelve el núcleo compilado de un conjunto de parámetros.
+
+    Args:
+        parametros: Parámetros de las reglas (parciales o None para los por defecto)
+
+    Returns:
+        NucleoSeguridad compartido por todos los llamadores con esos parámetros
+    """
+    completos = normalizar_parametros(parametros) if parametros else PARAMETROS_POR_DEFECTO
+    return _nucleo_por_clave(tuple(sorted(completos.items())))
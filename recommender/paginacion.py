@@ -0,0 +1,76 @@
+"""
+Paginación por clave (seek) de listados que crecen sin límite.
+
+En lugar de OFFSET, cada página pide las filas anteriores a la última que
+vio el cliente según (campo de fecha, id), en orden descendente:
+
+    WHERE fecha < :fecha OR (fecha = :fecha AND id < :id)
+    ORDER BY fecha DESC, id DESC
+    LIMIT :tamano + 1
+
+Con un índice (usuario, -fecha, -id) el coste de una página no depende de
+cuántas filas haya detrás. El cursor es opaco para el cliente: la fecha y
+el id de la última fila codificados en base64 para URL.
+"""
+from typing import Any, List, NamedTuple, Optional
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+class Pagina(NamedTuple):
+    """Una página del listado y el cursor de la siguiente (None si es la última)."""
+    elementos: List[Any]
+    siguiente: Optional[str]
+
+
+def codificar_cursor(valor, pk: int) -> str:
+    """Cursor opaco a partir del valor del campo de orden y el id."""
+    return urlsafe_base64_encode(f'{valor.isoformat()}|{pk}'.encode())
+
+
+def decodificar_cursor(cursor: str):
+    """
+    Valor del campo de orden e id de un cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        texto, pk = force_str(urlsafe_base64_decode(cursor)).rsplit('|', 1)
+        valor = parse_datetime(texto) if 'T' in texto else parse_date(texto)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Cursor de paginación inválido')
+    if valor is None:
+        raise ValueError('Cursor de paginación inválido')
+    return valor, pk
+
+
+def pagina_por_clave(queryset, campo: str, cursor: Optional[str], tamano: int) -> Pagina:
+    """
+    Página de `queryset` ordenado por (`campo`, id) descendente.
+
+    Args:
+        queryset: Filas a paginar, ya filtradas (p. ej. las del usuario)
+        campo: Campo de fecha del orden (p. ej. 'fecha_recomendacion')
+        cursor: `siguiente` de la página anterior, o None para la primera
+        tamano: Filas por página
+
+    Returns:
+        Pagina con las filas y el cursor de la siguiente
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    if cursor:
+        valor, pk = decodificar_cursor(cursor)
+        queryset = queryset.filter(Q(**{f'{campo}__lt': valor}) | Q(**{campo: valor, 'pk__lt': pk}))
+    # Una fila de más para saber si hay página siguiente
+    filas = list(queryset.order_by(f'-{campo}', '-pk')[:tamano + 1])
+    if len(filas) <= tamano:
+        return Pagina(filas, None)
+    ultima = filas[tamano - 1]
+    return Pagina(filas[:tamano], codificar_cursor(getattr(ultima, campo), ultima.pk))
@@ -0,0 +1,57 @@
+"""
+Carga de los datos del dashboard con un número fijo de consultas.
+
+El dashboard se sirve por secciones (ver la vista `dashboard_seccion`): la
+página inicial solo lleva los datos del usuario de la sesión y cada sección
+se pide aparte, de modo que la más lenta (generar la primera recomendación)
+no retrasa el resto. Cada sección se carga con una consulta, sin importar
+cuántos seguimientos o recomendaciones tenga el usuario:
+
+- resumen: perfil médico y resumen de progreso (`cargar_resumen`).
+- recomendacion: la recomendación vigente (`recomendacion_vigente`).
+- seguimientos: los últimos seguimientos (`seguimientos_recientes`).
+"""
+from typing import Dict, List, NamedTuple, Optional
+
+from .models import PerfilMedico, RecomendacionMedica, SeguimientoUsuario, UsuarioPersonalizado
+from .progreso import ORDEN_RECIENTE, obtener_progreso
+
+SEGUIMIENTOS_RECIENTES = 5
+
+
+class ResumenPanel(NamedTuple):
+    """Datos de la sección de resumen del dashboard."""
+    perfil_medico: Optional[PerfilMedico]
+    progreso: Dict
+
+
+def cargar_resumen(usuario: UsuarioPersonalizado) -> ResumenPanel:
+    """Perfil médico y progreso del usuario en una consulta (select_related)."""
+    cargado = (
+        UsuarioPersonalizado.objects
+        .select_related('perfil_medico', 'resumen_progreso')
+        .get(pk=usuario.pk)
+    )
+    try:
+        perfil_medico = cargado.perfil_medico
+    except PerfilMedico.DoesNotExist:
+        perfil_medico = None
+    return ResumenPanel(perfil_medico=perfil_medico, progreso=obtener_progreso(cargado))
+
+
+def recomendacion_vigente(usuario: UsuarioPersonalizado) -> Optional[RecomendacionMedica]:
+    """La recomendación vigente más reciente con su rutina, o None."""
+    return (
+        RecomendacionMedica.objects
+        .filter(usuario=usuario, vigente=True)
+        .select_related('rutina_recomendada')
+        .order_by('-fecha_recomendacion')
+        .first()
+    )
+
+
+def seguimientos_recientes(usuario: UsuarioPersonalizado) -> List[SeguimientoUsuario]:
+    """Los últimos SEGUIMIENTOS_RECIENTES seguimientos del usuario."""
+    return list(
+        SeguimientoUsuario.objects.filter(usuario=usuario).order_by(*ORDEN_RECIENTE)[:SEGUIMIENTOS_RECIENTES]
+    )
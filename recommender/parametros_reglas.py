@@ -0,0 +1,61 @@
+"""
+Parámetros de las reglas médicas.
+
+Todos los umbrales de las reglas lógicas (`MotorProlog`, `MotorLogicoAlternativo`
+y `logic_rules`) salen de un diccionario de parámetros. Los valores por
+defecto reproducen las reglas originales; un conjunto de reglas versionado
+(`ConjuntoReglas`) puede sobrescribir cualquiera de ellos sin desplegar código.
+"""
+from typing import Any, Dict, Optional
+
+
+PARAMETROS_POR_DEFECTO: Dict[str, float] = {
+    # Edad
+    'edad_minima_adulto': 18,            # desde aquí aplican las reglas de intensidad
+    'edad_maxima_alta_intensidad': 40,   # intensidad alta solo por debajo
+    'edad_madura': 50,                   # por encima: principiante / intensidad baja
+    'edad_avanzada': 60,                 # por encima: intensidad baja, nunca alta
+    'edad_maxima_avanzado': 30,          # nivel avanzado solo por debajo
+    # IMC
+    'imc_bajo_peso': 18.5,
+    'imc_sobrepeso': 25,
+    'imc_obesidad': 30,
+    # Días de entrenamiento
+    'dias_minimos_intermedio': 3,
+    'dias_minimos_avanzado': 5,
+    'dias_maximos_obesidad': 5,
+}
+
+
+def normalizar_parametros(parametros: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    Completa un conjunto de parámetros con los valores por defecto.
+
+    Args:
+        parametros: Parámetros a sobrescribir (puede ser parcial o None)
+
+    Returns:
+        Diccionario completo de parámetros
+
+    Raises:
+        ValueError: Si hay claves desconocidas, valores no numéricos o
+            umbrales desordenados
+    """
+    parametros = parametros or {}
+    desconocidos = set(parametros) - set(PARAMETROS_POR_DEFECTO)
+    if desconocidos:
+        raise ValueError(f"Parámetros de reglas desconocidos: {', '.join(sorted(desconocidos))}")
+
+    resultado = dict(PARAMETROS_POR_DEFECTO)
+    for clave, valor in parametros.items():
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+            raise ValueError(f"El parámetro '{clave}' debe ser numérico")
+        resultado[clave] = valor
+
+    if not (resultado['edad_minima_adulto'] < resultado['edad_maxima_alta_intensidad']
+            <= resultado['edad_avanzada']):
+        raise ValueError("Los umbrales de edad deben cumplir adulto < alta intensidad <= avanzada")
+    if not resultado['imc_bajo_peso'] < resultado['imc_sobrepeso'] < resultado['imc_obesidad']:
+        raise ValueError("Los umbrales de IMC deben ser crecientes")
+
+    return resultado
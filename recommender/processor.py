@@ -1,5 +1,8 @@
 from functools import reduce
-from typing import List, Dict, Callable
+from itertools import compress
+from typing import List, Dict, Callable, Optional, Sequence, Tuple
+
+from .nucleo_reglas import nucleo_seguridad
 
 
 def calcular_imc(peso: float, altura: float) -> float:
@@ -36,6 +39,44 @@ def clasificar_imc(imc: float) -> str:
         return 'obesidad'
 
 
+def resumir_progreso(
+    total: int, suma_imc: float, imc_inicial: Optional[float], imc_final: Optional[float]
+) -> Dict:
+    """
+    Función pura que resume el progreso de IMC de un usuario.
+    
+    Args:
+        total: Número de seguimientos
+        suma_imc: Suma del IMC de todos los seguimientos
+        imc_inicial: IMC del seguimiento más antiguo
+        imc_final: IMC del seguimiento más reciente
+    
+    Returns:
+        Diccionario con promedio_imc, total_seguimientos y tendencia
+    """
+    if not total:
+        return {
+            'promedio_imc': 0,
+            'total_seguimientos': 0,
+            'tendencia': 'sin_datos'
+        }
+    
+    if total < 2:
+        tendencia = 'insuficiente_datos'
+    elif imc_final < imc_inicial:
+        tendencia = 'mejora'
+    elif imc_final > imc_inicial:
+        tendencia = 'empeora'
+    else:
+        tendencia = 'estable'
+    
+    return {
+        'promedio_imc': round(suma_imc / total, 2),
+        'total_seguimientos': total,
+        'tendencia': tendencia
+    }
+
+
 def calcular_compatibilidad(rutina: Dict, usuario_data: Dict) -> float:
     """
     Función pura para calcular la compatibilidad entre una rutina y un usuario.
@@ -247,33 +288,26 @@ def aplicar_filtros_multiples(rutinas: List[Dict], filtros: List[Callable]) -> L
     return reduce(lambda ruts, filtro: list(filter(filtro, ruts)), filtros, rutinas)
 
 
-def filtrar_rutinas_por_seguridad(rutinas: List[Dict], perfil_medico: Dict) -> List[Dict]:
+def filtrar_rutinas_por_seguridad(
+    rutinas: List[Dict], perfil_medico: Dict, parametros: Optional[Dict] = None
+) -> List[Dict]:
     """
-    Función que usa filter() para filtrar rutinas por seguridad médica.
+    Función que usa compress() para filtrar rutinas por seguridad médica.
+    
+    Las reglas se aplican en el núcleo compilado (nucleo_reglas); las
+    condiciones del perfil se calculan una sola vez para todas las rutinas.
     
     Args:
         rutinas: Lista de rutinas
         perfil_medico: Diccionario con perfil médico del usuario
+        parametros: Parámetros del conjunto de reglas (opcional)
     
     Returns:
         Lista de rutinas seguras
     """
-    def es_segura(rutina: Dict) -> bool:
-        edad = perfil_medico.get('edad', 30)
-        imc = perfil_medico.get('imc', 25.0)
-        nivel_usuario = perfil_medico.get('nivel_experiencia', 'principiante')
-        
-        # Reglas de seguridad
-        if edad > 60 and rutina.get('intensidad') == 'alta':
-            return False
-        if imc > 30 and rutina.get('dias_semana', 0) > 5:
-            return False
-        if nivel_usuario == 'principiante' and rutina.get('nivel') == 'avanzado':
-            return False
-        
-        return True
-    
-    return list(filter(es_segura, rutinas))
+    nucleo = nucleo_seguridad(parametros)
+    mascara, _ = nucleo.evaluar_lote(nucleo.condiciones(perfil_medico), rutinas)
+    return list(compress(rutinas, mascara))
 
 
 def generar_resumen_estadistico(rutinas: List[Dict]) -> Dict:
@@ -305,3 +339,47 @@ def generar_resumen_estadistico(rutinas: List[Dict]) -> Dict:
         'duracion_promedio': round(duracion_promedio, 1),
         'dias_promedio': round(dias_promedio, 1)
     }
+
+
+def reducir_serie_lttb(puntos: Sequence[Tuple[float, float]], umbral: int) -> List[int]:
+    """
+    Función pura que reduce una serie con Largest-Triangle-Three-Buckets.
+    
+    Conserva el primer y el último punto y, de cada uno de los `umbral - 2`
+    tramos intermedios, el punto que forma el triángulo de mayor área con
+    el punto elegido en el tramo anterior y la media del tramo siguiente.
+    Así se mantienen los picos y la forma de la curva.
+    
+    Args:
+        puntos: Pares (x, y) ordenados por x
+        umbral: Número de puntos deseado (al menos 3)
+    
+    Returns:
+        Índices de los puntos conservados, en orden
+    """
+    total = len(puntos)
+    if umbral >= total or umbral < 3:
+        return list(range(total))
+    
+    ancho = (total - 2) / (umbral - 2)
+    elegidos = [0]
+    a = 0
+    for tramo in range(umbral - 2):
+        inicio = int(tramo * ancho) + 1
+        fin = int((tramo + 1) * ancho) + 1
+        
+        # Media del tramo siguiente (el último punto para el último tramo)
+        siguiente_inicio, siguiente_fin = fin, min(int((tramo + 2) * ancho) + 1, total)
+        siguientes = puntos[siguiente_inicio:siguiente_fin] or puntos[-1:]
+        media_x = sum(x for x, _ in siguientes) / len(siguientes)
+        media_y = sum(y for _, y in siguientes) / len(siguientes)
+        
+        ax, ay = puntos[a]
+        a = max(
+            range(inicio, fin),
+            key=lambda i: abs((ax - media_x) * (puntos[i][1] - ay) - (ax - puntos[i][0]) * (media_y - ay))
+        )
+        elegidos.append(a)
+    
+    elegidos.append(total - 1)
+    return elegidos
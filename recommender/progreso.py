@@ -0,0 +1,205 @@
+"""
+Resumen acumulado del progreso de cada usuario.
+
+`ResumenProgreso` guarda, por usuario, el total de seguimientos, la suma del
+IMC, el IMC inicial y final y la fecha del último seguimiento:
+
+- Alta de un seguimiento: actualización incremental de la fila con
+  expresiones F (segura ante altas concurrentes). La primera alta crea la
+  fila con un INSERT; si otra alta concurrente la crea antes, la restricción
+  única lo detecta y el alta se suma a esa fila.
+- Cambio o baja de un seguimiento: la fila se recalcula con una agregación en
+  la base de datos, que es también la ruta de reconstrucción y verificación
+  (comando `reconstruir_progreso`).
+
+Los cambios hechos con `QuerySet.update()` o `bulk_create()` no disparan las
+señales: después hay que llamar a `reconstruir_resumen()`.
+
+`serie_seguimientos()` da la evolución del peso y del IMC para gráficas,
+reducida con LTTB a un número fijo de puntos.
+"""
+from datetime import date
+from typing import Dict, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ResumenProgreso, SeguimientoUsuario, UsuarioPersonalizado
+from .processor import reducir_serie_lttb, resumir_progreso
+
+# Más reciente primero; el id desempata los seguimientos del mismo día
+ORDEN_RECIENTE = ('-fecha', '-id')
+
+
+def _agregado_seguimientos(expresion):
+    """Subconsulta con un agregado de los seguimientos del usuario externo."""
+    return Subquery(
+        SeguimientoUsuario.objects
+        .filter(usuario=OuterRef('pk'))
+        .order_by()
+        .values('usuario')
+        .annotate(valor=expresion)
+        .values('valor')
+    )
+
+
+def _seguimiento_extremo(campo, *orden):
+    """Subconsulta con un campo del primer seguimiento del usuario externo según `orden`."""
+    return Subquery(
+        SeguimientoUsuario.objects
+        .filter(usuario=OuterRef('pk'))
+        .order_by(*orden)
+        .values(campo)[:1]
+    )
+
+
+def anotar_agregados(usuarios):
+    """
+    Anota a cada usuario los agregados de sus seguimientos calculados en la
+    base de datos (ruta de reconstrucción y verificación).
+
+    Returns:
+        QuerySet con total_agregado, suma_imc_agregada, imc_inicial_agregado,
+        imc_final_agregado y fecha_ultimo_agregada
+    """
+    return usuarios.annotate(
+        total_agregado=Coalesce(_agregado_seguimientos(Count('id')), 0),
+        suma_imc_agregada=Coalesce(_agregado_seguimientos(Sum('imc_actual')), 0.0, output_field=FloatField()),
+        imc_inicial_agregado=_seguimiento_extremo('imc_actual', 'fecha', 'id'),
+        imc_final_agregado=_seguimiento_extremo('imc_actual', *ORDEN_RECIENTE),
+        fecha_ultimo_agregada=_seguimiento_extremo('fecha', *ORDEN_RECIENTE),
+    )
+
+
+def valores_agregados(usuario: UsuarioPersonalizado) -> Dict:
+    """Campos de ResumenProgreso de un usuario anotado con `anotar_agregados`."""
+    return {
+        'total_seguimientos': usuario.total_agregado,
+        'suma_imc': usuario.suma_imc_agregada,
+        'imc_inicial': usuario.imc_inicial_agregado,
+        'imc_final': usuario.imc_final_agregado,
+        'fecha_ultimo': usuario.fecha_ultimo_agregada,
+    }
+
+
+def reconstruir_resumen(usuario_id: int, crear: bool = True) -> None:
+    """
+    Recalcula el resumen de un usuario con una agregación en la base de datos.
+
+    Args:
+        usuario_id: Id del usuario
+        crear: Si es False solo actualiza una fila existente (al borrar en
+            cascada el usuario puede no existir ya)
+    """
+    usuario = anotar_agregados(UsuarioPersonalizado.objects.filter(pk=usuario_id)).first()
+    if usuario is None:
+        return
+    valores = valores_agregados(usuario)
+    if crear:
+        ResumenProgreso.objects.update_or_create(usuario_id=usuario_id, defaults=valores)
+    else:
+        ResumenProgreso.objects.filter(usuario_id=usuario_id).update(**valores)
+
+
+def crear_resumen(usuario_id: int) -> None:
+    """
+    Crea la fila de resumen de un usuario con los agregados de sus seguimientos.
+
+    Raises:
+        IntegrityError: Si la fila ya existe (no la sobrescribe)
+    """
+    usuario = anotar_agregados(UsuarioPersonalizado.objects.filter(pk=usuario_id)).first()
+    if usuario is not None:
+        ResumenProgreso.objects.create(usuario_id=usuario_id, **valores_agregados(usuario))
+
+
+def progreso_de_resumen(resumen: ResumenProgreso) -> Dict:
+    """Progreso (ver processor.resumir_progreso) a partir de la fila de resumen."""
+    return resumir_progreso(
+        resumen.total_seguimientos,
+        resumen.suma_imc,
+        resumen.imc_inicial,
+        resumen.imc_final
+    )
+
+
+def obtener_progreso(usuario: UsuarioPersonalizado) -> Dict:
+    """
+    Progreso del usuario en O(1): lee su fila de resumen, creándola la
+    primera vez.
+    """
+    try:
+        resumen = usuario.resumen_progreso
+    except ResumenProgreso.DoesNotExist:
+        reconstruir_resumen(usuario.pk)
+        resumen = ResumenProgreso.objects.get(usuario_id=usuario.pk)
+    return progreso_de_resumen(resumen)
+
+
+def serie_seguimientos(
+    usuario_id: int, puntos: int, desde: Optional[date] = None, hasta: Optional[date] = None
+) -> Dict:
+    """
+    Serie de peso e IMC de un usuario, reducida a `puntos` puntos por serie.
+
+    Args:
+        usuario_id: Id del usuario
+        puntos: Puntos máximos de cada serie (al menos 3)
+        desde: Primera fecha incluida (opcional)
+        hasta: Última fecha incluida (opcional)
+
+    Returns:
+        Diccionario con el total de seguimientos del periodo y las series
+        'peso' e 'imc' como listas de [fecha ISO, valor]
+    """
+    filas = SeguimientoUsuario.objects.filter(usuario_id=usuario_id)
+    if desde:
+        filas = filas.filter(fecha__gte=desde)
+    if hasta:
+        filas = filas.filter(fecha__lte=hasta)
+    filas = list(filas.order_by('fecha', 'id').values_list('fecha', 'peso_actual', 'imc_actual'))
+
+    # Cada serie elige sus propios puntos: un pico de una no tiene por qué serlo de la otra
+    series = {}
+    for nombre, columna in (('peso', 1), ('imc', 2)):
+        valores = [(fila[0].toordinal(), fila[columna]) for fila in filas]
+        series[nombre] = [
+            [filas[i][0].isoformat(), round(filas[i][columna], 2)]
+            for i in reducir_serie_lttb(valores, puntos)
+        ]
+    return {'total': len(filas), **series}
+
+
+def _sumar_alta(seguimiento: SeguimientoUsuario) -> int:
+    """Suma un alta a la fila de resumen; devuelve las filas actualizadas (0 si no existe)."""
+    # Un alta siempre es el seguimiento más reciente (fecha de hoy, id mayor)
+    return ResumenProgreso.objects.filter(usuario_id=seguimiento.usuario_id).update(
+        total_seguimientos=F('total_seguimientos') + 1,
+        suma_imc=F('suma_imc') + seguimiento.imc_actual,
+        imc_inicial=Coalesce(F('imc_inicial'), Value(seguimiento.imc_actual)),
+        imc_final=seguimiento.imc_actual,
+        fecha_ultimo=seguimiento.fecha,
+    )
+
+
+@receiver(post_save, sender=SeguimientoUsuario)
+def _seguimiento_guardado(sender, instance, created, **kwargs):
+    if not created:
+        reconstruir_resumen(instance.usuario_id, crear=False)
+        return
+    if _sumar_alta(instance):
+        return
+    try:
+        with transaction.atomic():
+            crear_resumen(instance.usuario_id)
+    except IntegrityError:
+        # Otra alta concurrente creó la fila (sin ver este seguimiento): se suma a ella
+        _sumar_alta(instance)
+
+
+@receiver(post_delete, sender=SeguimientoUsuario)
+def _seguimiento_borrado(sender, instance, **kwargs):
+    reconstruir_resumen(instance.usuario_id, crear=False)
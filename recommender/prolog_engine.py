@@ -5,35 +5,117 @@ Implementa el paradigma lógico para recomendaciones médicas.
 pyDatalog es una implementación de Datalog (subconjunto de Prolog) en Python puro.
 No requiere SWI-Prolog instalado y es compatible con despliegues en la nube como Render.
 Tiene sintaxis muy similar a Prolog.
+
+Importar este módulo es barato: pyDatalog se importa y las reglas se compilan
+al construir el primer motor, no al importar (ver `obtener_motor_por_defecto`).
 """
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from . import instrumentacion
+from .datalog import Atomo, Comparacion, No, Programa, Regla, Var
+from .instrumentacion import medir
+from .memo import MemoLRU
+from .nucleo_reglas import (  # noqa: F401 - reexportados para los llamadores del motor
+    MENSAJES_SEGURIDAD,
+    ORDEN_RAZONES,
+    RAZON_EDAD_INTENSIDAD,
+    RAZON_NIVEL_AVANZADO,
+    RAZON_OBESIDAD_DIAS,
+    RAZON_SEGURA,
+    mensaje_seguridad,
+    nucleo_seguridad,
+)
+from .parametros_reglas import normalizar_parametros
+from .reglas_compiladas import compilar_reglas
 
 logger = logging.getLogger(__name__)
 
-# Intentar importar pyDatalog, si no está disponible usar motor lógico alternativo
-try:
-    from pyDatalog import pyDatalog
-    PYDATALOG_AVAILABLE = True
-    logger.info("Motor Prolog: pyDatalog disponible y listo para usar.")
-except ImportError:
-    PYDATALOG_AVAILABLE = False
-    logger.info("Motor Prolog: Usando implementación Python pura (pyDatalog no disponible).")
+# pyDatalog se importa al construir el primer motor; None = aún no se intentó
+pyDatalog = None
+PYDATALOG_AVAILABLE = None
+
+
+def _importar_pydatalog() -> bool:
+    """Importa pyDatalog la primera vez; si no está disponible se usa el motor alternativo."""
+    global pyDatalog, PYDATALOG_AVAILABLE
+    if PYDATALOG_AVAILABLE is None:
+        try:
+            from pyDatalog import pyDatalog as modulo_pydatalog
+            pyDatalog = modulo_pydatalog
+            PYDATALOG_AVAILABLE = True
+            logger.info("Motor Prolog: pyDatalog disponible y listo para usar.")
+        except ImportError:
+            PYDATALOG_AVAILABLE = False
+            logger.info("Motor Prolog: Usando implementación Python pura (pyDatalog no disponible).")
+    return PYDATALOG_AVAILABLE
+
+# Orden de menor a mayor exigencia; ante varias respuestas se elige la más conservadora
+ORDEN_INTENSIDAD = ('baja', 'media', 'alta')
+
+# Programa Datalog; los umbrales salen de los parámetros de reglas y el sufijo
+# separa los predicados de cada versión dentro del mismo contexto pyDatalog
+PROGRAMA_INTENSIDAD = """
+    intensidad_recomendada{sufijo}(Edad, 'baja') <= (Edad > {edad_avanzada})
+    intensidad_recomendada{sufijo}(Edad, 'media') <= (Edad >= {edad_minima_adulto}) & (Edad <= {edad_avanzada})
+    intensidad_recomendada{sufijo}(Edad, 'alta') <= (Edad >= {edad_minima_adulto}) & (Edad < {edad_maxima_alta_intensidad})
+"""
+
+PROGRAMA_OBJETIVO = """
+    objetivo_prioritario{sufijo}(IMC, 'peso') <= (IMC > {imc_obesidad})
+    objetivo_prioritario{sufijo}(IMC, 'peso') <= (IMC > {imc_sobrepeso}) & (IMC <= {imc_obesidad})
+    objetivo_prioritario{sufijo}(IMC, 'mantenimiento') <= (IMC >= {imc_bajo_peso}) & (IMC <= {imc_sobrepeso})
+    objetivo_prioritario{sufijo}(IMC, 'musculacion') <= (IMC < {imc_bajo_peso})
+"""
+
+
+# Evaluaciones de condiciones memorizadas por (versión de reglas, celda de entrada);
+# el dominio de celdas es de unos pocos miles como mucho
+memo_condiciones = MemoLRU(capacidad=2048)
 
 
 class MotorProlog:
     """
     Motor de inferencia lógica que usa pyDatalog (Datalog/Prolog en Python puro).
     Si pyDatalog no está disponible, usa un motor lógico implementado en Python.
+    
+    Es seguro entre hilos: pyDatalog guarda términos y reglas por hilo, así que
+    cada hilo que necesita consultar carga su propio contexto la primera vez.
+    Las tablas compiladas son de solo lectura y se comparten entre hilos.
+    
+    Args:
+        parametros: Umbrales de las reglas (ver parametros_reglas); por defecto
+            los originales
+        version: Versión del conjunto de reglas; 0 es el conjunto por defecto
     """
     
-    def __init__(self):
-        if PYDATALOG_AVAILABLE:
+    def __init__(self, parametros: Optional[Dict] = None, version: int = 0):
+        self.parametros = normalizar_parametros(parametros)
+        self.version = version
+        self._sufijo = f'_v{version}' if version else ''
+        # Distingue en el memo motores de la misma versión con parámetros distintos
+        self._clave_memo = (version, hash(tuple(sorted(self.parametros.items()))))
+        self.nucleo = nucleo_seguridad(self.parametros)
+        self._contexto_hilo = threading.local()
+        if _importar_pydatalog():
             self._inicializar_pydatalog()
         else:
-            self.motor_alternativo = MotorLogicoAlternativo()
+            self.motor_alternativo = MotorLogicoAlternativo(self.parametros)
             self.motor_alternativo.cargar_reglas_medicas()
             logger.info("Motor Prolog: Usando motor alternativo (Python puro).")
+        
+        # Compilar las reglas a tablas de decisión: pyDatalog solo se consulta aquí
+        # (sin instrumentar: son miles de consultas que no vienen de usuarios)
+        p = self.parametros
+        with instrumentacion.suspendida():
+            self.reglas_compiladas = compilar_reglas(
+                self._determinar_intensidad_interpretada,
+                self._determinar_objetivo_interpretado,
+                umbrales_edad=(p['edad_minima_adulto'], p['edad_maxima_alta_intensidad'], p['edad_avanzada']),
+                umbrales_imc=(p['imc_bajo_peso'], p['imc_sobrepeso'], p['imc_obesidad'])
+            )
     
     def _inicializar_pydatalog(self):
         """Inicializa pyDatalog y carga las reglas médicas."""
@@ -41,12 +123,21 @@ class MotorProlog:
             return
         
         # Definir predicados lógicos usando pyDatalog
-        pyDatalog.create_terms('intensidad_recomendada, objetivo_prioritario, rutina_segura, edad, imc, nivel_experiencia, intensidad_rutina, dias_rutina, nivel_rutina')
+        pyDatalog.create_terms(f'intensidad_recomendada{self._sufijo}, objetivo_prioritario{self._sufijo}')
         
         # Cargar reglas médicas
         self.cargar_reglas_medicas()
+        self._contexto_hilo.listo = True
         logger.info("Motor Prolog: pyDatalog inicializado correctamente.")
     
+    def _asegurar_contexto_hilo(self):
+        """Carga las reglas en el contexto pyDatalog del hilo actual si aún no lo están."""
+        if getattr(self._contexto_hilo, 'listo', False):
+            return
+        # Logic(True) devuelve el contexto del hilo o crea uno vacío si no existe
+        pyDatalog.Logic(True)
+        self._inicializar_pydatalog()
+    
     def cargar_reglas_medicas(self):
         """Carga las reglas médicas en pyDatalog."""
         if not PYDATALOG_AVAILABLE:
@@ -55,24 +146,31 @@ class MotorProlog:
         try:
             # Reglas de intensidad recomendada por edad
             # Sintaxis pyDatalog: predicado(X, Y) <= condición
-            pyDatalog.load("""
-                intensidad_recomendada(Edad, 'baja') <= (Edad > 60)
-                intensidad_recomendada(Edad, 'media') <= (Edad >= 18) & (Edad <= 60)
-                intensidad_recomendada(Edad, 'alta') <= (Edad >= 18) & (Edad < 40)
-            """)
+            pyDatalog.load(PROGRAMA_INTENSIDAD.format(sufijo=self._sufijo, **self.parametros))
             
             # Reglas de objetivo prioritario por IMC
-            pyDatalog.load("""
-                objetivo_prioritario(IMC, 'peso') <= (IMC > 30)
-                objetivo_prioritario(IMC, 'peso') <= (IMC > 25) & (IMC <= 30)
-                objetivo_prioritario(IMC, 'mantenimiento') <= (IMC >= 18.5) & (IMC <= 25)
-                objetivo_prioritario(IMC, 'musculacion') <= (IMC < 18.5)
-            """)
+            pyDatalog.load(PROGRAMA_OBJETIVO.format(sufijo=self._sufijo, **self.parametros))
             
             logger.info("Reglas médicas de pyDatalog cargadas correctamente.")
         except Exception as e:
             logger.error(f"Error cargando reglas pyDatalog: {e}")
     
+    @medir('pyDatalog.ask')
+    def _consultar(self, predicado: str, valor: float) -> Set[str]:
+        """
+        Consulta un predicado binario de pyDatalog con el primer argumento fijo.
+        
+        Returns:
+            Conjunto de valores que satisfacen el segundo argumento
+        """
+        if not isinstance(valor, (int, float)) or isinstance(valor, bool):
+            raise TypeError(f"Valor no numérico para {predicado}: {valor!r}")
+        self._asegurar_contexto_hilo()
+        respuesta = pyDatalog.ask(f'{predicado}{self._sufijo}({valor!r}, X)')
+        if respuesta is None:
+            return set()
+        return {fila[0] for fila in respuesta.answers}
+    
     def evaluar_seguridad_rutina(self, usuario_data: Dict, rutina_data: Dict) -> Tuple[bool, str]:
         """
         Evalúa si una rutina es segura para el usuario usando pyDatalog.
@@ -88,42 +186,45 @@ class MotorProlog:
             return self.motor_alternativo.evaluar_seguridad_rutina(usuario_data, rutina_data)
         
         try:
-            edad = usuario_data.get('edad', 30)
-            imc = usuario_data.get('imc', 25.0)
-            nivel_usuario = usuario_data.get('nivel_experiencia', 'principiante')
-            intensidad_rutina = rutina_data.get('intensidad', 'media')
-            dias_rutina = rutina_data.get('dias_semana', 3)
-            nivel_rutina = rutina_data.get('nivel', 'principiante')
-            
             # Evaluar seguridad directamente usando las reglas lógicas
             # pyDatalog se usa principalmente para consultas, aquí usamos evaluación directa
             # que implementa las mismas reglas lógicas
             return self._evaluar_seguridad_directa(usuario_data, rutina_data)
         except Exception as e:
             logger.error(f"Error en evaluación pyDatalog: {e}")
+            if instrumentacion.activa:
+                instrumentacion.registrar_fallback('_evaluar_seguridad_directa', type(e).__name__)
             return self._evaluar_seguridad_directa(usuario_data, rutina_data)
     
+    @medir('MotorProlog.evaluar_seguridad_rutinas_batch')
+    def evaluar_seguridad_rutinas_batch(
+        self, usuario_data: Dict, rutinas: List[Dict]
+    ) -> Tuple[List[bool], List[str]]:
+        """
+        Evalúa la seguridad de varias rutinas para un mismo usuario en una pasada.
+        
+        Args:
+            usuario_data: Diccionario con datos del usuario
+            rutinas: Lista de diccionarios de rutinas
+            
+        Returns:
+            Tupla (mascara, razones): un booleano por rutina y su código de razón
+            (ver MENSAJES_SEGURIDAD)
+        """
+        if not PYDATALOG_AVAILABLE:
+            return self.motor_alternativo.evaluar_seguridad_rutinas_batch(usuario_data, rutinas)
+        return self.nucleo.evaluar_lote(self.nucleo.condiciones(usuario_data), rutinas)
+    
+    @medir('MotorProlog._evaluar_seguridad_directa')
     def _evaluar_seguridad_directa(self, usuario_data: Dict, rutina_data: Dict) -> Tuple[bool, str]:
         """Evaluación directa de seguridad (fallback)."""
-        edad = usuario_data.get('edad', 30)
-        imc = usuario_data.get('imc', 25.0)
-        nivel_usuario = usuario_data.get('nivel_experiencia', 'principiante')
-        intensidad_rutina = rutina_data.get('intensidad', 'media')
-        dias_rutina = rutina_data.get('dias_semana', 3)
-        nivel_rutina = rutina_data.get('nivel', 'principiante')
-        
-        if edad > 60 and intensidad_rutina == 'alta':
-            return (False, "Intensidad alta no recomendada para mayores de 60 años")
-        if imc > 30 and dias_rutina > 5:
-            return (False, "Demasiados días de entrenamiento para comenzar con obesidad")
-        if nivel_usuario == 'principiante' and nivel_rutina == 'avanzado':
-            return (False, "Rutina demasiado avanzada para tu nivel actual")
-        
-        return (True, "Rutina segura y adecuada")
+        return self.nucleo.evaluar(self.nucleo.condiciones(usuario_data), rutina_data)
     
+    @medir('MotorProlog.determinar_intensidad_recomendada')
     def determinar_intensidad_recomendada(self, usuario_data: Dict) -> str:
         """
-        Determina la intensidad recomendada usando pyDatalog.
+        Determina la intensidad recomendada consultando la tabla de decisión
+        compilada a partir de las reglas pyDatalog.
         
         Args:
             usuario_data: Diccionario con datos del usuario
@@ -131,52 +232,79 @@ class MotorProlog:
         Returns:
             Intensidad recomendada ('baja', 'media', 'alta')
         """
+        intensidad = self.reglas_compiladas.intensidad(usuario_data)
+        if intensidad is not None:
+            if instrumentacion.activa:
+                instrumentacion.contar_regla(f'intensidad.tabla.{intensidad}')
+            return intensidad
+        if instrumentacion.activa:
+            instrumentacion.registrar_fallback('_determinar_intensidad_interpretada', 'fuera_de_dominio')
+        return self._determinar_intensidad_interpretada(usuario_data)
+    
+    def _determinar_intensidad_interpretada(self, usuario_data: Dict) -> str:
+        """Determina la intensidad consultando pyDatalog (ruta interpretada)."""
         if not PYDATALOG_AVAILABLE:
             return self.motor_alternativo.determinar_intensidad_recomendada(usuario_data)
         
+        p = self.parametros
         try:
             edad = usuario_data.get('edad', 30)
             nivel = usuario_data.get('nivel_experiencia', 'principiante')
             imc = usuario_data.get('imc', 25.0)
             imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
             
-            # Consultar pyDatalog usando la sintaxis correcta
-            X = pyDatalog.Variable()
-            query = pyDatalog.ask('intensidad_recomendada(Edad, X)', Edad=edad)
+            respuestas = self._consultar('intensidad_recomendada', edad)
             
-            if query and len(query) > 0:
-                # pyDatalog retorna una lista de respuestas
-                intensidad = query[0]['X']
+            if respuestas:
+                # Entre adulto y alta intensidad hay varias respuestas: quedarse con la más conservadora
+                intensidad = min(respuestas, key=ORDEN_INTENSIDAD.index)
                 # Ajustar según nivel y IMC
-                if nivel == 'avanzado' and edad < 40 and imc <= 30 and imc_clasificacion != 'obesidad':
-                    return 'alta'
-                elif edad > 60 or imc > 30 or imc_clasificacion == 'obesidad':
-                    return 'baja'
+                if (nivel == 'avanzado' and edad < p['edad_maxima_alta_intensidad']
+                        and imc <= p['imc_obesidad'] and imc_clasificacion != 'obesidad'):
+                    regla, intensidad = 'intensidad.ajuste_avanzado', 'alta'
+                elif edad > p['edad_avanzada'] or imc > p['imc_obesidad'] or imc_clasificacion == 'obesidad':
+                    regla, intensidad = 'intensidad.ajuste_edad_obesidad', 'baja'
+                else:
+                    regla = f'intensidad.datalog.{intensidad}'
+                if instrumentacion.activa:
+                    instrumentacion.contar_regla(regla)
                 return intensidad
             
             # Fallback a evaluación directa
+            if instrumentacion.activa:
+                instrumentacion.registrar_fallback('_determinar_intensidad_directa', 'sin_respuesta')
             return self._determinar_intensidad_directa(usuario_data)
         except Exception as e:
             logger.error(f"Error en pyDatalog: {e}")
+            if instrumentacion.activa:
+                instrumentacion.registrar_fallback('_determinar_intensidad_directa', type(e).__name__)
             return self._determinar_intensidad_directa(usuario_data)
     
+    @medir('MotorProlog._determinar_intensidad_directa')
     def _determinar_intensidad_directa(self, usuario_data: Dict) -> str:
         """Determina intensidad directamente (fallback)."""
+        p = self.parametros
         edad = usuario_data.get('edad', 30)
         nivel = usuario_data.get('nivel_experiencia', 'principiante')
         imc = usuario_data.get('imc', 25.0)
         imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
         
-        if edad > 60 or imc > 30 or imc_clasificacion == 'obesidad':
-            return 'baja'
-        elif nivel == 'avanzado' and edad < 40:
-            return 'alta'
+        if edad > p['edad_avanzada'] or imc > p['imc_obesidad'] or imc_clasificacion == 'obesidad':
+            intensidad = 'baja'
+        elif nivel == 'avanzado' and edad < p['edad_maxima_alta_intensidad']:
+            intensidad = 'alta'
         else:
-            return 'media'
+            intensidad = 'media'
+        
+        if instrumentacion.activa:
+            instrumentacion.contar_regla(f'intensidad.directa.{intensidad}')
+        return intensidad
     
+    @medir('MotorProlog.determinar_objetivo_prioritario')
     def determinar_objetivo_prioritario(self, usuario_data: Dict) -> str:
         """
-        Determina el objetivo prioritario usando pyDatalog.
+        Determina el objetivo prioritario consultando la tabla de decisión
+        compilada a partir de las reglas pyDatalog.
         
         Args:
             usuario_data: Diccionario con datos del usuario
@@ -184,6 +312,17 @@ class MotorProlog:
         Returns:
             Objetivo prioritario
         """
+        objetivo = self.reglas_compiladas.objetivo(usuario_data)
+        if objetivo is not None:
+            if instrumentacion.activa:
+                instrumentacion.contar_regla(f'objetivo.tabla.{objetivo}')
+            return objetivo
+        if instrumentacion.activa:
+            instrumentacion.registrar_fallback('_determinar_objetivo_interpretado', 'fuera_de_dominio')
+        return self._determinar_objetivo_interpretado(usuario_data)
+    
+    def _determinar_objetivo_interpretado(self, usuario_data: Dict) -> str:
+        """Determina el objetivo consultando pyDatalog (ruta interpretada)."""
         if not PYDATALOG_AVAILABLE:
             return self.motor_alternativo.determinar_objetivo_prioritario(usuario_data)
         
@@ -192,35 +331,43 @@ class MotorProlog:
             imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
             objetivo_usuario = usuario_data.get('objetivos', 'salud')
             
-            # Consultar pyDatalog usando la sintaxis correcta
-            X = pyDatalog.Variable()
-            query = pyDatalog.ask('objetivo_prioritario(IMC, X)', IMC=imc)
+            respuestas = self._consultar('objetivo_prioritario', imc)
             
-            if query and len(query) > 0:
-                # pyDatalog retorna una lista de respuestas
-                objetivo = query[0]['X']
+            if respuestas:
+                objetivo = sorted(respuestas)[0]
+                regla = f'objetivo.datalog.{objetivo}'
                 # Ajustar según clasificación IMC
                 if imc_clasificacion in ['obesidad', 'sobrepeso']:
-                    return 'peso'
+                    regla, objetivo = 'objetivo.ajuste_sobrepeso', 'peso'
                 elif imc_clasificacion == 'bajo_peso':
-                    return 'musculacion'
+                    regla, objetivo = 'objetivo.ajuste_bajo_peso', 'musculacion'
+                # En el rango saludable prevalece el objetivo declarado por el usuario
+                elif objetivo == 'mantenimiento' and objetivo_usuario:
+                    regla, objetivo = 'objetivo.declarado', objetivo_usuario
+                if instrumentacion.activa:
+                    instrumentacion.contar_regla(regla)
                 return objetivo
             
             # Fallback
+            if instrumentacion.activa:
+                instrumentacion.registrar_fallback('_determinar_objetivo_directo', 'sin_respuesta')
             return self._determinar_objetivo_directo(usuario_data)
         except Exception as e:
             logger.error(f"Error en pyDatalog: {e}")
+            if instrumentacion.activa:
+                instrumentacion.registrar_fallback('_determinar_objetivo_directo', type(e).__name__)
             return self._determinar_objetivo_directo(usuario_data)
     
     def _determinar_objetivo_directo(self, usuario_data: Dict) -> str:
         """Determina objetivo directamente (fallback)."""
+        p = self.parametros
         imc = usuario_data.get('imc', 25.0)
         imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
         objetivo_usuario = usuario_data.get('objetivos', 'salud')
         
-        if imc > 30 or imc_clasificacion in ['obesidad', 'sobrepeso']:
+        if imc > p['imc_obesidad'] or imc_clasificacion in ['obesidad', 'sobrepeso']:
             return 'peso'
-        elif imc < 18.5 or imc_clasificacion == 'bajo_peso':
+        elif imc < p['imc_bajo_peso'] or imc_clasificacion == 'bajo_peso':
             return 'musculacion'
         else:
             return objetivo_usuario if objetivo_usuario else 'mantenimiento'
@@ -253,99 +400,177 @@ class MotorProlog:
         if rutina_data.get('objetivo') == objetivo_recomendado:
             explicaciones.append(f"✓ Alineada con tu objetivo de {rutina_data['objetivo']}")
         
-        if edad > 50 and rutina_data.get('intensidad') == 'baja':
+        if edad > self.parametros['edad_madura'] and rutina_data.get('intensidad') == 'baja':
             explicaciones.append("✓ Intensidad baja recomendada por tu edad")
         
-        if imc > 25 and rutina_data.get('objetivo') == 'peso':
+        if imc > self.parametros['imc_sobrepeso'] and rutina_data.get('objetivo') == 'peso':
             explicaciones.append("✓ Enfocada en pérdida de peso según tu IMC")
         
         return '\n'.join(explicaciones) if explicaciones else "Rutina compatible con tu perfil"
     
+    @medir('MotorProlog.evaluar_condiciones')
     def evaluar_condiciones(self, usuario_data: Dict) -> Dict[str, Any]:
         """
         Evalúa todas las condiciones médicas usando pyDatalog.
         
+        El resultado solo depende de la celda de la entrada en las tablas
+        compiladas, así que se memoriza por celda y versión de reglas. Se
+        devuelve de solo lectura porque se comparte entre llamadores.
+        
         Args:
             usuario_data: Diccionario con datos del usuario
             
         Returns:
-            Diccionario con evaluación completa
+            Mapeo inmutable con la evaluación completa (precauciones en tupla)
         """
+        celda = self.reglas_compiladas.celda(usuario_data)
+        if celda is None:
+            return self._evaluar_condiciones_sin_memo(usuario_data)
+        return memo_condiciones.obtener(
+            (self._clave_memo, celda),
+            lambda: self._evaluar_condiciones_sin_memo(usuario_data)
+        )
+    
+    def _evaluar_condiciones_sin_memo(self, usuario_data: Dict) -> Dict[str, Any]:
         if not PYDATALOG_AVAILABLE:
-            return self.motor_alternativo.evaluar_condiciones(usuario_data)
-        
-        evaluacion = {
-            'intensidad_recomendada': self.determinar_intensidad_recomendada(usuario_data),
-            'objetivo_prioritario': self.determinar_objetivo_prioritario(usuario_data),
-            'precauciones': self._obtener_precauciones(usuario_data),
-            'es_seguro': True
-        }
-        
-        return evaluacion
+            evaluacion = self.motor_alternativo.evaluar_condiciones(usuario_data)
+        else:
+            evaluacion = {
+                'intensidad_recomendada': self.determinar_intensidad_recomendada(usuario_data),
+                'objetivo_prioritario': self.determinar_objetivo_prioritario(usuario_data),
+                'precauciones': self._obtener_precauciones(usuario_data),
+                'es_seguro': True
+            }
+        evaluacion['precauciones'] = tuple(evaluacion['precauciones'])
+        return MappingProxyType(evaluacion)
     
     def _obtener_precauciones(self, usuario_data: Dict) -> List[str]:
         """Obtiene lista de precauciones."""
+        p = self.parametros
         precauciones = []
         edad = usuario_data.get('edad', 30)
         imc = usuario_data.get('imc', 25.0)
         imc_clasificacion = usuario_data.get('imc_clasificacion', 'normal')
         
-        if edad > 60:
+        if edad > p['edad_avanzada']:
             precauciones.append("Edad avanzada: se recomienda intensidad baja")
-        if imc > 30 or imc_clasificacion == 'obesidad':
+        if imc > p['imc_obesidad'] or imc_clasificacion == 'obesidad':
             precauciones.append("Obesidad: comenzar con rutinas de baja intensidad")
-        if imc < 18.5 or imc_clasificacion == 'bajo_peso':
+        if imc < p['imc_bajo_peso'] or imc_clasificacion == 'bajo_peso':
             precauciones.append("Bajo peso: consultar médico antes de entrenar intensamente")
         
         return precauciones
 
 
+def programa_seguridad(parametros: Dict) -> Programa:
+    """
+    Reglas de seguridad como programa Datalog sobre hechos de usuarios y rutinas
+    (las mismas de `NucleoSeguridad`, para inferencia masiva).
+    
+    Hechos de entrada: usuario(U), edad(U, E), imc(U, I), nivel_usuario(U, N),
+    rutina(R), intensidad(R, I), dias(R, D), nivel_rutina(R, N).
+    Derivados: rutina_insegura(U, R, Razon) y rutina_segura(U, R).
+    """
+    p = parametros
+    U, R, E, I, D, Z = Var('U'), Var('R'), Var('E'), Var('I'), Var('D'), Var('Z')
+    return Programa([
+        Regla(Atomo('edad_avanzada', U), [Atomo('edad', U, E), Comparacion('>', E, p['edad_avanzada'])]),
+        Regla(Atomo('obesidad', U), [Atomo('imc', U, I), Comparacion('>', I, p['imc_obesidad'])]),
+        Regla(Atomo('principiante', U), [Atomo('nivel_usuario', U, 'principiante')]),
+        
+        # Regla 1: Edad avanzada e intensidad alta
+        Regla(Atomo('rutina_insegura', U, R, RAZON_EDAD_INTENSIDAD),
+              [Atomo('edad_avanzada', U), Atomo('intensidad', R, 'alta')]),
+        # Regla 2: Obesidad y muchos días
+        Regla(Atomo('rutina_insegura', U, R, RAZON_OBESIDAD_DIAS),
+              [Atomo('obesidad', U), Atomo('dias', R, D),
+               Comparacion('>', D, p['dias_maximos_obesidad'])]),
+        # Regla 3: Principiante con rutina avanzada
+        Regla(Atomo('rutina_insegura', U, R, RAZON_NIVEL_AVANZADO),
+              [Atomo('principiante', U), Atomo('nivel_rutina', R, 'avanzado')]),
+        
+        Regla(Atomo('bloqueada', U, R), [Atomo('rutina_insegura', U, R, Z)]),
+        Regla(Atomo('rutina_segura', U, R),
+              [Atomo('usuario', U), Atomo('rutina', R), No(Atomo('bloqueada', U, R))]),
+    ])
+
+
 class MotorLogicoAlternativo:
     """
     Motor lógico alternativo implementado en Python puro.
     Se usa cuando pyDatalog no está disponible.
+    
+    Las consultas de un usuario usan reglas directas; para inferencia masiva
+    (muchos usuarios x muchas rutinas) las reglas de seguridad se evalúan como
+    programa Datalog en un solo punto fijo (ver `inferir_rutinas_seguras`).
     """
     
-    def __init__(self):
-        self.reglas = []
+    def __init__(self, parametros: Optional[Dict] = None):
+        self.parametros = normalizar_parametros(parametros)
+        self.nucleo = nucleo_seguridad(self.parametros)
+        self.programa = None
+        self.cargar_reglas_medicas()
     
     def cargar_reglas_medicas(self):
-        """Carga reglas médicas en el motor alternativo."""
-        # Las reglas se implementan como funciones de evaluación
-        pass
+        """Carga las reglas médicas como programa Datalog."""
+        if self.programa is None:
+            self.programa = programa_seguridad(self.parametros)
+    
+    def inferir_rutinas_seguras(
+        self, usuarios: Dict[Any, Dict], rutinas: Dict[Any, Dict]
+    ) -> Tuple[Set[Tuple], Dict[Tuple, str]]:
+        """
+        Deriva rutina_segura(U, R) para todos los pares usuario-rutina a la vez.
+        
+        Args:
+            usuarios: Datos de cada usuario por identificador
+            rutinas: Datos de cada rutina por identificador
+            
+        Returns:
+            Tupla (seguras, rechazos): el conjunto de pares (usuario, rutina)
+            seguros y, para el resto, el código de razón de la primera regla
+            que los rechaza
+        """
+        items_usuarios = usuarios.items()
+        items_rutinas = rutinas.items()
+        base = self.programa.evaluar({
+            'usuario': ((u,) for u in usuarios),
+            'edad': ((u, d.get('edad', 30)) for u, d in items_usuarios),
+            'imc': ((u, d.get('imc', 25.0)) for u, d in items_usuarios),
+            'nivel_usuario': ((u, d.get('nivel_experiencia', 'principiante')) for u, d in items_usuarios),
+            'rutina': ((r,) for r in rutinas),
+            'intensidad': ((r, d.get('intensidad', 'media')) for r, d in items_rutinas),
+            'dias': ((r, d.get('dias_semana', 3)) for r, d in items_rutinas),
+            'nivel_rutina': ((r, d.get('nivel', 'principiante')) for r, d in items_rutinas),
+        })
+        
+        rechazos: Dict[Tuple, str] = {}
+        for u, r, razon in base.tuplas('rutina_insegura'):
+            actual = rechazos.get((u, r))
+            if actual is None or ORDEN_RAZONES.index(razon) < ORDEN_RAZONES.index(actual):
+                rechazos[(u, r)] = razon
+        return base.tuplas('rutina_segura'), rechazos
     
     def evaluar_seguridad_rutina(self, usuario_data: Dict, rutina_data: Dict) -> Tuple[bool, str]:
         """Evalúa seguridad de rutina."""
-        edad = usuario_data.get('edad', 30)
-        imc = usuario_data.get('imc', 25.0)
-        nivel_usuario = usuario_data.get('nivel_experiencia', 'principiante')
-        nivel_rutina = rutina_data.get('nivel', 'principiante')
-        intensidad_rutina = rutina_data.get('intensidad', 'media')
-        dias_rutina = rutina_data.get('dias_semana', 3)
-        
-        # Regla 1: Edad > 60 y intensidad alta
-        if edad > 60 and intensidad_rutina == 'alta':
-            return (False, "Intensidad alta no recomendada para mayores de 60 años")
-        
-        # Regla 2: Obesidad y muchos días
-        if imc > 30 and dias_rutina > 5:
-            return (False, "Demasiados días de entrenamiento para comenzar con obesidad")
-        
-        # Regla 3: Principiante con rutina avanzada
-        if nivel_usuario == 'principiante' and nivel_rutina == 'avanzado':
-            return (False, "Rutina demasiado avanzada para tu nivel actual")
-        
-        return (True, "Rutina segura y adecuada")
+        return self.nucleo.evaluar(self.nucleo.condiciones(usuario_data), rutina_data)
+    
+    def evaluar_seguridad_rutinas_batch(
+        self, usuario_data: Dict, rutinas: List[Dict]
+    ) -> Tuple[List[bool], List[str]]:
+        """Evalúa seguridad de varias rutinas; devuelve (mascara, razones)."""
+        return self.nucleo.evaluar_lote(self.nucleo.condiciones(usuario_data), rutinas)
     
     def determinar_intensidad_recomendada(self, usuario_data: Dict) -> str:
         """Determina intensidad recomendada."""
+        p = self.parametros
         edad = usuario_data.get('edad', 30)
         nivel = usuario_data.get('nivel_experiencia', 'principiante')
         imc = usuario_data.get('imc', 25.0)
         
-        if edad > 60 or imc > 30:
+        if edad > p['edad_avanzada'] or imc > p['imc_obesidad']:
             return 'baja'
-        elif nivel == 'avanzado' and edad < 40:
+        elif nivel == 'avanzado' and edad < p['edad_maxima_alta_intensidad']:
             return 'alta'
         else:
             return 'media'
@@ -354,9 +579,9 @@ class MotorLogicoAlternativo:
         """Determina objetivo prioritario."""
         imc = usuario_data.get('imc', 25.0)
         
-        if imc > 30:
+        if imc > self.parametros['imc_obesidad']:
             return 'peso'
-        elif imc < 18.5:
+        elif imc < self.parametros['imc_bajo_peso']:
             return 'musculacion'
         else:
             return usuario_data.get('objetivos', 'mantenimiento')
@@ -375,10 +600,10 @@ class MotorLogicoAlternativo:
         if rutina_data.get('objetivo') == usuario_data.get('objetivos'):
             explicaciones.append(f"✓ Alineada con tu objetivo de {rutina_data['objetivo']}")
         
-        if edad > 50 and rutina_data.get('intensidad') == 'baja':
+        if edad > self.parametros['edad_madura'] and rutina_data.get('intensidad') == 'baja':
             explicaciones.append("✓ Intensidad baja recomendada por tu edad")
         
-        if imc > 25 and rutina_data.get('objetivo') == 'peso':
+        if imc > self.parametros['imc_sobrepeso'] and rutina_data.get('objetivo') == 'peso':
             explicaciones.append("✓ Enfocada en pérdida de peso según tu IMC")
         
         return '\n'.join(explicaciones) if explicaciones else "Rutina compatible con tu perfil"
@@ -394,19 +619,38 @@ class MotorLogicoAlternativo:
     
     def _obtener_precauciones(self, usuario_data: Dict) -> List[str]:
         """Obtiene lista de precauciones."""
+        p = self.parametros
         precauciones = []
         edad = usuario_data.get('edad', 30)
         imc = usuario_data.get('imc', 25.0)
         
-        if edad > 60:
+        if edad > p['edad_avanzada']:
             precauciones.append("Edad avanzada: se recomienda intensidad baja")
-        if imc > 30:
+        if imc > p['imc_obesidad']:
             precauciones.append("Obesidad: comenzar con rutinas de baja intensidad")
-        if imc < 18.5:
+        if imc < p['imc_bajo_peso']:
             precauciones.append("Bajo peso: consultar médico antes de entrenar intensamente")
         
         return precauciones
 
 
-# Instancia global del motor
-motor_prolog = MotorProlog()
+# Instancia global del motor, construida en el primer uso
+_motor_por_defecto: Optional[MotorProlog] = None
+_lock_motor_por_defecto = threading.Lock()
+
+
+def obtener_motor_por_defecto() -> MotorProlog:
+    """Devuelve el motor con las reglas por defecto, construyéndolo la primera vez."""
+    global _motor_por_defecto
+    if _motor_por_defecto is None:
+        with _lock_motor_por_defecto:
+            if _motor_por_defecto is None:
+                _motor_por_defecto = MotorProlog()
+    return _motor_por_defecto
+
+
+def __getattr__(nombre: str):
+    # Compatibilidad: `prolog_engine.motor_prolog` construye el motor al accederlo
+    if nombre == 'motor_prolog':
+        return obtener_motor_por_defecto()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
@@ -0,0 +1,307 @@
+"""
+Recomendación anónima (formulario público y API JSON).
+
+`validar_formulario()` y `perfilar()` hacen los pasos comunes con la vista
+`recomendar`: validar el formulario, calcular el IMC y aplicar las reglas de
+nivel, objetivo e intensidad.
+
+`clasificar()` ordena las rutinas del catálogo para ese perfil por la ruta
+más rápida disponible:
+
+- Seguridad: la razón de cada rutina sale del índice de seguridad de la
+  instantánea del catálogo (bitsets por región), sin evaluar reglas.
+- Puntuación: la compatibilidad solo depende de nivel, objetivo, intensidad
+  recomendados y días disponibles, que toman pocos valores. La
+  clasificación completa se memoriza por (versión del catálogo, reglas,
+  perfil), así que la mayoría de peticiones no puntúa ninguna rutina.
+
+La página de resultado del formulario (`resultado_formulario()`) es función
+pura de las cinco entradas y de las rutinas de datos.py, que solo cambian
+con un despliegue. Su contexto se memoriza por (versión de las reglas,
+entradas normalizadas), con peso y altura redondeados a la precisión del
+formulario (0,1 kg y 0,01 m); opcionalmente también el HTML de la sección
+de resultados (`fragmento_resultado()`).
+"""
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.template.loader import render_to_string
+
+from . import logic_rules, processor
+from .catalogo import InstantaneaCatalogo
+from .datos import RUTINAS
+from .memo import MemoLRU
+from .nucleo_reglas import RAZON_SEGURA, nucleo_seguridad
+
+OBJETIVOS_FORMULARIO = ('peso', 'musculacion', 'mantenimiento')
+CAMPOS_FORMULARIO = ('edad', 'peso', 'altura', 'dias_disponibles', 'objetivo')
+
+IMC_TEXTO = {
+    'bajo_peso': 'Bajo Peso',
+    'normal': 'Normal',
+    'sobrepeso': 'Sobrepeso',
+    'obesidad': 'Obesidad'
+}
+
+# Clasificaciones completas memorizadas (una por versión de catálogo, reglas y perfil)
+memo_clasificaciones = MemoLRU(capacidad=4096)
+
+# Contextos y fragmentos HTML de la página de resultado (por reglas y entradas normalizadas)
+memo_resultados = MemoLRU(capacidad=4096)
+memo_fragmentos = MemoLRU(capacidad=1024)
+
+
+class RutinaClasificada(NamedTuple):
+    """Una rutina del catálogo puntuada para un perfil."""
+    rutina: Dict
+    puntuacion: float
+    razon: str
+
+    @property
+    def segura(self) -> bool:
+        return self.razon == RAZON_SEGURA
+
+
+def _numero(texto, tipo) -> Optional[float]:
+    """Valor numérico finito de un campo, o None si falta o no se puede interpretar."""
+    try:
+        valor = tipo(texto)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return valor if math.isfinite(valor) else None
+
+
+def validar_formulario(datos_raw: Dict) -> List[str]:
+    """
+    Errores de los datos del formulario público (lista vacía si son válidos).
+
+    Un número que no se puede interpretar o no es finito ('nan', 'inf')
+    cuenta como fuera de rango.
+    """
+    edad = _numero(datos_raw.get('edad'), int)
+    peso = _numero(datos_raw.get('peso'), float)
+    altura = _numero(datos_raw.get('altura'), float)
+    dias = _numero(datos_raw.get('dias_disponibles'), int)
+
+    errores = []
+    if edad is None or edad < 15 or edad > 100:
+        errores.append('La edad debe estar entre 15 y 100 años')
+    if peso is None or peso < 30 or peso > 300:
+        errores.append('El peso debe estar entre 30 y 300 kg')
+    if altura is None or altura < 1.0 or altura > 2.5:
+        errores.append('La altura debe estar entre 1.0 y 2.5 metros')
+    if dias is None or dias < 1 or dias > 7:
+        errores.append('Los días disponibles deben estar entre 1 y 7')
+    if not datos_raw.get('objetivo') or datos_raw['objetivo'] not in OBJETIVOS_FORMULARIO:
+        errores.append('Objetivo inválido')
+    return errores
+
+
+def perfilar(datos_raw: Dict, parametros: Dict) -> Dict:
+    """
+    Datos del usuario anónimo con IMC, nivel, objetivo e intensidad recomendados.
+
+    Args:
+        datos_raw: Datos del formulario ya validados (ver `validar_formulario`)
+        parametros: Parámetros del conjunto de reglas vigente
+
+    Returns:
+        Diccionario para processor y logic_rules
+    """
+    datos_usuario = processor.transformar_datos_usuario(datos_raw)
+
+    imc = processor.calcular_imc(datos_usuario['peso'], datos_usuario['altura'])
+    imc_clasificacion = processor.clasificar_imc(imc)
+
+    nivel_recomendado = logic_rules.determinar_nivel_usuario(
+        datos_usuario['edad'],
+        datos_usuario['dias_disponibles'],
+        imc_clasificacion,
+        parametros
+    )
+    objetivo_recomendado = logic_rules.determinar_objetivo_recomendado(
+        datos_usuario['objetivo'],
+        imc_clasificacion
+    )
+    intensidad_recomendada = logic_rules.determinar_intensidad_segura(
+        datos_usuario['edad'],
+        imc_clasificacion,
+        nivel_recomendado,
+        parametros
+    )
+
+    datos_usuario['imc'] = imc
+    datos_usuario['imc_clasificacion'] = imc_clasificacion
+    datos_usuario['nivel_recomendado'] = nivel_recomendado
+    datos_usuario['objetivo_recomendado'] = objetivo_recomendado
+    datos_usuario['intensidad_recomendada'] = intensidad_recomendada
+    return datos_usuario
+
+
+def _clave_puntuacion(datos_usuario: Dict) -> Tuple:
+    """Entradas de processor.calcular_compatibilidad que dependen del usuario."""
+    return (
+        datos_usuario.get('nivel_recomendado'),
+        datos_usuario.get('objetivo_recomendado'),
+        datos_usuario.get('intensidad_recomendada'),
+        datos_usuario.get('dias_disponibles'),
+    )
+
+
+def clasificar(
+    catalogo: InstantaneaCatalogo, datos_usuario: Dict, parametros: Dict
+) -> Tuple[RutinaClasificada, ...]:
+    """
+    Todas las rutinas del catálogo ordenadas por compatibilidad (como
+    processor.ordenar_por_puntuacion), con su razón de seguridad.
+
+    Args:
+        catalogo: Instantánea del catálogo
+        datos_usuario: Perfil de `perfilar`
+        parametros: Parámetros del conjunto de reglas vigente
+
+    Returns:
+        Tupla de RutinaClasificada, de mayor a menor puntuación
+    """
+    nucleo = nucleo_seguridad(parametros)
+    condiciones = logic_rules.condiciones_validacion(datos_usuario, parametros)
+    clave = (catalogo.clave, nucleo.clave, condiciones, _clave_puntuacion(datos_usuario))
+
+    def calcular():
+        razones = catalogo.indice_seguridad(nucleo).razones(condiciones)
+        puntuadas = processor.ordenar_por_puntuacion(
+            processor.calcular_puntuaciones(list(catalogo.dicts), datos_usuario)
+        )
+        return tuple(
+            RutinaClasificada(rutina, puntuacion, razones[catalogo.posicion[rutina['id']]])
+            for rutina, puntuacion in puntuadas
+        )
+
+    return memo_clasificaciones.obtener(clave, calcular)
+
+
+def resumen_recomendacion(
+    catalogo: InstantaneaCatalogo, datos_usuario: Dict, parametros: Dict, limite: int
+) -> Dict:
+    """
+    Respuesta compacta de la API: perfil y las `limite` mejores rutinas con
+    puntuación, veredicto de seguridad y códigos de explicación.
+    """
+    clasificadas = clasificar(catalogo, datos_usuario, parametros)[:limite]
+    return {
+        'perfil': {
+            'imc': round(datos_usuario['imc'], 2),
+            'imc_clasificacion': datos_usuario['imc_clasificacion'],
+            'nivel': datos_usuario['nivel_recomendado'],
+            'objetivo': datos_usuario['objetivo_recomendado'],
+            'intensidad': datos_usuario['intensidad_recomendada'],
+        },
+        'rutinas': [
+            {
+                'id': clasificada.rutina['id'],
+                'nombre': clasificada.rutina['nombre'],
+                'puntuacion': round(clasificada.puntuacion, 1),
+                'segura': clasificada.segura,
+                'razon': clasificada.razon,
+                'explicacion': logic_rules.codigos_explicacion(datos_usuario, clasificada.rutina, parametros),
+                'calorias_estimadas': processor.calcular_calorias_estimadas(
+                    clasificada.rutina['duracion_minutos'],
+                    clasificada.rutina['intensidad'],
+                    datos_usuario['peso']
+                ),
+            }
+            for clasificada in clasificadas
+        ],
+        'catalogo': catalogo.version,
+    }
+
+
+def leer_entrada(datos: Dict) -> Dict:
+    """Campos del formulario de un diccionario de entrada (JSON o QueryDict), como texto."""
+    return {
+        campo: (str(datos.get(campo)) if datos.get(campo) is not None else None)
+        for campo in CAMPOS_FORMULARIO
+    }
+
+
+def normalizar_formulario(datos_raw: Dict) -> Tuple:
+    """
+    Entradas validadas del formulario como tupla hashable, con peso y altura
+    redondeados a la precisión del formulario (0,1 kg y 0,01 m).
+
+    Args:
+        datos_raw: Datos del formulario ya validados (ver `validar_formulario`)
+
+    Returns:
+        Tupla en el orden de CAMPOS_FORMULARIO
+    """
+    return (
+        int(datos_raw['edad']),
+        round(float(datos_raw['peso']), 1),
+        round(float(datos_raw['altura']), 2),
+        int(datos_raw['dias_disponibles']),
+        datos_raw['objetivo'],
+    )
+
+
+def _clave_resultado(entrada: Tuple, parametros: Dict, version_reglas: int) -> Tuple:
+    return (version_reglas, tuple(sorted(parametros.items())), entrada)
+
+
+def resultado_formulario(entrada: Tuple, parametros: Dict, version_reglas: int) -> Optional[Dict]:
+    """
+    Contexto de resultado.html para unas entradas normalizadas.
+
+    Los valores se comparten entre peticiones: no deben modificarse (la vista
+    hace una copia superficial antes de añadir nada).
+
+    Args:
+        entrada: Tupla de `normalizar_formulario`
+        parametros: Parámetros del conjunto de reglas vigente
+        version_reglas: Versión del conjunto de reglas (parte de la clave)
+
+    Returns:
+        Diccionario de contexto, o None si ninguna rutina es compatible
+    """
+    def calcular():
+        datos_usuario = perfilar(dict(zip(CAMPOS_FORMULARIO, map(str, entrada))), parametros)
+        rutina_principal, puntuacion = processor.obtener_mejor_rutina(RUTINAS, datos_usuario)
+        if not rutina_principal:
+            return None
+
+        es_seguro, razon_seguridad = logic_rules.validar_seguridad_rutina(rutina_principal, datos_usuario, parametros)
+        return {
+            'usuario': datos_usuario,
+            'rutina': rutina_principal,
+            'puntuacion': round(puntuacion, 1),
+            'es_seguro': es_seguro,
+            'razon_seguridad': razon_seguridad,
+            'explicacion': logic_rules.generar_explicacion_recomendacion(datos_usuario, rutina_principal, parametros),
+            'alternativas': processor.obtener_rutinas_alternativas(
+                RUTINAS,
+                datos_usuario,
+                rutina_principal['id'],
+                limite=3
+            ),
+            'calorias_estimadas': processor.calcular_calorias_estimadas(
+                rutina_principal['duracion_minutos'],
+                rutina_principal['intensidad'],
+                datos_usuario['peso']
+            ),
+            'imc_texto': f"{datos_usuario['imc']:.1f}",
+            'imc_clasificacion_texto': IMC_TEXTO.get(datos_usuario['imc_clasificacion'], 'Normal'),
+        }
+
+    return memo_resultados.obtener(_clave_resultado(entrada, parametros, version_reglas), calcular)
+
+
+def fragmento_resultado(entrada: Tuple, parametros: Dict, version_reglas: int, contexto: Dict) -> str:
+    """
+    HTML de la sección de resultados (parciales/resultado.html), memorizado
+    con la misma clave que el contexto. No depende del usuario ni de la
+    petición: no lleva token CSRF ni datos de sesión.
+    """
+    return memo_fragmentos.obtener(
+        _clave_resultado(entrada, parametros, version_reglas),
+        lambda: render_to_string('recommender/parciales/resultado.html', contexto)
+    )
@@ -0,0 +1,258 @@
+"""
+Compilador de reglas médicas a tablas de decisión.
+
+Las reglas de `MotorProlog` (intensidad recomendada y objetivo prioritario)
+solo comparan la edad y el IMC contra un puñado de umbrales y el resto de
+entradas contra valores conocidos. Por eso su respuesta es constante dentro
+de cada celda del dominio discretizado:
+
+- Ejes numéricos: cada umbral parte el eje en "por debajo", "exactamente en"
+  y "por encima", lo que respeta cualquier combinación de <, <=, > y >=.
+- Ejes categóricos: cada valor conocido es una celda y cualquier otro valor
+  comparte una celda común.
+
+Al construir el motor se evalúa la ruta interpretada (pyDatalog + ajustes en Python)
+una sola vez por celda y se guarda el resultado en una tabla plana. En línea,
+cada consulta es un cálculo de índice y un acceso a lista.
+"""
+from bisect import bisect_left
+from itertools import product
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .parametros_reglas import PARAMETROS_POR_DEFECTO
+
+
+# Umbrales que aparecen en las reglas Datalog y en los ajustes en Python
+# (valores del conjunto de reglas por defecto)
+UMBRALES_EDAD = (
+    PARAMETROS_POR_DEFECTO['edad_minima_adulto'],
+    PARAMETROS_POR_DEFECTO['edad_maxima_alta_intensidad'],
+    PARAMETROS_POR_DEFECTO['edad_avanzada'],
+)
+UMBRALES_IMC = (
+    PARAMETROS_POR_DEFECTO['imc_bajo_peso'],
+    PARAMETROS_POR_DEFECTO['imc_sobrepeso'],
+    PARAMETROS_POR_DEFECTO['imc_obesidad'],
+)
+
+NIVELES = ('principiante', 'intermedio', 'avanzado')
+CLASIFICACIONES_IMC = ('bajo_peso', 'normal', 'sobrepeso', 'obesidad')
+OBJETIVOS = ('peso', 'musculacion', 'mantenimiento', 'resistencia', 'flexibilidad', 'salud')
+
+# Representante de "cualquier otro valor" en los ejes categóricos
+VALOR_OTRO = '__otro__'
+
+
+class EjeIntervalos:
+    """Eje numérico discretizado en celdas delimitadas por umbrales."""
+
+    def __init__(self, umbrales: Sequence[float]):
+        self.umbrales = tuple(sorted(set(umbrales)))
+
+    def __len__(self) -> int:
+        return 2 * len(self.umbrales) + 1
+
+    def indice(self, valor: Any) -> Optional[int]:
+        """
+        Devuelve la celda del valor: 2*i para el hueco anterior al umbral i
+        y 2*i + 1 para el propio umbral i.
+        """
+        if isinstance(valor, bool) or not isinstance(valor, (int, float)) or valor != valor:
+            return None
+        i = bisect_left(self.umbrales, valor)
+        if i < len(self.umbrales) and self.umbrales[i] == valor:
+            return 2 * i + 1
+        return 2 * i
+
+    def representantes(self) -> List[float]:
+        """Un valor por celda, en el mismo orden que `indice`."""
+        u = self.umbrales
+        valores = [u[0] - 1]
+        for i, umbral in enumerate(u):
+            valores.append(umbral)
+            valores.append((umbral + u[i + 1]) / 2 if i + 1 < len(u) else umbral + 1)
+        return valores
+
+
+class EjeCategorico:
+    """Eje de valores discretos; opcionalmente agrupa los desconocidos."""
+
+    def __init__(self, valores: Sequence[Any], agrupar_otros: bool = True):
+        self.valores = tuple(valores)
+        self.agrupar_otros = agrupar_otros
+        self._indices = {valor: i for i, valor in enumerate(self.valores)}
+
+    def __len__(self) -> int:
+        return len(self.valores) + (1 if self.agrupar_otros else 0)
+
+    def indice(self, valor: Any) -> Optional[int]:
+        try:
+            indice = self._indices.get(valor)
+        except TypeError:  # valores no hashables
+            return None
+        if indice is None and self.agrupar_otros:
+            return len(self.valores)
+        return indice
+
+    def representantes(self) -> List[Any]:
+        return list(self.valores) + ([VALOR_OTRO] if self.agrupar_otros else [])
+
+
+class TablaDecision:
+    """Tabla plana indexada por las celdas de varios ejes."""
+
+    def __init__(self, ejes: Sequence[Any], valores: List[Any]):
+        self.ejes = tuple(ejes)
+        self.valores = valores
+        self._pasos = []
+        paso = 1
+        for eje in reversed(self.ejes):
+            self._pasos.append(paso)
+            paso *= len(eje)
+        self._pasos.reverse()
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+    def consultar(self, *coordenadas: Any) -> Optional[Any]:
+        """
+        Devuelve el valor de la celda de las coordenadas, o None si alguna
+        queda fuera del dominio compilado.
+        """
+        posicion = 0
+        for eje, paso, valor in zip(self.ejes, self._pasos, coordenadas):
+            indice = eje.indice(valor)
+            if indice is None:
+                return None
+            posicion += indice * paso
+        return self.valores[posicion]
+
+
+def compilar_tabla(
+    funcion: Callable[[Dict], Any],
+    ejes: Sequence[Any],
+    construir_entrada: Callable[..., Dict]
+) -> TablaDecision:
+    """
+    Evalúa `funcion` una vez por celda del producto de los ejes.
+
+    Args:
+        funcion: Ruta interpretada que recibe un diccionario de usuario
+        ejes: Ejes de discretización
+        construir_entrada: Construye el diccionario de usuario a partir de
+            un representante por eje
+
+    Returns:
+        TablaDecision con la respuesta de cada celda
+    """
+    valores = [
+        funcion(construir_entrada(*representantes))
+        for representantes in product(*(eje.representantes() for eje in ejes))
+    ]
+    return TablaDecision(ejes, valores)
+
+
+def _entrada_intensidad(edad, imc, nivel, imc_clasificacion) -> Dict:
+    return {
+        'edad': edad,
+        'imc': imc,
+        'nivel_experiencia': nivel,
+        'imc_clasificacion': imc_clasificacion,
+    }
+
+
+def _entrada_objetivo(imc, imc_clasificacion, objetivos) -> Dict:
+    return {
+        'imc': imc,
+        'imc_clasificacion': imc_clasificacion,
+        'objetivos': objetivos,
+    }
+
+
+class ReglasCompiladas:
+    """
+    Tablas de decisión de intensidad y objetivo.
+
+    Las consultas devuelven None cuando la entrada cae fuera del dominio
+    compilado (valores no numéricos u objetivos desconocidos); en ese caso
+    el llamador debe usar la ruta interpretada.
+    """
+
+    def __init__(self, tabla_intensidad: TablaDecision, tabla_objetivo: TablaDecision):
+        self.tabla_intensidad = tabla_intensidad
+        self.tabla_objetivo = tabla_objetivo
+
+    def intensidad(self, usuario_data: Dict) -> Optional[str]:
+        return self.tabla_intensidad.consultar(
+            usuario_data.get('edad', 30),
+            usuario_data.get('imc', 25.0),
+            usuario_data.get('nivel_experiencia', 'principiante'),
+            usuario_data.get('imc_clasificacion', 'normal'),
+        )
+
+    def objetivo(self, usuario_data: Dict) -> Optional[str]:
+        return self.tabla_objetivo.consultar(
+            usuario_data.get('imc', 25.0),
+            usuario_data.get('imc_clasificacion', 'normal'),
+            usuario_data.get('objetivos', 'salud'),
+        )
+
+    def celda(self, usuario_data: Dict) -> Optional[Tuple[int, ...]]:
+        """
+        Coordenadas de la entrada en los ejes de las tablas (edad, IMC, nivel,
+        clasificación y objetivo), o None si queda fuera del dominio.
+
+        Dos entradas con la misma celda reciben las mismas respuestas de
+        todas las reglas, así que la celda sirve como clave normalizada.
+        """
+        eje_edad, eje_imc, eje_nivel, eje_clasificacion = self.tabla_intensidad.ejes
+        celda = (
+            eje_edad.indice(usuario_data.get('edad', 30)),
+            eje_imc.indice(usuario_data.get('imc', 25.0)),
+            eje_nivel.indice(usuario_data.get('nivel_experiencia', 'principiante')),
+            eje_clasificacion.indice(usuario_data.get('imc_clasificacion', 'normal')),
+            self.tabla_objetivo.ejes[2].indice(usuario_data.get('objetivos', 'salud')),
+        )
+        return None if None in celda else celda
+
+
+def compilar_reglas(
+    determinar_intensidad: Callable[[Dict], str],
+    determinar_objetivo: Callable[[Dict], str],
+    umbrales_edad: Sequence[float] = UMBRALES_EDAD,
+    umbrales_imc: Sequence[float] = UMBRALES_IMC
+) -> ReglasCompiladas:
+    """
+    Compila las reglas de intensidad y objetivo a tablas de decisión.
+
+    Args:
+        determinar_intensidad: Ruta interpretada de intensidad recomendada
+        determinar_objetivo: Ruta interpretada de objetivo prioritario
+        umbrales_edad: Umbrales de edad que usan las reglas
+        umbrales_imc: Umbrales de IMC que usan las reglas
+
+    Returns:
+        ReglasCompiladas listas para consultar
+    """
+    tabla_intensidad = compilar_tabla(
+        determinar_intensidad,
+        (
+            EjeIntervalos(umbrales_edad),
+            EjeIntervalos(umbrales_imc),
+            EjeCategorico(NIVELES),
+            EjeCategorico(CLASIFICACIONES_IMC),
+        ),
+        _entrada_intensidad
+    )
+    # El objetivo del usuario puede devolverse tal cual, así que solo se
+    # compilan los objetivos conocidos (incluido el vacío).
+    tabla_objetivo = compilar_tabla(
+        determinar_objetivo,
+        (
+            EjeIntervalos(umbrales_imc),
+            EjeCategorico(CLASIFICACIONES_IMC),
+            EjeCategorico(OBJETIVOS + ('',), agrupar_otros=False),
+        ),
+        _entrada_objetivo
+    )
+    return ReglasCompiladas(tabla_intensidad, tabla_objetivo)
@@ -0,0 +1,175 @@
+"""
+Grabación y reproducción de entradas del motor de recomendación.
+
+Sirve para demostrar que una optimización del motor es más rápida y no cambia
+las recomendaciones:
+
+1. `grabar()` guarda, sin datos identificables, las características de los
+   usuarios que recibe el motor y la versión del catálogo, en JSON Lines
+   comprimido con gzip.
+2. `reproducir()` pasa esas entradas por las etapas del pipeline de
+   `MotorRecomendacion` con un motor dado y mide cada etapa.
+3. `comparar_salidas()` cuenta las diferencias de top-1 y top-k entre dos
+   reproducciones.
+
+Ver el comando `reproducir_recomendaciones`.
+"""
+import gzip
+import json
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .catalogo import InstantaneaCatalogo
+from .prolog_engine import memo_condiciones
+
+FORMATO = 1
+
+# Etapas medidas, en el orden del pipeline
+ETAPAS = ('perfil', 'condiciones', 'seguridad', 'compatibilidad', 'total')
+
+# Lo único que el motor necesita del usuario: nada de ids, nombres ni texto libre
+CAMPOS_ENTRADA = (
+    'edad', 'imc', 'imc_clasificacion', 'nivel_experiencia', 'objetivos',
+    'dias_disponibles', 'condiciones_salud',
+)
+
+
+def anonimizar(usuario_dict: Dict, condiciones_salud: Optional[Iterable[str]]) -> Dict:
+    """
+    Reduce los datos de un usuario a la entrada anónima del motor.
+
+    Args:
+        usuario_dict: Resultado de `MotorRecomendacion._usuario_a_dict`
+        condiciones_salud: Condiciones de salud declaradas por el usuario
+
+    Returns:
+        Diccionario con solo los CAMPOS_ENTRADA (IMC redondeado a 2 decimales)
+    """
+    entrada = {campo: usuario_dict.get(campo) for campo in CAMPOS_ENTRADA[:-1]}
+    entrada['imc'] = round(float(entrada['imc']), 2)
+    entrada['condiciones_salud'] = sorted(condiciones_salud or [])
+    return entrada
+
+
+def grabar(ruta: str, entradas: Iterable[Dict], cabecera: Dict) -> int:
+    """
+    Escribe las entradas en un archivo JSON Lines comprimido.
+
+    La primera línea es la cabecera (formato, versión del catálogo, etc.).
+
+    Returns:
+        Número de entradas escritas
+    """
+    total = 0
+    with gzip.open(ruta, 'wt', encoding='utf-8') as archivo:
+        archivo.write(json.dumps({**cabecera, 'formato': FORMATO}, separators=(',', ':')) + '\n')
+        for entrada in entradas:
+            archivo.write(json.dumps(entrada, separators=(',', ':'), sort_keys=True) + '\n')
+            total += 1
+    return total
+
+
+def cargar(ruta: str) -> Tuple[Dict, List[Dict]]:
+    """
+    Lee un archivo escrito por `grabar`.
+
+    Returns:
+        Tupla (cabecera, entradas)
+
+    Raises:
+        ValueError: Si el archivo está vacío o es de otro formato
+    """
+    with gzip.open(ruta, 'rt', encoding='utf-8') as archivo:
+        lineas = [json.loads(linea) for linea in archivo if linea.strip()]
+    if not lineas or lineas[0].get('formato') != FORMATO:
+        raise ValueError(f'{ruta} no es una grabación de entradas del motor (formato {FORMATO})')
+    return lineas[0], lineas[1:]
+
+
+def reproducir(
+    entradas: Sequence[Dict],
+    motor,
+    catalogo: InstantaneaCatalogo,
+    k: int = 3,
+) -> Tuple[Dict[str, List[float]], List[List[int]]]:
+    """
+    Pasa las entradas por el pipeline de recomendación con un motor.
+
+    Empieza con la memoria de `evaluar_condiciones` vacía para que un motor
+    no se beneficie de la caché que calentó el anterior.
+
+    Args:
+        entradas: Entradas anónimas (ver `anonimizar`)
+        motor: MotorProlog, MotorLogicoAlternativo o compatible
+        catalogo: Instantánea del catálogo sobre la que recomendar
+        k: Número de rutinas del ranking a conservar por entrada
+
+    Returns:
+        Tupla (latencias en segundos por etapa, ids del top-k de cada entrada)
+    """
+    from .motor_recomendacion import MotorRecomendacion
+
+    recomendador = MotorRecomendacion()
+    rutinas_dicts = {datos['id']: datos for datos in catalogo.dicts}
+    latencias = {etapa: [] for etapa in ETAPAS}
+    salidas = []
+    memo_condiciones.limpiar()
+    reloj = time.perf_counter
+
+    for entrada in entradas:
+        t0 = reloj()
+        usuario_dict = {**entrada, **recomendador._perfil_recomendado(entrada, motor.parametros)}
+        t1 = reloj()
+        perfil_reglas = {**usuario_dict, **motor.evaluar_condiciones(usuario_dict)}
+        t2 = reloj()
+        seguras, _ = recomendador._filtrar_rutinas_seguras(
+            catalogo, perfil_reglas, entrada['condiciones_salud'], motor
+        )
+        t3 = reloj()
+        ranking = recomendador._calcular_compatibilidad_rutinas(seguras, perfil_reglas, rutinas_dicts)
+        t4 = reloj()
+
+        for etapa, duracion in zip(ETAPAS, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t4 - t0)):
+            latencias[etapa].append(duracion)
+        salidas.append([rutina.id for rutina, _ in ranking[:k]])
+
+    return latencias, salidas
+
+
+def percentil(muestras: Sequence[float], p: float) -> float:
+    """Percentil p (0-100) por el método del rango más cercano; 0.0 si no hay muestras."""
+    if not muestras:
+        return 0.0
+    ordenadas = sorted(muestras)
+    rango = max(1, -(-len(ordenadas) * p // 100))
+    return ordenadas[int(rango) - 1]
+
+
+def resumir_latencias(latencias: Dict[str, List[float]]) -> Dict[str, Dict[str, float]]:
+    """p50/p95/p99 de cada etapa, en milisegundos."""
+    return {
+        etapa: {f'p{p}': round(percentil(muestras, p) * 1000, 4) for p in (50, 95, 99)}
+        for etapa, muestras in latencias.items()
+    }
+
+
+def comparar_salidas(base: Sequence[List[int]], candidato: Sequence[List[int]]) -> Dict:
+    """
+    Diferencias entre los rankings de dos reproducciones de las mismas entradas.
+
+    Returns:
+        Diccionario con 'top1' y 'topk' (número de entradas que difieren) y
+        'ejemplos' (índice, top-k base, top-k candidato) de las que difieren
+    """
+    if len(base) != len(candidato):
+        raise ValueError(
+            f'Las reproducciones tienen distinto número de entradas ({len(base)} y {len(candidato)})'
+        )
+    diferentes = [
+        (i, a, b) for i, (a, b) in enumerate(zip(base, candidato)) if a != b
+    ]
+    return {
+        'top1': sum(1 for _, a, b in diferentes if a[:1] != b[:1]),
+        'topk': len(diferentes),
+        'ejemplos': diferentes,
+    }
@@ -1,3 +1,1239 @@
-from django.test import TestCase
+import os
+import random
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import (
+    almacen_reglas, catalogo, cohortes, facetas, instrumentacion, logic_rules, processor, progreso, reproduccion
+)
+from .motor_recomendacion import motor_recomendacion
+from .datalog import Atomo, No, Programa, Regla, Var
+from .memo import MemoLRU
+from .nucleo_reglas import CondicionesUsuario, nucleo_seguridad
+from .panel import cargar_resumen, recomendacion_vigente, seguimientos_recientes
+from .ejercicios import (
+    OperacionEjercicio,
+    normalizar_plan,
+    progreso_ejercicios,
+    registrar_ejercicio,
+    registrar_lote,
+)
+from .models import (
+    ConjuntoReglas,
+    EjercicioCompletado,
+    PerfilMedico,
+    ProgresoMensual,
+    ProgresoSemanal,
+    RecomendacionMedica,
+    ResumenProgreso,
+    Rutina,
+    SeguimientoEjercicio,
+    SeguimientoUsuario,
+    UsuarioPersonalizado,
+)
+
+from .prolog_engine import (
+    RAZON_SEGURA,
+    MotorLogicoAlternativo,
+    MotorProlog,
+    memo_condiciones,
+    mensaje_seguridad,
+)
+from .reglas_compiladas import (
+    CLASIFICACIONES_IMC,
+    NIVELES,
+    OBJETIVOS,
+    UMBRALES_EDAD,
+    UMBRALES_IMC,
+    EjeIntervalos,
+)
+
+
+def rutinas_sinteticas():
+    """Rutinas en forma de diccionario con todas las combinaciones de intensidad, días y nivel."""
+    return [
+        {'id': i, 'intensidad': intensidad, 'dias_semana': dias, 'nivel': nivel}
+        for i, (intensidad, dias, nivel) in enumerate(
+            (intensidad, dias, nivel)
+            for intensidad in ('baja', 'media', 'alta')
+            for dias in range(1, 8)
+            for nivel in NIVELES
+        )
+    ]
+
+
+def crear_rutina(nombre, **campos):
+    """Crea una Rutina con valores mínimos; `campos` sobrescribe los que haga falta."""
+    datos = {
+        'nombre': nombre, 'descripcion': '', 'dias_semana': 3, 'nivel': 'principiante',
+        'objetivo': 'salud_general', 'ejercicios': [], 'duracion': '45 minutos',
+        'intensidad': 'media',
+    }
+    datos.update(campos)
+    return Rutina.objects.create(**datos)
+
+
+class ReglasCompiladasTests(SimpleTestCase):
+    """Las tablas compiladas deben responder igual que la ruta interpretada."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.motor = MotorProlog()
+
+    def _edades(self):
+        return sorted({e + d for e in UMBRALES_EDAD for d in (-1, -0.5, 0, 0.5, 1)} | {0, 15, 29, 50, 75, 100})
+
+    def _imcs(self):
+        return sorted({i + d for i in UMBRALES_IMC for d in (-0.01, 0, 0.01)} | {12.0, 22.3, 27.7, 45.0})
+
+    def test_eje_intervalos_distingue_umbrales(self):
+        eje = EjeIntervalos((18.5, 25))
+        self.assertEqual([eje.indice(v) for v in (10, 18.5, 20, 25, 40)], [0, 1, 2, 3, 4])
+        self.assertIsNone(eje.indice('25'))
+        self.assertIsNone(eje.indice(float('nan')))
+
+    def test_paridad_intensidad(self):
+        for edad in self._edades():
+            for imc in self._imcs():
+                for nivel in NIVELES + ('desconocido',):
+                    for clasificacion in CLASIFICACIONES_IMC + ('',):
+                        datos = {
+                            'edad': edad,
+                            'imc': imc,
+                            'nivel_experiencia': nivel,
+                            'imc_clasificacion': clasificacion,
+                        }
+                        self.assertEqual(
+                            self.motor.determinar_intensidad_recomendada(datos),
+                            self.motor._determinar_intensidad_interpretada(datos),
+                            datos
+                        )
+
+    def test_paridad_objetivo(self):
+        for imc in self._imcs():
+            for clasificacion in CLASIFICACIONES_IMC + ('',):
+                for objetivo in OBJETIVOS + ('', 'otro'):
+                    datos = {'imc': imc, 'imc_clasificacion': clasificacion, 'objetivos': objetivo}
+                    self.assertEqual(
+                        self.motor.determinar_objetivo_prioritario(datos),
+                        self.motor._determinar_objetivo_interpretado(datos),
+                        datos
+                    )
+
+    def test_paridad_entradas_aleatorias(self):
+        aleatorio = random.Random(20251201)
+        for _ in range(500):
+            datos = {
+                'edad': aleatorio.randint(10, 95),
+                'imc': round(aleatorio.uniform(14, 45), 2),
+                'nivel_experiencia': aleatorio.choice(NIVELES),
+                'imc_clasificacion': aleatorio.choice(CLASIFICACIONES_IMC),
+                'objetivos': aleatorio.choice(OBJETIVOS),
+            }
+            self.assertEqual(
+                self.motor.evaluar_condiciones(datos)['intensidad_recomendada'],
+                self.motor._determinar_intensidad_interpretada(datos)
+            )
+            self.assertEqual(
+                self.motor.evaluar_condiciones(datos)['objetivo_prioritario'],
+                self.motor._determinar_objetivo_interpretado(datos)
+            )
+
+
+class MotorPrologConcurrenciaTests(SimpleTestCase):
+    """El motor debe dar las mismas respuestas desde cualquier hilo."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.motor = MotorProlog()
+
+    def _casos(self):
+        aleatorio = random.Random(7)
+        return [
+            {
+                'edad': aleatorio.randint(12, 90),
+                'imc': round(aleatorio.uniform(15, 40), 1),
+                'nivel_experiencia': aleatorio.choice(NIVELES),
+                'imc_clasificacion': aleatorio.choice(CLASIFICACIONES_IMC),
+                'objetivos': aleatorio.choice(OBJETIVOS),
+            }
+            for _ in range(100)
+        ]
+
+    def _evaluar(self, datos):
+        return (
+            self.motor._determinar_intensidad_interpretada(datos),
+            self.motor._determinar_objetivo_interpretado(datos),
+            self.motor.determinar_intensidad_recomendada(datos),
+            self.motor.determinar_objetivo_prioritario(datos),
+        )
+
+    def test_consultas_concurrentes(self):
+        casos = self._casos()
+        esperado = [self._evaluar(datos) for datos in casos]
+        # Un fallo de pyDatalog en otro hilo caería al fallback y se registraría como error
+        with self.assertNoLogs('recommender.prolog_engine', level='ERROR'):
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                for _ in range(5):
+                    self.assertEqual(list(pool.map(self._evaluar, casos)), esperado)
+
+    def test_hilos_nuevos_cargan_su_contexto(self):
+        casos = self._casos()
+        esperado = [self._evaluar(datos) for datos in casos]
+        resultados, errores = {}, []
+
+        def trabajar(indice):
+            try:
+                resultados[indice] = [self._evaluar(datos) for datos in casos]
+            except Exception as e:  # pragma: no cover - se reporta abajo
+                errores.append(e)
+
+        hilos = [threading.Thread(target=trabajar, args=(i,)) for i in range(12)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        for indice in range(12):
+            self.assertEqual(resultados[indice], esperado)
+
+
+class SeguridadBatchTests(SimpleTestCase):
+    """La evaluación por lotes debe coincidir con la evaluación rutina a rutina."""
+
+    def test_batch_coincide_con_evaluacion_individual(self):
+        rutinas = rutinas_sinteticas()
+        for motor in (MotorProlog(), MotorLogicoAlternativo()):
+            for edad in (25, 60, 61, 75):
+                for imc in (22.0, 30, 30.5):
+                    for nivel in NIVELES:
+                        usuario = {'edad': edad, 'imc': imc, 'nivel_experiencia': nivel}
+                        mascara, razones = motor.evaluar_seguridad_rutinas_batch(usuario, rutinas)
+                        self.assertEqual(len(mascara), len(rutinas))
+                        for rutina, es_segura, razon in zip(rutinas, mascara, razones):
+                            esperado = motor.evaluar_seguridad_rutina(usuario, rutina)
+                            self.assertEqual((es_segura, mensaje_seguridad(razon)), esperado)
+
+    def test_batch_vacio(self):
+        self.assertEqual(MotorLogicoAlternativo().evaluar_seguridad_rutinas_batch({}, []), ([], []))
+
+
+class AlmacenReglasTests(TestCase):
+    """Las versiones de reglas se compilan una vez y se aplican sin reiniciar."""
+
+    def setUp(self):
+        almacen_reglas._motores.clear()
+        almacen_reglas._versiones_invalidas.clear()
+        almacen_reglas._vigente = None
+
+    tearDown = setUp
+
+    def test_sin_conjuntos_usa_reglas_por_defecto(self):
+        motor = almacen_reglas.sincronizar()
+        self.assertEqual(motor.version, 0)
+        self.assertEqual(motor.determinar_intensidad_recomendada({'edad': 62}), 'baja')
+
+    def test_nueva_version_se_aplica_en_la_siguiente_sincronizacion(self):
+        anterior = almacen_reglas.sincronizar()
+        ConjuntoReglas.objects.create(version=1, parametros={'edad_avanzada': 65})
+
+        motor = almacen_reglas.sincronizar()
+        self.assertIsNot(motor, anterior)
+        self.assertIs(almacen_reglas.obtener_motor(), motor)
+        self.assertEqual(motor.determinar_intensidad_recomendada({'edad': 62}), 'media')
+        self.assertEqual(motor._determinar_intensidad_interpretada({'edad': 62}), 'media')
+        # La versión anterior sigue respondiendo con sus propias reglas
+        self.assertEqual(anterior._determinar_intensidad_interpretada({'edad': 62}), 'baja')
+        # Compilada una sola vez
+        self.assertIs(almacen_reglas.sincronizar(), motor)
+
+    def test_admin_no_edita_una_version_guardada(self):
+        from django.contrib.admin.sites import site
+        admin_reglas = site._registry[ConjuntoReglas]
+        conjunto = ConjuntoReglas.objects.create(version=1, parametros={'edad_avanzada': 65})
+        self.assertNotIn('parametros', admin_reglas.get_readonly_fields(None))
+        self.assertEqual(
+            set(admin_reglas.get_readonly_fields(None, conjunto)), {'fecha_creacion', 'version', 'parametros'}
+        )
+
+    def test_version_invalida_conserva_el_motor_vigente(self):
+        vigente = almacen_reglas.sincronizar()
+        ConjuntoReglas.objects.create(version=2, parametros={'imc_obesidad': 'treinta'})
+        with self.assertLogs('recommender.almacen_reglas', level='ERROR'):
+            self.assertIs(almacen_reglas.sincronizar(), vigente)
+        self.assertIs(almacen_reglas.sincronizar(), vigente)
+
+
+class MedirArranqueTests(SimpleTestCase):
+    """El benchmark de arranque debe interpretar la salida de -X importtime."""
+
+    def test_parsear_importtime(self):
+        from .management.commands.medir_arranque import parsear_importtime
+
+        salida = (
+            'import time: self [us] | cumulative | imported package\n'
+            'import time:       120 |        120 |   recommender.parametros_reglas\n'
+            'import time:      4300 |       6200 | recommender.prolog_engine\n'
+            'otra línea\n'
+        )
+        self.assertEqual(parsear_importtime(salida), [
+            ('recommender.parametros_reglas', 0.12, 0.12, 1),
+            ('recommender.prolog_engine', 4.3, 6.2, 0),
+        ])
+
+
+class InstrumentacionTests(SimpleTestCase):
+    """Contadores de reglas, latencias y fallbacks exportados al sumidero."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.motor = MotorProlog()
+
+    def setUp(self):
+        self.sumidero = instrumentacion.SumideroMemoria()
+        instrumentacion.activar(self.sumidero)
+
+    def tearDown(self):
+        instrumentacion.desactivar()
+
+    def test_cuenta_reglas_y_latencias(self):
+        self.motor.determinar_intensidad_recomendada({'edad': 65})
+        logic_rules.determinar_nivel_usuario(25, 5, 'normal')
+        self.motor.evaluar_seguridad_rutinas_batch(
+            {'edad': 65}, [{'intensidad': 'alta'}, {'intensidad': 'baja'}]
+        )
+
+        datos = instrumentacion.volcar()
+        self.assertEqual(self.sumidero.instantaneas, [datos])
+        self.assertEqual(datos['reglas']['intensidad.tabla.baja'], 1)
+        self.assertEqual(datos['reglas']['logic_rules.nivel.avanzado'], 1)
+        self.assertEqual(datos['reglas']['seguridad.edad_intensidad_alta'], 1)
+        self.assertEqual(datos['reglas']['seguridad.segura'], 1)
+        latencia = datos['latencias']['MotorProlog.determinar_intensidad_recomendada']
+        self.assertEqual(latencia['total'], 1)
+        self.assertEqual(sum(latencia['cubetas_ms'].values()), 1)
+        # El volcado empieza un intervalo nuevo
+        self.assertEqual(instrumentacion.instantanea()['reglas'], {})
+
+    def test_registra_fallbacks_con_su_causa(self):
+        with mock.patch.object(self.motor, '_consultar', side_effect=RuntimeError('caída')):
+            with self.assertLogs('recommender.prolog_engine', level='ERROR'):
+                self.assertEqual(self.motor._determinar_intensidad_interpretada({'edad': 65}), 'baja')
+        self.assertEqual(
+            instrumentacion.instantanea()['fallbacks'],
+            {'_determinar_intensidad_directa': {'RuntimeError': 1}}
+        )
+
+    def test_desactivada_no_registra(self):
+        instrumentacion.desactivar()
+        self.motor.evaluar_condiciones({'edad': 30, 'imc': 22.0})
+        self.assertEqual(
+            instrumentacion.instantanea(), {'reglas': {}, 'latencias': {}, 'fallbacks': {}}
+        )
+
+
+class DatalogTests(SimpleTestCase):
+    """Evaluador semi-ingenuo: recursión, negación estratificada e inferencia masiva."""
+
+    def test_cierre_transitivo(self):
+        X, Y, Z = Var('X'), Var('Y'), Var('Z')
+        programa = Programa([
+            Regla(Atomo('camino', X, Y), [Atomo('arista', X, Y)]),
+            Regla(Atomo('camino', X, Z), [Atomo('camino', X, Y), Atomo('arista', Y, Z)]),
+        ])
+        aristas = [(i, i + 1) for i in range(30)]
+        base = programa.evaluar({'arista': aristas})
+        self.assertEqual(
+            base.tuplas('camino'),
+            {(i, j) for i in range(31) for j in range(i + 1, 31)}
+        )
+
+    def test_rechaza_negacion_recursiva_y_reglas_inseguras(self):
+        X = Var('X')
+        with self.assertRaises(ValueError):
+            Programa([Regla(Atomo('p', X), [Atomo('q', X), No(Atomo('p', X))])])
+        with self.assertRaises(ValueError):
+            Regla(Atomo('p', X), [])
+
+    def test_inferencia_masiva_coincide_con_lote(self):
+        aleatorio = random.Random(32)
+        usuarios = {
+            u: {
+                'edad': aleatorio.randint(15, 80),
+                'imc': round(aleatorio.uniform(16, 40), 1),
+                'nivel_experiencia': aleatorio.choice(NIVELES),
+            }
+            for u in range(60)
+        }
+        rutinas = {
+            r: {
+                'intensidad': aleatorio.choice(('baja', 'media', 'alta')),
+                'dias_semana': aleatorio.randint(1, 7),
+                'nivel': aleatorio.choice(NIVELES),
+            }
+            for r in range(25)
+        }
+        motor = MotorLogicoAlternativo()
+        seguras, rechazos = motor.inferir_rutinas_seguras(usuarios, rutinas)
+
+        for u, usuario in usuarios.items():
+            mascara, razones = motor.evaluar_seguridad_rutinas_batch(usuario, list(rutinas.values()))
+            for r, es_segura, razon in zip(rutinas, mascara, razones):
+                self.assertEqual((u, r) in seguras, es_segura)
+                self.assertEqual(rechazos.get((u, r), RAZON_SEGURA), razon)
+
+
+class MemoCondicionesTests(SimpleTestCase):
+    """evaluar_condiciones memorizado: mismas respuestas, inmutables, por versión."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.motor = MotorProlog()
+
+    def setUp(self):
+        memo_condiciones.limpiar()
+
+    def test_paridad_con_evaluacion_sin_memo(self):
+        aleatorio = random.Random(33)
+        for _ in range(500):
+            datos = {
+                'edad': aleatorio.choice((aleatorio.randint(10, 95), 18, 40, 60)),
+                'imc': aleatorio.choice((round(aleatorio.uniform(14, 45), 2), 18.5, 25, 30)),
+                'nivel_experiencia': aleatorio.choice(NIVELES),
+                'imc_clasificacion': aleatorio.choice(CLASIFICACIONES_IMC),
+                'objetivos': aleatorio.choice(OBJETIVOS),
+            }
+            self.assertEqual(
+                self.motor.evaluar_condiciones(datos),
+                self.motor._evaluar_condiciones_sin_memo(datos),
+                datos
+            )
+        self.assertGreater(memo_condiciones.estadisticas()['aciertos'], 0)
+
+    def test_resultado_compartido_e_inmutable(self):
+        datos = {'edad': 65, 'imc': 31.0, 'imc_clasificacion': 'obesidad'}
+        primera = self.motor.evaluar_condiciones(datos)
+        segunda = self.motor.evaluar_condiciones(dict(datos, edad=70, imc=33.0))
+        self.assertIs(primera, segunda)
+        with self.assertRaises(TypeError):
+            primera['es_seguro'] = False
+        self.assertIsInstance(primera['precauciones'], tuple)
+        self.assertEqual(memo_condiciones.estadisticas()['aciertos'], 1)
+
+    def test_versiones_no_comparten_entradas(self):
+        otra = MotorProlog({'edad_avanzada': 65}, version=33)
+        self.assertEqual(self.motor.evaluar_condiciones({'edad': 62})['intensidad_recomendada'], 'baja')
+        self.assertEqual(otra.evaluar_condiciones({'edad': 62})['intensidad_recomendada'], 'media')
+
+    def test_memo_lru_descarta_la_menos_usada(self):
+        memo = MemoLRU(capacidad=2)
+        memo.obtener('a', lambda: 1)
+        memo.obtener('b', lambda: 2)
+        memo.obtener('a', lambda: 0)
+        memo.obtener('c', lambda: 3)
+        self.assertEqual(memo.obtener('a', lambda: 0), 1)
+        self.assertEqual(memo.obtener('b', lambda: 20), 20)
+        self.assertEqual(memo.estadisticas()['tamano'], 2)
+
+
+class NucleoReglasTests(SimpleTestCase):
+    """logic_rules, los motores y processor aplican las mismas reglas de seguridad."""
+
+    def test_todas_las_entradas_coinciden(self):
+        rutinas = rutinas_sinteticas()
+        motores = (MotorProlog(), MotorLogicoAlternativo())
+        for edad in (25, 60, 61, 75):
+            for imc in (22.0, 29.5, 31.0):
+                for nivel in NIVELES:
+                    usuario = {
+                        'edad': edad,
+                        'imc': imc,
+                        'imc_clasificacion': processor.clasificar_imc(imc),
+                        'nivel_experiencia': nivel,
+                        'nivel_recomendado': nivel,
+                    }
+                    esperado = [
+                        motores[0].evaluar_seguridad_rutina(usuario, rutina)[0] for rutina in rutinas
+                    ]
+                    self.assertEqual(motores[1].evaluar_seguridad_rutinas_batch(usuario, rutinas)[0], esperado)
+                    self.assertEqual(
+                        [logic_rules.validar_seguridad_rutina(rutina, usuario)[0] for rutina in rutinas],
+                        esperado
+                    )
+                    self.assertEqual(
+                        processor.filtrar_rutinas_por_seguridad(rutinas, usuario),
+                        [rutina for rutina, segura in zip(rutinas, esperado) if segura]
+                    )
+
+
+class CatalogoTests(TestCase):
+    """Instantáneas del catálogo e índice de seguridad por región."""
+
+    def test_guardar_o_borrar_rutina_cambia_la_instantanea(self):
+        rutina = crear_rutina('A')
+        primera = catalogo.obtener_instantanea()
+        self.assertIs(catalogo.obtener_instantanea(), primera)
+        self.assertEqual(len(primera), 1)
+
+        rutina.intensidad = 'alta'
+        rutina.save()
+        segunda = catalogo.obtener_instantanea()
+        self.assertGreater(segunda.version, primera.version)
+        self.assertEqual(segunda.rutinas[0].intensidad, 'alta')
+
+        rutina.delete()
+        self.assertEqual(len(catalogo.obtener_instantanea()), 0)
+
+    def test_indice_coincide_con_evaluacion_por_lote(self):
+        for i, rutina in enumerate(rutinas_sinteticas()):
+            crear_rutina(f'R{i}', **{k: v for k, v in rutina.items() if k != 'id'})
+        instantanea = catalogo.obtener_instantanea()
+        nucleo = nucleo_seguridad()
+        indice = instantanea.indice_seguridad(nucleo)
+        for combinacion in ((a, b, c) for a in (False, True) for b in (False, True) for c in (False, True)):
+            condiciones = CondicionesUsuario(*combinacion)
+            mascara, razones = nucleo.evaluar_lote(condiciones, instantanea.dicts)
+            self.assertEqual(
+                instantanea.seleccionar(indice.elegibles(condiciones)),
+                [r for r, segura in zip(instantanea.rutinas, mascara) if segura]
+            )
+            self.assertEqual(list(indice.razones(condiciones)), razones)
+
+    def test_contraindicaciones_excluyen_rutinas(self):
+        crear_rutina('Cardio', condiciones_contraindicadas=['hipertension'])
+        libre = crear_rutina('Movilidad')
+        instantanea = catalogo.obtener_instantanea()
+        self.assertEqual(instantanea.seleccionar(instantanea.permitidas(['hipertension'])), [libre])
+        self.assertEqual(len(instantanea.seleccionar(instantanea.permitidas([]))), 2)
+
+    def test_recomendacion_excluye_rutinas_contraindicadas(self):
+        # Cambio de comportamiento: antes los diccionarios del motor no llevaban
+        # condiciones_contraindicadas y el filtro por condición nunca excluía nada.
+        contraindicada = crear_rutina('Cardio', condiciones_contraindicadas=['hipertension'])
+        crear_usuario = lambda nombre, condiciones: UsuarioPersonalizado.objects.create_user(
+            username=nombre, password='clave-segura-123', fecha_nacimiento=date(1986, 5, 1), peso=75, altura=175,
+            condiciones_salud=condiciones
+        )
+
+        con_hipertension = crear_usuario('hugo', ['hipertension'])
+        resultado = motor_recomendacion.generar_recomendacion_completa(con_hipertension)
+        self.assertIn('No se encontraron rutinas seguras', resultado['error'])
+
+        libre = crear_rutina('Movilidad')
+        resultado = motor_recomendacion.generar_recomendacion_completa(con_hipertension)
+        self.assertEqual(resultado['recomendacion'].rutina_recomendada, libre)
+
+        libre.delete()
+        resultado = motor_recomendacion.generar_recomendacion_completa(crear_usuario('ines', []))
+        self.assertEqual(resultado['recomendacion'].rutina_recomendada, contraindicada)
+
+
+class ReproduccionTests(TestCase):
+    """Grabación anónima y reproducción de entradas del motor."""
+
+    def test_grabacion_anonima_y_reproduccion(self):
+        for i, rutina in enumerate(rutinas_sinteticas()[::7]):
+            crear_rutina(f'R{i}', **{k: v for k, v in rutina.items() if k != 'id'})
+        usuario = {
+            'id': 42, 'edad': 64, 'peso': 90.0, 'altura': 1.7, 'imc': 31.1418,
+            'imc_clasificacion': 'obesidad', 'nivel_experiencia': 'principiante',
+            'objetivos': 'perder_peso', 'dias_disponibles': 5,
+            'condiciones_medicas': 'texto libre', 'restricciones': '',
+        }
+        entrada = reproduccion.anonimizar(usuario, ['hipertension'])
+        self.assertEqual(set(entrada), set(reproduccion.CAMPOS_ENTRADA))
+        self.assertEqual(entrada['imc'], 31.14)
+
+        with tempfile.TemporaryDirectory() as directorio:
+            ruta = os.path.join(directorio, 'entradas.jsonl.gz')
+            reproduccion.grabar(ruta, [entrada] * 3, {'catalogo_version': 7})
+            cabecera, entradas = reproduccion.cargar(ruta)
+        self.assertEqual(cabecera['catalogo_version'], 7)
+        self.assertEqual(entradas, [entrada] * 3)
+
+        instantanea = catalogo.obtener_instantanea()
+        latencias, base = reproduccion.reproducir(entradas, MotorProlog(), instantanea, k=2)
+        _, candidato = reproduccion.reproducir(entradas, MotorLogicoAlternativo(), instantanea, k=2)
+        self.assertEqual(len(latencias['total']), 3)
+        self.assertTrue(all(len(ids) == 2 for ids in base))
+        self.assertEqual(reproduccion.comparar_salidas(base, candidato)['topk'], 0)
+
+    def test_comparar_salidas_y_percentiles(self):
+        diferencias = reproduccion.comparar_salidas([[1, 2], [3, 4], [5, 6]], [[1, 2], [3, 5], [6, 5]])
+        self.assertEqual((diferencias['top1'], diferencias['topk']), (1, 2))
+        self.assertEqual(reproduccion.percentil(list(range(1, 101)), 95), 95)
+        self.assertEqual(reproduccion.percentil([], 50), 0.0)
+
+
+@skipUnless(cohortes.NUMPY_DISPONIBLE, 'NumPy no está instalado')
+class CohortesTests(SimpleTestCase):
+    """Las versiones vectorizadas coinciden con las escalares elemento a elemento."""
+
+    def _cohorte(self, n=5000):
+        rng = random.Random(7)
+        edades = [rng.choice([rng.randint(10, 90), *UMBRALES_EDAD, 50, 30]) for _ in range(n)]
+        dias = [rng.randint(1, 7) for _ in range(n)]
+        pesos = [rng.uniform(40, 150) for _ in range(n)]
+        alturas = [rng.uniform(1.4, 2.1) for _ in range(n)]
+        objetivos = [rng.choice(OBJETIVOS + ('otro',)) for _ in range(n)]
+        # Valores exactos en los límites de clasificación
+        pesos[:3], alturas[:3] = [18.5, 25.0, 30.0], [1.0, 1.0, 1.0]
+        return edades, dias, pesos, alturas, objetivos
+
+    def test_coinciden_con_las_escalares(self):
+        import numpy as np
+
+        edades, dias, pesos, alturas, objetivos = self._cohorte()
+        imcs = cohortes.calcular_imc(np.array(pesos), np.array(alturas))
+        self.assertEqual(imcs.tolist(), [processor.calcular_imc(p, a) for p, a in zip(pesos, alturas)])
+
+        clasificaciones = cohortes.clasificar_imc(imcs)
+        esperadas = [processor.clasificar_imc(imc) for imc in imcs.tolist()]
+        self.assertEqual(cohortes.decodificar(clasificaciones, CLASIFICACIONES_IMC).tolist(), esperadas)
+
+        objetivos_recomendados = cohortes.determinar_objetivo_recomendado(
+            cohortes.codificar(objetivos, OBJETIVOS), clasificaciones
+        )
+        self.assertEqual(
+            [o if c == len(OBJETIVOS) else OBJETIVOS[c] for o, c in zip(objetivos, objetivos_recomendados)],
+            [logic_rules.determinar_objetivo_recomendado(o, c) for o, c in zip(objetivos, esperadas)]
+        )
+
+        for parametros in (None, {**almacen_reglas.MotorProlog().parametros, 'edad_madura': 45}):
+            niveles = cohortes.determinar_nivel_usuario(np.array(edades), np.array(dias), clasificaciones, parametros)
+            niveles_esperados = [
+                logic_rules.determinar_nivel_usuario(e, d, c, parametros) for e, d, c in zip(edades, dias, esperadas)
+            ]
+            self.assertEqual(cohortes.decodificar(niveles, NIVELES).tolist(), niveles_esperados)
+
+            intensidades = cohortes.determinar_intensidad_segura(np.array(edades), clasificaciones, niveles, parametros)
+            self.assertEqual(
+                cohortes.decodificar(intensidades, cohortes.INTENSIDADES).tolist(),
+                [
+                    logic_rules.determinar_intensidad_segura(e, c, n, parametros)
+                    for e, c, n in zip(edades, esperadas, niveles_esperados)
+                ]
+            )
+
+
+class FacetasTests(TestCase):
+    """Catálogo JSON: filtros, recuentos por faceta y paginación por clave."""
+
+    def setUp(self):
+        generador = random.Random(7)
+        for i in range(40):
+            crear_rutina(
+                f'R{i}',
+                nivel=generador.choice(['principiante', 'intermedio', 'avanzado']),
+                objetivo=generador.choice(['peso', 'musculacion', 'mantenimiento']),
+                intensidad=generador.choice(['baja', 'media', 'alta']),
+                dias_semana=generador.randint(1, 7),
+                duracion=f'{generador.choice([20, 30, 45, 60])} minutos',
+                calorias_estimadas=generador.randint(100, 600),
+            )
+
+    def test_recuentos_coinciden_con_filtrar_en_sql(self):
+        consulta = {'nivel': 'principiante,intermedio', 'dias_min': '3', 'duracion_max': '45'}
+        filtro = facetas.leer_filtro(QueryDict(urlencode(consulta)))
+        recuentos, resumen = catalogo.obtener_instantanea().indice_facetas().recuentos(filtro)
+
+        filtradas = facetas.filtrar_queryset(Rutina.objects.all(), filtro)
+        self.assertEqual(resumen['total'], filtradas.count())
+        self.assertEqual(resumen, processor.generar_resumen_estadistico(list(filtradas.values())))
+        # El recuento de una faceta ignora el filtro de esa misma faceta
+        sin_nivel = facetas.filtrar_queryset(Rutina.objects.all(), filtro._replace(nivel=()))
+        for nivel in ('principiante', 'intermedio', 'avanzado'):
+            self.assertEqual(recuentos['nivel'][nivel], sin_nivel.filter(nivel=nivel).count())
+        for objetivo, recuento in recuentos['objetivo'].items():
+            self.assertEqual(recuento, filtradas.filter(objetivo=objetivo).count())
+
+        with self.assertRaises(ValueError):
+            facetas.leer_filtro(QueryDict('dias_min=tres'))
+
+    def test_paginacion_por_clave_recorre_el_catalogo(self):
+        vistos, despues = [], None
+        while True:
+            parametros = {'objetivo': 'peso', 'limite': 4, **({'despues': despues} if despues else {})}
+            respuesta = self.client.get('/api/rutinas/', parametros).json()
+            vistos += [rutina['id'] for rutina in respuesta['rutinas']]
+            despues = respuesta['siguiente']
+            if despues is None:
+                break
+        self.assertEqual(vistos, list(Rutina.objects.filter(objetivo='peso').order_by('id').values_list('id', flat=True)))
+        self.assertEqual(respuesta['resumen']['total'], len(vistos))
+
+        version = respuesta['version']
+        Rutina.objects.filter(pk=vistos[0]).first().delete()
+        respuesta = self.client.get('/api/rutinas/', {'objetivo': 'peso'}).json()
+        self.assertGreater(respuesta['version'], version)
+        self.assertEqual(respuesta['resumen']['total'], len(vistos) - 1)
+        self.assertEqual(self.client.get('/api/rutinas/', {'limite': 'x'}).status_code, 400)
+
+
+class PanelTests(TestCase):
+    """El dashboard y sus secciones se cargan con un número de consultas que no crece con los datos."""
+
+    def _usuario(self, nombre, seguimientos):
+        usuario = UsuarioPersonalizado.objects.create_user(
+            username=nombre, password='clave-segura-123', peso=80, altura=175
+        )
+        PerfilMedico.objects.create(usuario=usuario, imc=26.1, clasificacion_imc='sobrepeso')
+        rutina = crear_rutina(f'Rutina de {nombre}')
+        for _ in range(3):
+            RecomendacionMedica.objects.create(
+                usuario=usuario, rutina_recomendada=rutina, explicacion_medica='-', objetivos_especificos='-'
+            )
+        for imc in seguimientos:
+            SeguimientoUsuario.objects.create(usuario=usuario, peso_actual=80, imc_actual=imc)
+        return usuario
+
+    def test_cada_seccion_en_una_consulta(self):
+        usuario = self._usuario('ana', [27.0, 26.5, 26.0, 25.2, 25.0, 24.8, 24.1])
+        with self.assertNumQueries(1):
+            resumen = cargar_resumen(usuario)
+            self.assertEqual(resumen.perfil_medico.clasificacion_imc, 'sobrepeso')
+        self.assertEqual(resumen.progreso, motor_recomendacion.calcular_progreso_promedio(usuario))
+        with self.assertNumQueries(1):
+            self.assertEqual(recomendacion_vigente(usuario).rutina_recomendada.nombre, 'Rutina de ana')
+        with self.assertNumQueries(1):
+            self.assertEqual(len(seguimientos_recientes(usuario)), 5)
+
+    def test_consultas_del_dashboard_no_dependen_del_historial(self):
+        consultas = []
+        for nombre, seguimientos in (('poco', [25.0]), ('mucho', [25.0 + i / 10 for i in range(30)])):
+            self._usuario(nombre, seguimientos)
+            self.client.login(username=nombre, password='clave-segura-123')
+            with CaptureQueriesContext(connection) as capturadas:
+                for url in ('/dashboard/', '/dashboard/seccion/resumen/',
+                            '/dashboard/seccion/recomendacion/', '/dashboard/seccion/seguimientos/'):
+                    self.assertEqual(self.client.get(url).status_code, 200)
+            consultas.append(len(capturadas))
+        self.assertEqual(consultas[0], consultas[1])
+
+    def test_esqueleto_no_espera_a_las_secciones(self):
+        usuario = self._usuario('eva', [25.0, 24.5])
+        RecomendacionMedica.objects.filter(usuario=usuario).update(vigente=False)
+        self.client.login(username='eva', password='clave-segura-123')
+
+        with mock.patch.object(motor_recomendacion, 'generar_recomendacion_completa') as generar:
+            esqueleto = self.client.get('/dashboard/')
+            self.assertFalse(generar.called)
+            self.assertContains(esqueleto, 'data-seccion="/dashboard/seccion/recomendacion/"')
+            self.assertNotContains(esqueleto, 'Rutina de eva')
+
+            generar.side_effect = RuntimeError('motor no disponible')
+            seccion = self.client.get('/dashboard/seccion/recomendacion/')
+            self.assertTrue(generar.called)
+            self.assertContains(seccion, 'motor no disponible')
+
+        self.assertContains(self.client.get('/dashboard/seccion/resumen/'), 'Sobrepeso')
+        self.assertContains(self.client.get('/dashboard/seccion/seguimientos/'), 'Seguimientos Recientes')
+        self.assertEqual(self.client.get('/dashboard/seccion/otra/').status_code, 404)
+
+    def test_recomendacion_fallida_se_reintenta_al_revalidar(self):
+        usuario = self._usuario('rui', [25.0])
+        RecomendacionMedica.objects.filter(usuario=usuario).update(vigente=False)
+        self.client.login(username='rui', password='clave-segura-123')
+        url = '/dashboard/seccion/recomendacion/'
+
+        with mock.patch.object(motor_recomendacion, 'generar_recomendacion_completa') as generar:
+            generar.side_effect = RuntimeError('motor no disponible')
+            fallida = self.client.get(url)
+            self.assertNotIn('ETag', fallida)
+            # Aunque el navegador revalide, la sección vuelve a intentar generarla
+            reintento = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(reintento.status_code, 200)
+            self.assertEqual(generar.call_count, 2)
+
+        RecomendacionMedica.objects.filter(usuario=usuario).update(vigente=True)
+        self.client.get(url)
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ResumenProgresoTests(TestCase):
+    """El resumen incremental coincide con la agregación en la base de datos."""
+
+    def _agregado(self, usuario):
+        anotado = progreso.anotar_agregados(UsuarioPersonalizado.objects.filter(pk=usuario.pk)).get()
+        return progreso.valores_agregados(anotado)
+
+    def _resumen(self, usuario):
+        resumen = ResumenProgreso.objects.get(usuario=usuario)
+        return {campo: getattr(resumen, campo) for campo in self._agregado(usuario)}
+
+    def test_altas_cambios_y_bajas(self):
+        usuario = UsuarioPersonalizado.objects.create_user(username='eva', password='x')
+        seguimientos = [
+            SeguimientoUsuario.objects.create(usuario=usuario, peso_actual=80, imc_actual=imc)
+            for imc in (28.0, 27.5, 27.25)
+        ]
+        self.assertEqual(self._resumen(usuario), self._agregado(usuario))
+        self.assertEqual(
+            progreso.obtener_progreso(UsuarioPersonalizado.objects.get(pk=usuario.pk)),
+            {'promedio_imc': 27.58, 'total_seguimientos': 3, 'tendencia': 'mejora'}
+        )
+
+        seguimientos[-1].imc_actual = 29.0
+        seguimientos[-1].save()
+        self.assertEqual(self._resumen(usuario)['imc_final'], 29.0)
+
+        seguimientos[-1].delete()
+        seguimientos[0].delete()
+        self.assertEqual(self._resumen(usuario), self._agregado(usuario))
+        self.assertEqual(self._resumen(usuario)['total_seguimientos'], 1)
+
+    def test_primera_alta_concurrente_se_suma_a_la_fila_creada(self):
+        usuario = UsuarioPersonalizado.objects.create_user(username='leo', password='x')
+        # Otra alta concurrente creó la fila después de que esta no la encontrara
+        ResumenProgreso.objects.create(
+            usuario=usuario, total_seguimientos=1, suma_imc=25.0,
+            imc_inicial=25.0, imc_final=25.0, fecha_ultimo=date.today()
+        )
+        intentos = iter([lambda seguimiento: 0, progreso._sumar_alta])
+        with mock.patch.object(progreso, '_sumar_alta', side_effect=lambda s: next(intentos)(s)):
+            SeguimientoUsuario.objects.create(usuario=usuario, peso_actual=80, imc_actual=24.0)
+        resumen = ResumenProgreso.objects.get(usuario=usuario)
+        self.assertEqual(
+            (resumen.total_seguimientos, resumen.suma_imc, resumen.imc_inicial, resumen.imc_final),
+            (2, 49.0, 25.0, 24.0)
+        )
+
+    def test_lectura_en_una_consulta_y_reconstruccion(self):
+        usuario = UsuarioPersonalizado.objects.create_user(username='leo', password='x')
+        for imc in (24.0, 24.5):
+            SeguimientoUsuario.objects.create(usuario=usuario, peso_actual=70, imc_actual=imc)
+        usuario = UsuarioPersonalizado.objects.get(pk=usuario.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(progreso.obtener_progreso(usuario)['tendencia'], 'empeora')
+
+        ResumenProgreso.objects.filter(usuario=usuario).update(total_seguimientos=7)
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_progreso', verificar=True, stdout=StringIO())
+        call_command('reconstruir_progreso', stdout=StringIO())
+        call_command('reconstruir_progreso', verificar=True, stdout=StringIO())
+        self.assertEqual(self._resumen(usuario), self._agregado(usuario))
+
+
+class EjerciciosCompletadosTests(TestCase):
+    """Marcar ejercicios mantiene filas normalizadas y contadores de día, semana y mes."""
+
+    def setUp(self):
+        self.usuario = UsuarioPersonalizado.objects.create_user(username='sol', password='clave-segura-123')
+        self.rutina = crear_rutina('Fuerza', plan_semanal={
+            'Lunes': ['Sentadilla', 'Plancha'],
+            'Miércoles': ['Remo'],
+        })
+        self.lunes = date(2026, 10, 12)
+
+    def test_alternar_y_estado_explicito(self):
+        marcar = lambda ejercicio, completado=None, fecha=self.lunes, dia='Lunes': registrar_ejercicio(
+            self.usuario, self.rutina, fecha, dia, ejercicio, completado
+        )
+        self.assertEqual(marcar('Sentadilla'), 1)
+        self.assertEqual(marcar('Sentadilla', True), 0)
+        self.assertEqual(marcar('Plancha'), 1)
+        progreso = progreso_ejercicios(self.usuario, self.rutina, self.lunes, 'Lunes')
+        self.assertEqual(progreso, (2, 2, 2, 3))
+        self.assertTrue(progreso.completado)
+        self.assertTrue(SeguimientoEjercicio.objects.get(dia_semana='Lunes').completado)
+
+        self.assertEqual(marcar('Sentadilla'), -1)
+        self.assertEqual(marcar('Sentadilla', False), 0)
+        self.assertEqual(marcar('Remo', fecha=date(2026, 10, 14), dia='Miércoles'), 1)
+        progreso = progreso_ejercicios(self.usuario, self.rutina, self.lunes, 'Lunes')
+        self.assertEqual(progreso, (1, 2, 2, 3))
+        self.assertFalse(SeguimientoEjercicio.objects.get(dia_semana='Lunes').completado)
+        self.assertEqual(EjercicioCompletado.objects.count(), 2)
+
+    def test_endpoint_marcar_ejercicio(self):
+        RecomendacionMedica.objects.create(
+            usuario=self.usuario, rutina_recomendada=self.rutina, explicacion_medica='-', objetivos_especificos='-'
+        )
+        self.client.login(username='sol', password='clave-segura-123')
+        respuesta = self.client.post('/api/marcar-ejercicio/', {
+            'rutina_id': self.rutina.id, 'dia_semana': 'Lunes', 'ejercicio': 'Plancha',
+            'fecha': self.lunes.isoformat(),
+        }, content_type='application/json')
+        self.assertEqual(respuesta.json()['progreso_dia'], 50.0)
+        self.assertEqual(respuesta.json()['ejercicios_completados_semana'], 1)
+        self.assertEqual(self.client.get(f'/rutina/{self.rutina.id}/semanal/').status_code, 200)
+
+    def test_catalogo_cargado_sin_descansos_en_los_totales(self):
+        call_command('cargar_rutinas', verbosity=0)
+        rutina = Rutina.objects.get(nombre='Pérdida de Peso Intensiva')
+        self.assertEqual(list(rutina.plan_semanal), ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes'])
+        self.assertNotIn('Descanso', str(rutina.plan_semanal))
+
+        registrar_ejercicio(self.usuario, rutina, self.lunes, 'Lunes', rutina.ejercicios[0])
+        progreso = progreso_ejercicios(self.usuario, rutina, self.lunes, 'Lunes')
+        self.assertEqual(progreso, (1, 5, 1, 25))
+        self.assertEqual(ProgresoSemanal.objects.get(rutina=rutina).num_totales, 25)
+
+    def test_plan_materializado_y_vista_de_solo_lectura(self):
+        plan = normalizar_plan({
+            'Viernes': 'Caminata + estiramientos', 'Lunes': 'HIIT', 'Martes': '', 'Jueves': 'Descanso activo',
+        })
+        self.assertEqual(plan, {'Lunes': ['HIIT'], 'Viernes': ['Caminata + estiramientos']})
+        self.assertEqual(list(plan), ['Lunes', 'Viernes'])
+        self.assertEqual(normalizar_plan(plan), plan)
+
+        sin_plan = crear_rutina('Sin plan', dias_semana=2, ejercicios=['Trote'])
+        self.assertEqual(Rutina.objects.get(pk=sin_plan.pk).plan_semanal, {'Lunes': ['Trote'], 'Martes': ['Trote']})
+
+        RecomendacionMedica.objects.create(
+            usuario=self.usuario, rutina_recomendada=sin_plan, explicacion_medica='-', objetivos_especificos='-'
+        )
+        self.client.login(username='sol', password='clave-segura-123')
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(f'/rutina/{sin_plan.id}/semanal/')
+        self.assertEqual(respuesta.status_code, 200)
+        escrituras = [
+            c['sql'] for c in consultas.captured_queries
+            if c['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'django_session' not in c['sql']
+        ]
+        self.assertEqual(escrituras, [])
+
+    def test_lote_idempotente_y_ultima_marca_gana(self):
+        self.client.login(username='sol', password='clave-segura-123')
+        miercoles = date(2026, 10, 14).isoformat()
+        operacion = lambda ejercicio, completado, marca, fecha=self.lunes.isoformat(), dia='Lunes': {
+            'rutina_id': self.rutina.id, 'fecha': fecha, 'dia_semana': dia,
+            'ejercicio': ejercicio, 'completado': completado, 'marca': marca,
+        }
+        lote = {'operaciones': [
+            operacion('Sentadilla', True, 100),
+            operacion('Plancha', True, 300),
+            operacion('Plancha', False, 200),  # más antigua: gana la marca 300
+            operacion('Remo', True, 150, miercoles, 'Miércoles'),
+        ]}
+        enviar = lambda datos: self.client.post('/api/marcar-ejercicios/', datos, content_type='application/json')
+
+        respuesta = enviar(lote).json()
+        self.assertEqual(respuesta['aplicadas'], 3)
+        self.assertEqual([dia['progreso_dia'] for dia in respuesta['progreso']], [100.0, 100.0])
+        self.assertEqual(respuesta['progreso'][0]['ejercicios_completados_semana'], 3)
+        self.assertEqual(enviar(lote).json()['aplicadas'], 0)
+
+        # Un desmarcado anterior al último toque aplicado no lo deshace
+        self.assertEqual(enviar({'operaciones': [operacion('Plancha', False, 250)]}).json()['aplicadas'], 0)
+        respuesta = enviar({'operaciones': [operacion('Plancha', False, 400)]}).json()
+        self.assertEqual(respuesta['progreso'][0]['ejercicios_completados'], 1)
+        self.assertEqual(progreso_ejercicios(self.usuario, self.rutina, self.lunes, 'Lunes'), (1, 2, 2, 3))
+
+        self.assertEqual(enviar({'operaciones': [{'rutina_id': self.rutina.id}]}).status_code, 400)
+        self.assertEqual(EjercicioCompletado.objects.count(), 2)
+
+    def test_marcado_antiguo_no_deshace_un_desmarcado_posterior(self):
+        self.client.login(username='sol', password='clave-segura-123')
+        operacion = lambda ejercicio, completado, marca: {
+            'rutina_id': self.rutina.id, 'fecha': self.lunes.isoformat(), 'dia_semana': 'Lunes',
+            'ejercicio': ejercicio, 'completado': completado, 'marca': marca,
+        }
+        enviar = lambda *operaciones: self.client.post(
+            '/api/marcar-ejercicios/', {'operaciones': list(operaciones)}, content_type='application/json'
+        ).json()['aplicadas']
+
+        self.assertEqual(enviar(operacion('Plancha', False, 2)), 0)
+        self.assertEqual(enviar(operacion('Plancha', True, 1)), 0)
+        self.assertEqual(enviar(operacion('Sentadilla', True, 1)), 1)
+        self.assertEqual(enviar(operacion('Sentadilla', False, 3)), 1)
+        self.assertEqual(enviar(operacion('Sentadilla', True, 2)), 0)
+        self.assertFalse(EjercicioCompletado.objects.exists())
+        self.assertEqual(progreso_ejercicios(self.usuario, self.rutina, self.lunes, 'Lunes')[:2], (0, 2))
+
+        self.assertEqual(enviar(operacion('Sentadilla', True, 4)), 1)
+        self.assertEqual(EjercicioCompletado.objects.get().marca_cliente, 4)
+
+    def test_lote_que_choca_con_un_toque_concurrente_respeta_las_marcas(self):
+        registrar_ejercicio(self.usuario, self.rutina, self.lunes, 'Lunes', 'Plancha', True)
+        registrar_ejercicio(self.usuario, self.rutina, self.lunes, 'Lunes', 'Sentadilla', True)
+        EjercicioCompletado.objects.filter(ejercicio='Plancha').update(marca_cliente=10)
+        operaciones = [
+            OperacionEjercicio(self.rutina.id, self.lunes, 'Lunes', 'Plancha', False, 5),
+            OperacionEjercicio(self.rutina.id, self.lunes, 'Lunes', 'Sentadilla', True, 7),
+        ]
+
+        # El primer intento no ve las filas (las insertaron toques aún sin confirmar)
+        leer = EjercicioCompletado.objects.select_for_update
+        lecturas = iter([EjercicioCompletado.objects.none, leer])
+        with mock.patch.object(EjercicioCompletado.objects, 'select_for_update',
+                               side_effect=lambda: next(lecturas)()):
+            cambios, _ = registrar_lote(self.usuario, operaciones, {self.rutina.id: self.rutina})
+
+        self.assertEqual(cambios, 0)
+        self.assertEqual(
+            dict(EjercicioCompletado.objects.values_list('ejercicio', 'marca_cliente')),
+            {'Plancha': 10, 'Sentadilla': 7}
+        )
+        self.assertEqual(progreso_ejercicios(self.usuario, self.rutina, self.lunes, 'Lunes')[:2], (2, 2))
+
+    def test_semana_y_mes_con_dias_completados_y_reconstruccion(self):
+        marcar = lambda ejercicio, fecha, dia: registrar_ejercicio(self.usuario, self.rutina, fecha, dia, ejercicio)
+        marcar('Sentadilla', self.lunes, 'Lunes')
+        marcar('Plancha', self.lunes, 'Lunes')
+        marcar('Remo', date(2026, 10, 14), 'Miércoles')
+        marcar('Remo', date(2026, 10, 21), 'Miércoles')
+        marcar('Remo', date(2026, 11, 4), 'Miércoles')
+        marcar('Plancha', self.lunes, 'Lunes')  # desmarca: el lunes deja de estar completo
+
+        semana = ProgresoSemanal.objects.get(inicio_semana=self.lunes)
+        self.assertEqual((semana.num_completados, semana.num_totales, semana.dias_completados), (2, 3, 1))
+        octubre = ProgresoMensual.objects.get(mes=date(2026, 10, 1))
+        # Octubre de 2026: cuatro lunes (2 ejercicios) y cuatro miércoles (1)
+        self.assertEqual((octubre.num_completados, octubre.num_totales, octubre.dias_completados), (3, 12, 2))
+        self.assertEqual(ProgresoMensual.objects.get(mes=date(2026, 11, 1)).dias_completados, 1)
+
+        call_command('reconstruir_actividad', verificar=True, stdout=StringIO())
+        ProgresoMensual.objects.filter(pk=octubre.pk).update(dias_completados=0)
+        ProgresoSemanal.objects.filter(pk=semana.pk).delete()
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_actividad', verificar=True, stdout=StringIO())
+        call_command('reconstruir_actividad', stdout=StringIO())
+        call_command('reconstruir_actividad', verificar=True, stdout=StringIO())
+        self.assertEqual(ProgresoSemanal.objects.get(inicio_semana=self.lunes).dias_completados, 1)
+
+
+    def test_reconstruccion_conserva_los_totales_guardados(self):
+        registrar_ejercicio(self.usuario, self.rutina, self.lunes, 'Lunes', 'Sentadilla')
+        registrar_ejercicio(self.usuario, self.rutina, self.lunes, 'Lunes', 'Plancha')
+        self.rutina.plan_semanal = {'Lunes': ['Sentadilla', 'Plancha', 'Zancada'], 'Miércoles': ['Remo']}
+        self.rutina.save()
+
+        # El plan editado no reescribe el historial: la semana ya registrada sigue cuadrando
+        call_command('reconstruir_actividad', verificar=True, stdout=StringIO())
+        call_command('reconstruir_actividad', stdout=StringIO())
+        semana = ProgresoSemanal.objects.get(inicio_semana=self.lunes)
+        self.assertEqual((semana.num_completados, semana.num_totales, semana.dias_completados), (2, 3, 1))
+        self.assertTrue(SeguimientoEjercicio.objects.get(dia_semana='Lunes').completado)
+
+        # Un día sin ejercicios programados (0 de 0) no cuenta como completado
+        martes = date(2026, 10, 13)
+        registrar_ejercicio(self.usuario, self.rutina, martes, 'Martes', 'Trote')
+        registrar_ejercicio(self.usuario, self.rutina, martes, 'Martes', 'Trote')
+        self.assertFalse(SeguimientoEjercicio.objects.get(dia_semana='Martes').completado)
+        SeguimientoEjercicio.objects.filter(dia_semana='Martes').update(num_completados=3)
+        call_command('reconstruir_actividad', stdout=StringIO())
+        dia = SeguimientoEjercicio.objects.get(dia_semana='Martes')
+        self.assertEqual((dia.num_completados, dia.num_totales, dia.completado), (0, 0, False))
+
+class VersionesTests(TestCase):
+    """ETag por sellos de versión: 304 mientras no cambien los datos de la página."""
+
+    def setUp(self):
+        self.usuario = UsuarioPersonalizado.objects.create_user(username='luz', password='clave-segura-123')
+        self.rutina = crear_rutina('Fuerza', plan_semanal={'Lunes': ['Remo']})
+        RecomendacionMedica.objects.create(
+            usuario=self.usuario, rutina_recomendada=self.rutina, explicacion_medica='-', objetivos_especificos='-'
+        )
+        self.client.login(username='luz', password='clave-segura-123')
+
+    def _revalidar(self, url):
+        """(estado de la revalidación, ETag) tras una primera petición completa."""
+        self.client.get(url)  # la primera visita fija la cookie CSRF, que forma parte del ETag
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, etag
+
+    def test_304_hasta_que_cambian_los_datos(self):
+        semanal = f'/rutina/{self.rutina.id}/semanal/'
+        self.assertEqual(self._revalidar(semanal)[0], 304)
+        estado, etag = self._revalidar('/historial-recomendaciones/')
+        self.assertEqual(estado, 304)
+        self.assertIn('private', self.client.get('/historial-recomendaciones/')['Cache-Control'])
+
+        # Un seguimiento no cambia el historial; una recomendación nueva sí
+        SeguimientoUsuario.objects.create(usuario=self.usuario, peso_actual=80, imc_actual=25.0)
+        self.assertEqual(self.client.get('/historial-recomendaciones/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        RecomendacionMedica.objects.create(
+            usuario=self.usuario, rutina_recomendada=self.rutina, explicacion_medica='-', objetivos_especificos='-'
+        )
+        self.assertEqual(self.client.get('/historial-recomendaciones/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(semanal)['ETag']
+        registrar_ejercicio(self.usuario, self.rutina, date.today(), 'Lunes', 'Remo')
+        self.assertEqual(self.client.get(semanal, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        estado, etag = self._revalidar('/rutinas/?nivel=principiante')
+        self.assertEqual(estado, 304)
+        self.assertNotEqual(self.client.get('/rutinas/')['ETag'], etag)
+        self.rutina.save()
+        self.assertEqual(self.client.get('/rutinas/?nivel=principiante', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ApiRecomendarTests(TestCase):
+    """API JSON de recomendación anónima: mismos resultados que las reglas, sin sesión ni CSRF."""
+
+    def setUp(self):
+        call_command('cargar_rutinas', verbosity=0)
+
+    def test_coincide_con_la_ruta_del_formulario(self):
+        from django.test import Client
+        from .datos import RUTINAS
+        from .recomendacion_anonima import perfilar
+
+        cliente = Client(enforce_csrf_checks=True)
+        parametros = almacen_reglas.obtener_motor().parametros
+        por_nombre = {rutina['nombre']: rutina for rutina in RUTINAS}
+        generador = random.Random(3)
+        for _ in range(12):
+            datos = {
+                'edad': generador.randint(15, 90), 'peso': generador.randint(45, 140),
+                'altura': round(generador.uniform(1.5, 2.0), 2), 'dias_disponibles': generador.randint(1, 7),
+                'objetivo': generador.choice(['peso', 'musculacion', 'mantenimiento']), 'limite': 20,
+            }
+            respuesta = cliente.post('/api/recomendar/', datos, content_type='application/json')
+            self.assertEqual(respuesta.status_code, 200)
+            self.assertNotIn('sessionid', respuesta.cookies)
+            cuerpo = respuesta.json()
+            self.assertEqual(len(cuerpo['rutinas']), len(RUTINAS))
+
+            usuario = perfilar({campo: str(valor) for campo, valor in datos.items()}, parametros)
+            self.assertEqual(cuerpo['perfil']['nivel'], usuario['nivel_recomendado'])
+            for item in cuerpo['rutinas']:
+                rutina = por_nombre[item['nombre']]
+                self.assertEqual(item['puntuacion'], round(processor.calcular_compatibilidad(rutina, usuario), 1))
+                segura, _ = logic_rules.validar_seguridad_rutina(rutina, usuario, parametros)
+                self.assertEqual(item['segura'], segura)
+            puntuaciones = [item['puntuacion'] for item in cuerpo['rutinas']]
+            self.assertEqual(puntuaciones, sorted(puntuaciones, reverse=True))
+
+        respuesta = cliente.get('/api/recomendar/', {'edad': 30, 'peso': 70, 'altura': 1.75,
+                                                     'dias_disponibles': 3, 'objetivo': 'peso'})
+        self.assertEqual(len(respuesta.json()['rutinas']), 4)
+        respuesta = cliente.get('/api/recomendar/', {'edad': 'x'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('errores', respuesta.json())
+
+    def test_formulario_memoriza_resultado_por_entradas_normalizadas(self):
+        from django.test import override_settings
+        from .recomendacion_anonima import memo_fragmentos, memo_resultados
+
+        memo_resultados.limpiar()
+        memo_fragmentos.limpiar()
+        datos = {'edad': 30, 'peso': '70.04', 'altura': '1.751', 'dias_disponibles': 3, 'objetivo': 'peso'}
+        primera = self.client.post('/recomendar/', datos)
+        self.assertTemplateUsed(primera, 'recommender/parciales/resultado.html')
+        segunda = self.client.post('/recomendar/', dict(datos, peso='70.0', altura='1.75'))
+        self.assertTemplateNotUsed(segunda, 'recommender/parciales/resultado.html')
+        self.assertEqual((memo_resultados.aciertos, memo_fragmentos.aciertos), (1, 1))
+        self.assertEqual(primera.context['rutina'], segunda.context['rutina'])
+
+        with override_settings(CACHE_FRAGMENTO_RESULTADO=False):
+            sin_fragmento = self.client.post('/recomendar/', datos)
+        self.assertTemplateUsed(sin_fragmento, 'recommender/parciales/resultado.html')
+        self.assertContains(sin_fragmento, primera.context['rutina']['nombre'])
+        self.assertEqual(memo_resultados.aciertos, 2)
+
+    def test_valores_no_finitos_son_errores_de_validacion(self):
+        from .recomendacion_anonima import memo_resultados
+
+        memo_resultados.limpiar()
+        datos = {'edad': 30, 'peso': 70, 'altura': 1.75, 'dias_disponibles': 3, 'objetivo': 'peso'}
+        for campo, valor in (('peso', 'nan'), ('altura', 'inf'), ('peso', '-Infinity'), ('edad', 'nan')):
+            respuesta = self.client.post('/recomendar/', dict(datos, **{campo: valor}))
+            self.assertTemplateUsed(respuesta, 'recommender/index.html')
+            self.assertEqual(len(respuesta.context['errores']), 1)
+            respuesta = self.client.get('/api/recomendar/', dict(datos, **{campo: valor}))
+            self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(memo_resultados.fallos, 0)
+
+
+class HistorialTests(TestCase):
+    """Historial de recomendaciones paginado por clave y sin N+1."""
+
+    def test_paginas_recorren_el_historial_en_consultas_constantes(self):
+        from .views import RECOMENDACIONES_POR_PAGINA
+
+        usuario = UsuarioPersonalizado.objects.create_user(username='ana', password='clave-segura-123')
+        rutinas = [crear_rutina(f'R{i}') for i in range(3)]
+        creadas = [
+            RecomendacionMedica.objects.create(
+                usuario=usuario, rutina_recomendada=rutinas[i % 3], explicacion_medica='-',
+                objetivos_especificos='-', vigente=False
+            )
+            for i in range(2 * RECOMENDACIONES_POR_PAGINA + 5)
+        ]
+        # Fechas repetidas: el id desempata
+        RecomendacionMedica.objects.filter(pk__in=[r.pk for r in creadas[:10]]).update(
+            fecha_recomendacion=creadas[0].fecha_recomendacion
+        )
+        esperado = list(
+            RecomendacionMedica.objects.filter(usuario=usuario)
+            .order_by('-fecha_recomendacion', '-id').values_list('id', flat=True)
+        )
+
+        self.client.login(username='ana', password='clave-segura-123')
+        vistos, url, consultas_por_pagina = [], '/historial-recomendaciones/', set()
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get(url)
+            consultas_por_pagina.add(len(consultas))
+            vistos += [r.id for r in respuesta.context['recomendaciones']]
+            siguiente = respuesta.context['siguiente']
+            url = f'/historial-recomendaciones/?antes={siguiente}' if siguiente else None
+        self.assertEqual(vistos, esperado)
+        self.assertEqual(len(consultas_por_pagina), 1)
+
+        self.assertEqual(self.client.get('/historial-recomendaciones/?antes=basura').status_code, 302)
+
+
+class SerieSeguimientosTests(TestCase):
+    """Serie de peso e IMC reducida con LTTB y lista de seguimientos paginada."""
+
+    def test_lttb_conserva_extremos_y_picos(self):
+        puntos = [(x, 0.0) for x in range(200)]
+        puntos[77] = (77, 50.0)
+        indices = processor.reducir_serie_lttb(puntos, 20)
+        self.assertEqual(len(indices), 20)
+        self.assertEqual((indices[0], indices[-1]), (0, 199))
+        self.assertIn(77, indices)
+        self.assertEqual(indices, sorted(set(indices)))
+        self.assertEqual(processor.reducir_serie_lttb(puntos[:10], 20), list(range(10)))
+
+    def test_serie_y_pagina_de_tamano_acotado(self):
+        from datetime import timedelta
+        from .views import SEGUIMIENTOS_POR_PAGINA
+
+        usuario = UsuarioPersonalizado.objects.create_user(username='eva', password='clave-segura-123')
+        inicio = date(2021, 1, 1)
+        SeguimientoUsuario.objects.bulk_create([
+            SeguimientoUsuario(usuario=usuario, peso_actual=90 - i / 100, imc_actual=29 - i / 300)
+            for i in range(5 * 365)
+        ])
+        # auto_now_add pone la fecha de hoy a todos: un seguimiento diario durante cinco años
+        seguimientos = list(SeguimientoUsuario.objects.order_by('id'))
+        for i, seguimiento in enumerate(seguimientos):
+            seguimiento.fecha = inicio + timedelta(days=i)
+        SeguimientoUsuario.objects.bulk_update(seguimientos, ['fecha'])
+
+        self.client.login(username='eva', password='clave-segura-123')
+        serie = self.client.get('/api/seguimientos/serie/', {'puntos': 60}).json()
+        self.assertEqual(serie['total'], 5 * 365)
+        self.assertEqual(len(serie['peso']), 60)
+        self.assertEqual(len(serie['imc']), 60)
+        self.assertEqual(serie['peso'][0], ['2021-01-01', 90.0])
+
+        serie = self.client.get('/api/seguimientos/serie/', {'desde': '2025-12-01'}).json()
+        self.assertEqual(serie['total'], len(serie['peso']))
+        self.assertEqual(self.client.get('/api/seguimientos/serie/', {'puntos': 1}).status_code, 400)
+
+        respuesta = self.client.get('/seguimiento/')
+        self.assertEqual(len(respuesta.context['seguimientos']), SEGUIMIENTOS_POR_PAGINA)
+        segunda = self.client.get(f"/seguimiento/?antes={respuesta.context['siguiente']}")
+        self.assertLess(segunda.context['seguimientos'][0].fecha, respuesta.context['seguimientos'][-1].fecha)
@@ -17,6 +17,7 @@ urlpatterns = [
     
     # Dashboard y perfil (requieren autenticación)
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/seccion/<str:seccion>/', views.dashboard_seccion, name='dashboard_seccion'),
     path('perfil/', views.perfil, name='perfil'),
     path('generar-recomendacion/', views.generar_recomendacion, name='generar_recomendacion'),
     path('seguimiento/', views.seguimiento, name='seguimiento'),
@@ -24,6 +25,10 @@ urlpatterns = [
     path('rutina/<int:rutina_id>/semanal/', views.rutina_semanal, name='rutina_semanal'),
     
     # Chatbot API
+    path('api/recomendar/', views.api_recomendar, name='api_recomendar'),
+    path('api/rutinas/', views.api_rutinas, name='api_rutinas'),
     path('api/chatbot/', views.chatbot_api, name='chatbot_api'),
+    path('api/seguimientos/serie/', views.serie_seguimientos, name='serie_seguimientos'),
     path('api/marcar-ejercicio/', views.marcar_ejercicio, name='marcar_ejercicio'),
+    path('api/marcar-ejercicios/', views.marcar_ejercicios_lote, name='marcar_ejercicios_lote'),
 ]
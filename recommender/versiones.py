@@ -0,0 +1,154 @@
+"""
+Sellos de versión para respuestas condicionales (ETag y Last-Modified).
+
+Una página depende de la versión del catálogo y de algunos contadores de
+`VersionesUsuario` (perfil, recomendaciones, seguimientos, ejercicios). Las
+señales de abajo incrementan el contador que corresponde en la misma
+transacción que el cambio; marcar ejercicios lo incrementa desde
+`ejercicios.ajustar_contadores`.
+
+El decorador `condicional()` calcula el sello con dos consultas (versión del
+catálogo y contadores del usuario) antes de ejecutar la vista y responde 304
+si el cliente ya tiene esa versión.
+
+Los cambios hechos con `QuerySet.update()` o `bulk_create()` no disparan las
+señales: después hay que llamar a `incrementar_version_usuario()`.
+"""
+import hashlib
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import catalogo
+from .models import (
+    PerfilMedico,
+    RecomendacionMedica,
+    SeguimientoUsuario,
+    UsuarioPersonalizado,
+    VersionesUsuario,
+)
+
+CAMPOS = ('perfil', 'recomendaciones', 'seguimientos', 'ejercicios')
+
+
+def incrementar_version_usuario(usuario_id: int, *campos: str, crear: bool = True) -> None:
+    """
+    Incrementa contadores de versión de un usuario.
+
+    Args:
+        usuario_id: Id del usuario
+        campos: Contadores a incrementar (ver CAMPOS)
+        crear: Si es False no crea la fila (al borrar en cascada el usuario
+            puede no existir ya)
+    """
+    cambios = {campo: F(campo) + 1 for campo in campos}
+    actualizadas = VersionesUsuario.objects.filter(usuario_id=usuario_id).update(
+        fecha_actualizacion=timezone.now(), **cambios
+    )
+    if not actualizadas and crear:
+        VersionesUsuario.objects.get_or_create(usuario_id=usuario_id, defaults={campo: 1 for campo in campos})
+
+
+def versiones_usuario(usuario_id: int) -> Tuple[Tuple[int, ...], Optional[object]]:
+    """Contadores (en el orden de CAMPOS) y fecha del último cambio; ceros si no hay fila."""
+    fila = (
+        VersionesUsuario.objects
+        .filter(usuario_id=usuario_id)
+        .values_list(*CAMPOS, 'fecha_actualizacion')
+        .first()
+    )
+    if fila is None:
+        return (0,) * len(CAMPOS), None
+    return tuple(fila[:-1]), fila[-1]
+
+
+def _sello(request, campos, extra, reutilizable, args, kwargs) -> Optional[Tuple[str, object]]:
+    """ETag y Last-Modified de la petición; None si la respuesta no debe reutilizarse."""
+    # Un mensaje pendiente se mostraría en la página: hay que generarla
+    if len(get_messages(request)):
+        return None
+    if reutilizable is not None and not reutilizable(request, *args, **kwargs):
+        return None
+
+    version, fecha = catalogo.version_catalogo()
+    partes = [
+        getattr(settings, 'VERSION_DESPLIEGUE', ''),
+        version,
+        request.get_full_path(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        request.user.pk,
+        args,
+        sorted(kwargs.items()),
+    ]
+    if campos and request.user.is_authenticated:
+        contadores, fecha_usuario = versiones_usuario(request.user.pk)
+        partes.append([contadores[CAMPOS.index(campo)] for campo in campos])
+        if fecha_usuario and (fecha is None or fecha_usuario > fecha):
+            fecha = fecha_usuario
+    if extra is not None:
+        partes.append(extra(request, *args, **kwargs))
+    return hashlib.sha1(repr(partes).encode()).hexdigest(), fecha
+
+
+def condicional(*campos: str, extra: Optional[Callable] = None, reutilizable: Optional[Callable] = None):
+    """
+    Decorador de vistas GET: ETag y Last-Modified a partir de los sellos de versión.
+
+    Args:
+        campos: Contadores del usuario de los que depende la página (ver CAMPOS)
+        extra: Función (request, *args, **kwargs) con otros datos de los que
+            depende la página (p. ej. la semana en curso)
+        reutilizable: Función (request, *args, **kwargs) que devuelve False
+            cuando la respuesta no debe llevar sello (p. ej. porque la vista
+            reintentará algo que falló sin cambiar ningún contador)
+    """
+    def decorador(vista):
+        def sello(request, *args, **kwargs):
+            if not hasattr(request, '_sello_version'):
+                request._sello_version = _sello(request, campos, extra, reutilizable, args, kwargs)
+            return request._sello_version
+
+        def etag(request, *args, **kwargs):
+            resultado = sello(request, *args, **kwargs)
+            return resultado and resultado[0]
+
+        def ultima_modificacion(request, *args, **kwargs):
+            resultado = sello(request, *args, **kwargs)
+            return resultado and resultado[1]
+
+        # private: la página depende del usuario y lleva su token CSRF;
+        # no-cache: el navegador revalida siempre (y recibe 304 si nada cambió)
+        return cache_control(private=True, no_cache=True)(
+            condition(etag_func=etag, last_modified_func=ultima_modificacion)(vista)
+        )
+    return decorador
+
+
+@receiver(post_save, sender=UsuarioPersonalizado)
+def _usuario_guardado(sender, instance, **kwargs):
+    incrementar_version_usuario(instance.pk, 'perfil')
+
+
+@receiver(post_save, sender=PerfilMedico)
+@receiver(post_delete, sender=PerfilMedico)
+def _perfil_modificado(sender, instance, **kwargs):
+    incrementar_version_usuario(instance.usuario_id, 'perfil', crear='created' in kwargs)
+
+
+@receiver(post_save, sender=RecomendacionMedica)
+@receiver(post_delete, sender=RecomendacionMedica)
+def _recomendacion_modificada(sender, instance, **kwargs):
+    incrementar_version_usuario(instance.usuario_id, 'recomendaciones', crear='created' in kwargs)
+
+
+@receiver(post_save, sender=SeguimientoUsuario)
+@receiver(post_delete, sender=SeguimientoUsuario)
+def _seguimiento_modificado(sender, instance, **kwargs):
+    incrementar_version_usuario(instance.usuario_id, 'seguimientos', crear='created' in kwargs)
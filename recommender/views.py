@@ -1,22 +1,55 @@
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from django.db import transaction
 from .datos import RUTINAS
-from . import processor
-from . import logic_rules
+from . import progreso
 from .forms import (
     FormularioRegistro,
     FormularioPerfilMedico,
     FormularioActualizarUsuario,
     FormularioSeguimiento
 )
-from .models import UsuarioPersonalizado, PerfilMedico, RecomendacionMedica, SeguimientoUsuario, Rutina, SeguimientoEjercicio
+from .models import (
+    UsuarioPersonalizado,
+    PerfilMedico,
+    RecomendacionMedica,
+    SeguimientoUsuario,
+    Rutina,
+    SeguimientoEjercicio,
+    EjercicioCompletado,
+    ProgresoSemanal
+)
 from .motor_recomendacion import motor_recomendacion
-from .chatbot import chatbot
+from .almacen_reglas import obtener_motor
+from .panel import cargar_resumen, recomendacion_vigente, seguimientos_recientes
+from .catalogo import obtener_instantanea
+from .facetas import FiltroCatalogo, filtrar_queryset, leer_filtro
+from .versiones import condicional
+from .paginacion import pagina_por_clave
+from .recomendacion_anonima import (
+    fragmento_resultado,
+    leer_entrada,
+    normalizar_formulario,
+    perfilar,
+    resultado_formulario,
+    resumen_recomendacion,
+    validar_formulario,
+)
+from .ejercicios import (
+    OperacionEjercicio,
+    inicio_de_semana,
+    plan_de,
+    progreso_ejercicios,
+    registrar_ejercicio,
+    registrar_lote,
+    total_ejercicios_plan
+)
 from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
 import json
 
 
@@ -48,6 +81,10 @@ def recomendar(request: HttpRequest) -> HttpResponse:
     3. Inferencia lógica (logic_rules.py)
     4. Selección de resultado
     5. Renderizado
+    
+    Los pasos 2 a 4 se memorizan por versión de reglas y entradas
+    normalizadas (ver recomendacion_anonima.resultado_formulario); con
+    CACHE_FRAGMENTO_RESULTADO también el HTML de la sección de resultados.
     """
     if request.method != 'POST':
         return render(request, 'recommender/index.html', {
@@ -55,102 +92,31 @@ def recomendar(request: HttpRequest) -> HttpResponse:
         })
     
     try:
-        datos_raw = {
-            'edad': request.POST.get('edad'),
-            'peso': request.POST.get('peso'),
-            'altura': request.POST.get('altura'),
-            'dias_disponibles': request.POST.get('dias_disponibles'),
-            'objetivo': request.POST.get('objetivo')
-        }
-        
-        errores = []
-        if not datos_raw['edad'] or int(datos_raw['edad']) < 15 or int(datos_raw['edad']) > 100:
-            errores.append('La edad debe estar entre 15 y 100 años')
-        if not datos_raw['peso'] or float(datos_raw['peso']) < 30 or float(datos_raw['peso']) > 300:
-            errores.append('El peso debe estar entre 30 y 300 kg')
-        if not datos_raw['altura'] or float(datos_raw['altura']) < 1.0 or float(datos_raw['altura']) > 2.5:
-            errores.append('La altura debe estar entre 1.0 y 2.5 metros')
-        if not datos_raw['dias_disponibles'] or int(datos_raw['dias_disponibles']) < 1 or int(datos_raw['dias_disponibles']) > 7:
-            errores.append('Los días disponibles deben estar entre 1 y 7')
-        if not datos_raw['objetivo'] or datos_raw['objetivo'] not in ['peso', 'musculacion', 'mantenimiento']:
-            errores.append('Objetivo inválido')
+        datos_raw = leer_entrada(request.POST)
         
+        errores = validar_formulario(datos_raw)
         if errores:
             return render(request, 'recommender/index.html', {
                 'errores': errores,
                 'total_rutinas': len(RUTINAS)
             })
         
-        datos_usuario = processor.transformar_datos_usuario(datos_raw)
+        # Peso y altura a la precisión del formulario: clave del memo de resultados
+        entrada = normalizar_formulario(datos_raw)
+        motor = obtener_motor()
         
-        imc = processor.calcular_imc(datos_usuario['peso'], datos_usuario['altura'])
-        imc_clasificacion = processor.clasificar_imc(imc)
+        # IMC, reglas y selección de rutinas (memorizados por reglas y entradas)
+        resultado = resultado_formulario(entrada, motor.parametros, motor.version)
         
-        nivel_recomendado = logic_rules.determinar_nivel_usuario(
-            datos_usuario['edad'],
-            datos_usuario['dias_disponibles'],
-            imc_clasificacion
-        )
-        
-        objetivo_recomendado = logic_rules.determinar_objetivo_recomendado(
-            datos_usuario['objetivo'],
-            imc_clasificacion
-        )
-        
-        intensidad_recomendada = logic_rules.determinar_intensidad_segura(
-            datos_usuario['edad'],
-            imc_clasificacion,
-            nivel_recomendado
-        )
-        
-        datos_usuario['imc'] = imc
-        datos_usuario['imc_clasificacion'] = imc_clasificacion
-        datos_usuario['nivel_recomendado'] = nivel_recomendado
-        datos_usuario['objetivo_recomendado'] = objetivo_recomendado
-        datos_usuario['intensidad_recomendada'] = intensidad_recomendada
-        
-        rutina_principal, puntuacion = processor.obtener_mejor_rutina(RUTINAS, datos_usuario)
-        
-        if not rutina_principal:
+        if resultado is None:
             return render(request, 'recommender/index.html', {
                 'error': 'No se encontró ninguna rutina compatible',
                 'total_rutinas': len(RUTINAS)
             })
         
-        es_seguro, razon_seguridad = logic_rules.validar_seguridad_rutina(rutina_principal, datos_usuario)
-        
-        explicacion = logic_rules.generar_explicacion_recomendacion(datos_usuario, rutina_principal)
-        
-        rutinas_alternativas = processor.obtener_rutinas_alternativas(
-            RUTINAS,
-            datos_usuario,
-            rutina_principal['id'],
-            limite=3
-        )
-        
-        calorias_estimadas = processor.calcular_calorias_estimadas(
-            rutina_principal['duracion_minutos'],
-            rutina_principal['intensidad'],
-            datos_usuario['peso']
-        )
-        
-        context = {
-            'usuario': datos_usuario,
-            'rutina': rutina_principal,
-            'puntuacion': round(puntuacion, 1),
-            'es_seguro': es_seguro,
-            'razon_seguridad': razon_seguridad,
-            'explicacion': explicacion,
-            'alternativas': rutinas_alternativas,
-            'calorias_estimadas': calorias_estimadas,
-            'imc_texto': f"{imc:.1f}",
-            'imc_clasificacion_texto': {
-                'bajo_peso': 'Bajo Peso',
-                'normal': 'Normal',
-                'sobrepeso': 'Sobrepeso',
-                'obesidad': 'Obesidad'
-            }.get(imc_clasificacion, 'Normal')
-        }
+        context = dict(resultado)
+        if getattr(settings, 'CACHE_FRAGMENTO_RESULTADO', False):
+            context['fragmento'] = fragmento_resultado(entrada, motor.parametros, motor.version, resultado)
         
         return render(request, 'recommender/resultado.html', context)
         
@@ -166,28 +132,30 @@ def recomendar(request: HttpRequest) -> HttpResponse:
         })
 
 
+@condicional()
 def catalogo_rutinas(request: HttpRequest) -> HttpResponse:
     """
     Vista de catálogo - PARADIGMA IMPERATIVO con operaciones funcionales.
     
     Flujo imperativo:
     1. Obtener parámetros de filtro
-    2. Aplicar filtros usando funciones puras
+    2. Seleccionar las rutinas con el índice de facetas de la instantánea
     3. Preparar contexto
     4. Renderizar
+    
+    Responde 304 mientras no cambie la versión del catálogo.
     """
     nivel_filtro = request.GET.get('nivel', '')
     objetivo_filtro = request.GET.get('objetivo', '')
+    filtro = FiltroCatalogo(
+        nivel=(nivel_filtro,) if nivel_filtro else (),
+        objetivo=(objetivo_filtro,) if objetivo_filtro else ()
+    )
     
-    rutinas_filtradas = RUTINAS.copy()
-    
-    if nivel_filtro:
-        rutinas_filtradas = processor.filtrar_rutinas_por_nivel(rutinas_filtradas, nivel_filtro)
-    
-    if objetivo_filtro:
-        rutinas_filtradas = processor.filtrar_rutinas_por_objetivo(rutinas_filtradas, objetivo_filtro)
-    
-    estadisticas = processor.generar_resumen_estadistico(rutinas_filtradas)
+    catalogo = obtener_instantanea()
+    indice = catalogo.indice_facetas()
+    rutinas_filtradas = sorted(catalogo.seleccionar(indice.seleccion(filtro)), key=lambda r: r.id)
+    _, estadisticas = indice.recuentos(filtro)
     
     context = {
         'rutinas': rutinas_filtradas,
@@ -200,6 +168,104 @@ def catalogo_rutinas(request: HttpRequest) -> HttpResponse:
     return render(request, 'recommender/rutinas.html', context)
 
 
+# Rutinas por respuesta de la API de recomendación
+RUTINAS_RECOMENDADAS = 4
+MAX_RUTINAS_RECOMENDADAS = 20
+
+
+@csrf_exempt
+def api_recomendar(request: HttpRequest) -> HttpResponse:
+    """
+    API de recomendación anónima y sin estado.
+    
+    Recibe los campos del formulario de `recomendar` (edad, peso, altura,
+    dias_disponibles, objetivo) por GET o como JSON por POST, y opcionalmente
+    `limite`. No usa sesión, CSRF ni plantillas: la respuesta es el perfil y
+    las mejores rutinas con puntuación, veredicto de seguridad (código de
+    razón) y códigos de explicación.
+    """
+    if request.method == 'GET':
+        datos = request.GET
+    elif request.method == 'POST':
+        try:
+            datos = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({'errores': ['JSON inválido']}, status=400)
+        if not isinstance(datos, dict):
+            return JsonResponse({'errores': ['Se esperaba un objeto JSON']}, status=400)
+    else:
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    
+    try:
+        datos_raw = leer_entrada(datos)
+        errores = validar_formulario(datos_raw)
+        limite = min(int(datos.get('limite') or RUTINAS_RECOMENDADAS), MAX_RUTINAS_RECOMENDADAS)
+        if limite < 1:
+            errores.append('limite debe ser positivo')
+    except (TypeError, ValueError) as e:
+        return JsonResponse({'errores': [f'Datos inválidos: {e}']}, status=400)
+    if errores:
+        return JsonResponse({'errores': errores}, status=400)
+    
+    motor = obtener_motor()
+    datos_usuario = perfilar(datos_raw, motor.parametros)
+    respuesta = resumen_recomendacion(obtener_instantanea(), datos_usuario, motor.parametros, limite)
+    respuesta['reglas'] = motor.version
+    return JsonResponse(respuesta)
+
+
+# Tamaño de página del catálogo JSON
+RUTINAS_POR_PAGINA = 20
+MAX_RUTINAS_POR_PAGINA = 100
+
+CAMPOS_RUTINA_API = (
+    'id', 'nombre', 'descripcion', 'nivel', 'objetivo', 'intensidad',
+    'dias_semana', 'duracion_minutos', 'calorias_estimadas'
+)
+
+
+@condicional()
+def api_rutinas(request: HttpRequest) -> HttpResponse:
+    """
+    API del catálogo: rutinas activas filtradas y paginadas por clave.
+
+    Filtros multivalor `nivel`, `objetivo` e `intensidad`; rangos
+    `dias_min`/`dias_max`, `duracion_min`/`duracion_max` y
+    `calorias_min`/`calorias_max`. Paginación con `limite` y `despues` (el
+    `siguiente` de la página anterior). Las facetas y el resumen salen del
+    índice de la versión vigente del catálogo.
+    """
+    try:
+        filtro = leer_filtro(request.GET)
+        limite = min(int(request.GET.get('limite') or RUTINAS_POR_PAGINA), MAX_RUTINAS_POR_PAGINA)
+        despues = int(request.GET.get('despues') or 0)
+        if limite < 1:
+            raise ValueError('limite debe ser positivo')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    catalogo = obtener_instantanea()
+    indice = catalogo.indice_facetas()
+    facetas, resumen = indice.recuentos(filtro)
+
+    # Una fila de más para saber si hay página siguiente
+    pagina = list(
+        filtrar_queryset(Rutina.objects.filter(activa=True, id__gt=despues), filtro)
+        .order_by('id')
+        .values(*CAMPOS_RUTINA_API)[:limite + 1]
+    )
+    siguiente = pagina[limite - 1]['id'] if len(pagina) > limite else None
+
+    return JsonResponse({
+        'version': catalogo.version,
+        'rutinas': pagina[:limite],
+        'siguiente': siguiente,
+        'facetas': facetas,
+        'resumen': resumen,
+        'limites': indice.limites(),
+    })
+
+
 def acerca_de(request: HttpRequest) -> HttpResponse:
     """
     Vista informativa - PARADIGMA IMPERATIVO simple.
@@ -303,56 +369,94 @@ def logout_usuario(request: HttpRequest) -> HttpResponse:
 # ==================== VISTAS DE DASHBOARD Y PERFIL ====================
 
 @login_required
+@condicional('perfil')
 def dashboard(request: HttpRequest) -> HttpResponse:
     """
     Dashboard personalizado - PARADIGMA IMPERATIVO.
     
-    Coordina:
-    1. Obtención de datos del usuario
-    2. Generación de recomendación (motor híbrido)
-    3. Cálculo de progreso (funcional)
-    4. Renderizado de información
+    Responde al momento con el esqueleto de la página (datos del usuario de
+    la sesión, sin consultas); cada sección se pide después a
+    `dashboard_seccion` y se inserta al llegar:
+    1. Resumen: perfil médico y progreso
+    2. Recomendación vigente (la genera si no hay ninguna)
+    3. Seguimientos recientes
     """
-    usuario = request.user
-    
-    # Obtener o crear perfil médico
-    try:
-        perfil_medico = usuario.perfil_medico
-    except PerfilMedico.DoesNotExist:
-        perfil_medico = PerfilMedico.objects.create(usuario=usuario)
-        motor_recomendacion._actualizar_perfil_medico(usuario, perfil_medico)
+    context = {
+        'usuario': request.user,
+    }
     
-    # Obtener recomendación actual
-    recomendacion_actual = None
-    try:
-        recomendacion_actual = usuario.recomendaciones.filter(vigente=True).latest('fecha_recomendacion')
-    except RecomendacionMedica.DoesNotExist:
-        pass
+    return render(request, 'recommender/dashboard.html', context)
+
+
+def _seccion_resumen(request: HttpRequest) -> HttpResponse:
+    """IMC y progreso; crea el perfil médico si no existe."""
+    resumen = cargar_resumen(request.user)
+    perfil_medico = resumen.perfil_medico
+    if perfil_medico is None:
+        perfil_medico, _ = PerfilMedico.objects.get_or_create(usuario=request.user)
+        motor_recomendacion._actualizar_perfil_medico(request.user, perfil_medico)
     
-    # Generar nueva recomendación si no existe
+    return render(request, 'recommender/parciales/dashboard_resumen.html', {
+        'perfil_medico': perfil_medico,
+        'progreso': resumen.progreso,
+    })
+
+
+def _seccion_recomendacion(request: HttpRequest) -> HttpResponse:
+    """Recomendación vigente; la genera si el usuario no tiene ninguna (la sección lenta)."""
+    recomendacion_actual = recomendacion_vigente(request.user)
+    error_recomendacion = None
     if not recomendacion_actual:
         try:
-            resultado = motor_recomendacion.generar_recomendacion_completa(usuario)
+            resultado = motor_recomendacion.generar_recomendacion_completa(request.user)
             if 'recomendacion' in resultado:
                 recomendacion_actual = resultado['recomendacion']
         except Exception as e:
-            messages.warning(request, f'No se pudo generar recomendación: {str(e)}')
-    
-    # Calcular progreso (paradigma funcional)
-    progreso = motor_recomendacion.calcular_progreso_promedio(usuario)
+            error_recomendacion = str(e)
     
-    # Obtener seguimientos recientes
-    seguimientos_recientes = usuario.seguimientos.all()[:5]
-    
-    context = {
-        'usuario': usuario,
-        'perfil_medico': perfil_medico,
+    return render(request, 'recommender/parciales/dashboard_recomendacion.html', {
         'recomendacion_actual': recomendacion_actual,
-        'progreso': progreso,
-        'seguimientos_recientes': seguimientos_recientes,
-    }
+        'error_recomendacion': error_recomendacion,
+    })
+
+
+def _seccion_seguimientos(request: HttpRequest) -> HttpResponse:
+    """Últimos seguimientos."""
+    return render(request, 'recommender/parciales/dashboard_seguimientos.html', {
+        'seguimientos_recientes': seguimientos_recientes(request.user),
+    })
+
+
+def _hay_recomendacion(request: HttpRequest) -> bool:
+    """
+    Sin recomendación vigente la sección intenta generarla; si falla no cambia
+    ningún contador, así que no se sella para que la próxima visita reintente.
+    """
+    return recomendacion_vigente(request.user) is not None
+
+
+# Vista de cada sección del dashboard, con los contadores de versión de los que depende
+SECCIONES_DASHBOARD = {
+    'resumen': condicional('perfil', 'seguimientos')(_seccion_resumen),
+    'recomendacion': condicional('perfil', 'recomendaciones', reutilizable=_hay_recomendacion)(
+        _seccion_recomendacion
+    ),
+    'seguimientos': condicional('seguimientos')(_seccion_seguimientos),
+}
+
+
+@login_required
+def dashboard_seccion(request: HttpRequest, seccion: str) -> HttpResponse:
+    """
+    Una sección del dashboard como fragmento HTML (ver SECCIONES_DASHBOARD).
     
-    return render(request, 'recommender/dashboard.html', context)
+    Cada sección tiene su propio ETag: al volver al dashboard solo se
+    regeneran las secciones cuyos datos cambiaron.
+    """
+    vista = SECCIONES_DASHBOARD.get(seccion)
+    if vista is None:
+        raise Http404('Sección desconocida')
+    return vista(request)
 
 
 @login_required
@@ -452,6 +556,18 @@ def perfil(request: HttpRequest) -> HttpResponse:
     return render(request, 'recommender/perfil.html', context)
 
 
+# Historial de seguimientos: filas por página y columnas que muestra la plantilla
+SEGUIMIENTOS_POR_PAGINA = 30
+CAMPOS_SEGUIMIENTO = (
+    'id', 'fecha', 'peso_actual', 'imc_actual', 'satisfaccion',
+    'rutina_realizada__id', 'rutina_realizada__nombre',
+)
+
+# Puntos de la serie de seguimientos para gráficas
+PUNTOS_SERIE = 100
+MAX_PUNTOS_SERIE = 1000
+
+
 @login_required
 def seguimiento(request: HttpRequest) -> HttpResponse:
     """
@@ -471,27 +587,92 @@ def seguimiento(request: HttpRequest) -> HttpResponse:
     else:
         formulario = FormularioSeguimiento(usuario=usuario)
     
-    # Obtener seguimientos históricos
-    seguimientos = usuario.seguimientos.all().order_by('-fecha')
+    # Historial paginado por clave (?antes=<cursor>)
+    seguimientos = (
+        SeguimientoUsuario.objects
+        .filter(usuario=usuario)
+        .select_related('rutina_realizada')
+        .only(*CAMPOS_SEGUIMIENTO)
+    )
+    try:
+        pagina = pagina_por_clave(seguimientos, 'fecha', request.GET.get('antes'), SEGUIMIENTOS_POR_PAGINA)
+    except ValueError:
+        return redirect('recommender:seguimiento')
     
     context = {
         'formulario': formulario,
-        'seguimientos': seguimientos,
+        'seguimientos': pagina.elementos,
+        'siguiente': pagina.siguiente,
+        'es_primera_pagina': not request.GET.get('antes'),
     }
     
     return render(request, 'recommender/seguimiento.html', context)
 
 
 @login_required
+@condicional('seguimientos')
+def serie_seguimientos(request: HttpRequest) -> HttpResponse:
+    """
+    API con la evolución del peso y del IMC para gráficas.
+    
+    Parámetros GET: `puntos` (máximo por serie), `desde` y `hasta`
+    (AAAA-MM-DD, opcionales). Las series se reducen con LTTB, así que la
+    respuesta tiene el mismo tamaño para 30 seguimientos que para años de
+    registros diarios.
+    """
+    from datetime import datetime
+    
+    try:
+        puntos = min(int(request.GET.get('puntos') or PUNTOS_SERIE), MAX_PUNTOS_SERIE)
+        if puntos < 3:
+            raise ValueError('puntos debe ser al menos 3')
+        desde, hasta = (
+            datetime.strptime(request.GET[campo], '%Y-%m-%d').date() if request.GET.get(campo) else None
+            for campo in ('desde', 'hasta')
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(progreso.serie_seguimientos(request.user.pk, puntos, desde, hasta))
+
+
+# Historial: recomendaciones por página y columnas que muestra la plantilla
+RECOMENDACIONES_POR_PAGINA = 20
+CAMPOS_HISTORIAL = (
+    'id', 'fecha_recomendacion', 'vigente', 'score_confianza', 'explicacion_medica', 'precauciones',
+    'rutina_recomendada__id', 'rutina_recomendada__nombre', 'rutina_recomendada__nivel',
+    'rutina_recomendada__intensidad', 'rutina_recomendada__dias_semana',
+)
+
+
+@login_required
+@condicional('recomendaciones')
 def historial_recomendaciones(request: HttpRequest) -> HttpResponse:
     """
     Vista de historial de recomendaciones - PARADIGMA IMPERATIVO.
+    
+    Paginada por clave (?antes=<cursor>): cada página cuesta lo mismo sin
+    importar lo largo que sea el historial.
     """
     usuario = request.user
-    recomendaciones = usuario.recomendaciones.all().order_by('-fecha_recomendacion')
+    recomendaciones = (
+        RecomendacionMedica.objects
+        .filter(usuario=usuario)
+        .select_related('rutina_recomendada')
+        .only(*CAMPOS_HISTORIAL)
+    )
+    
+    try:
+        pagina = pagina_por_clave(
+            recomendaciones, 'fecha_recomendacion', request.GET.get('antes'), RECOMENDACIONES_POR_PAGINA
+        )
+    except ValueError:
+        return redirect('recommender:historial_recomendaciones')
     
     context = {
-        'recomendaciones': recomendaciones,
+        'recomendaciones': pagina.elementos,
+        'siguiente': pagina.siguiente,
+        'es_primera_pagina': not request.GET.get('antes'),
     }
     
     return render(request, 'recommender/historial_recomendaciones.html', context)
@@ -529,7 +710,8 @@ def chatbot_api(request: HttpRequest) -> HttpResponse:
         except:
             pass
         
-        # Obtener respuesta del chatbot
+        # Obtener respuesta del chatbot (el cliente de Gemini se importa en el primer uso)
+        from .chatbot import chatbot
         user_id = str(usuario.id)
         
         try:
@@ -562,7 +744,13 @@ def chatbot_api(request: HttpRequest) -> HttpResponse:
         return JsonResponse({'error': f'Error interno: {str(e)}'}, status=500)
 
 
+def _semana_en_curso(request, *args, **kwargs):
+    from datetime import datetime
+    return inicio_de_semana(datetime.now().date())
+
+
 @login_required
+@condicional('recomendaciones', 'ejercicios', extra=_semana_en_curso)
 def rutina_semanal(request: HttpRequest, rutina_id: int) -> HttpResponse:
     """
     Vista para mostrar y gestionar el seguimiento semanal de una rutina.
@@ -586,21 +774,13 @@ def rutina_semanal(request: HttpRequest, rutina_id: int) -> HttpResponse:
         return redirect('recommender:dashboard')
     
     try:
-        # Obtener o crear plan semanal
-        plan_semanal = rutina.plan_semanal or {}
-        if not plan_semanal:
-            # Si no hay plan semanal, crear uno básico desde ejercicios
-            dias = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
-            ejercicios = rutina.ejercicios if isinstance(rutina.ejercicios, list) else []
-            for i, dia in enumerate(dias[:rutina.dias_semana]):
-                plan_semanal[dia] = ejercicios if ejercicios else [f'Ejercicio {i+1}']
-            rutina.plan_semanal = plan_semanal
-            rutina.save()
+        # Plan materializado al cargar el catálogo: esta vista no escribe nada
+        plan_semanal = plan_de(rutina)
         
         # Obtener seguimientos de la semana actual
         from datetime import datetime, timedelta
         hoy = datetime.now().date()
-        inicio_semana = hoy - timedelta(days=hoy.weekday())
+        inicio_semana = inicio_de_semana(hoy)
         fin_semana = inicio_semana + timedelta(days=6)
         
         seguimientos = SeguimientoEjercicio.objects.filter(
@@ -610,17 +790,31 @@ def rutina_semanal(request: HttpRequest, rutina_id: int) -> HttpResponse:
             fecha__lte=fin_semana
         )
         
+        # Ejercicios completados de la semana, agrupados por día
+        completados_por_dia = {}
+        for dia, ejercicio in EjercicioCompletado.objects.filter(
+            usuario=usuario,
+            rutina=rutina,
+            fecha__gte=inicio_semana,
+            fecha__lte=fin_semana
+        ).values_list('dia_semana', 'ejercicio'):
+            completados_por_dia.setdefault(dia, []).append(ejercicio)
+        
         # Convertir seguimientos a diccionario por día
         seguimientos_dict = {}
         for seg in seguimientos:
+            seg.completados = completados_por_dia.get(seg.dia_semana, [])
             seguimientos_dict[seg.dia_semana] = seg
         
-        # Calcular progreso semanal
-        total_ejercicios_semana = sum(len(ejercicios) if isinstance(ejercicios, list) else 0 for ejercicios in plan_semanal.values())
-        ejercicios_completados_semana = sum(
-            len(seg.ejercicios_completados) if seg.ejercicios_completados else 0 for seg in seguimientos
-        )
-        progreso_semanal = round((ejercicios_completados_semana / total_ejercicios_semana * 100), 2) if total_ejercicios_semana > 0 else 0
+        # Progreso semanal: una fila de contadores
+        semana = ProgresoSemanal.objects.filter(
+            usuario=usuario,
+            rutina=rutina,
+            inicio_semana=inicio_semana
+        ).first()
+        total_ejercicios_semana = semana.num_totales if semana else total_ejercicios_plan(plan_semanal)
+        ejercicios_completados_semana = semana.num_completados if semana else 0
+        progreso_semanal = semana.calcular_progreso() if semana else 0
         
         context = {
             'rutina': rutina,
@@ -663,66 +857,22 @@ def marcar_ejercicio(request: HttpRequest) -> HttpResponse:
         usuario = request.user
         rutina = Rutina.objects.get(id=rutina_id, activa=True)
         
-        # Obtener plan semanal
-        plan_semanal = rutina.plan_semanal or {}
-        ejercicios_dia = plan_semanal.get(dia_semana, [])
-        
-        # Obtener o crear seguimiento
         from datetime import datetime
         fecha_obj = datetime.strptime(fecha, '%Y-%m-%d').date()
         
-        seguimiento, created = SeguimientoEjercicio.objects.get_or_create(
-            usuario=usuario,
-            rutina=rutina,
-            fecha=fecha_obj,
-            dia_semana=dia_semana,
-            defaults={
-                'ejercicios_totales': ejercicios_dia,
-                'ejercicios_completados': []
-            }
-        )
-        
-        # Agregar o quitar ejercicio
-        if ejercicio in seguimiento.ejercicios_completados:
-            seguimiento.ejercicios_completados.remove(ejercicio)
-        else:
-            if ejercicio not in seguimiento.ejercicios_completados:
-                seguimiento.ejercicios_completados.append(ejercicio)
-        
-        # Verificar si el día está completo
-        seguimiento.completado = len(seguimiento.ejercicios_completados) == len(seguimiento.ejercicios_totales)
-        seguimiento.save()
-        
-        progreso_dia = seguimiento.calcular_progreso_dia()
-        
-        # Calcular progreso semanal
-        from datetime import timedelta
-        hoy = datetime.now().date()
-        inicio_semana = hoy - timedelta(days=hoy.weekday())
-        fin_semana = inicio_semana + timedelta(days=6)
-        
-        seguimientos_semana = SeguimientoEjercicio.objects.filter(
-            usuario=usuario,
-            rutina=rutina,
-            fecha__gte=inicio_semana,
-            fecha__lte=fin_semana
-        )
-        
-        total_ejercicios_semana = sum(len(ejercicios) for ejercicios in plan_semanal.values())
-        ejercicios_completados_semana = sum(
-            len(seg.ejercicios_completados) for seg in seguimientos_semana
-        )
-        progreso_semanal = round((ejercicios_completados_semana / total_ejercicios_semana * 100), 2) if total_ejercicios_semana > 0 else 0
+        # Un INSERT o DELETE del ejercicio y la actualización de los contadores
+        registrar_ejercicio(usuario, rutina, fecha_obj, dia_semana, ejercicio)
+        progreso = progreso_ejercicios(usuario, rutina, fecha_obj, dia_semana)
         
         return JsonResponse({
             'success': True,
-            'progreso_dia': progreso_dia,
-            'progreso_semanal': progreso_semanal,
-            'ejercicios_completados': len(seguimiento.ejercicios_completados),
-            'ejercicios_totales': len(seguimiento.ejercicios_totales),
-            'completado': seguimiento.completado,
-            'ejercicios_completados_semana': ejercicios_completados_semana,
-            'total_ejercicios_semana': total_ejercicios_semana
+            'progreso_dia': progreso.progreso_dia,
+            'progreso_semanal': progreso.progreso_semanal,
+            'ejercicios_completados': progreso.completados_dia,
+            'ejercicios_totales': progreso.totales_dia,
+            'completado': progreso.completado,
+            'ejercicios_completados_semana': progreso.completados_semana,
+            'total_ejercicios_semana': progreso.totales_semana
         })
         
     except Exception as e:
@@ -730,3 +880,98 @@ def marcar_ejercicio(request: HttpRequest) -> HttpResponse:
         logger = logging.getLogger(__name__)
         logger.error(f"Error en marcar_ejercicio: {str(e)}", exc_info=True)
         return JsonResponse({'error': str(e)}, status=500)
+
+
+# Operaciones máximas por lote de sincronización
+MAX_OPERACIONES_LOTE = 200
+
+
+def _leer_operacion(datos) -> OperacionEjercicio:
+    """Valida una operación del lote; lanza ValueError si no es válida."""
+    from datetime import datetime
+
+    if not isinstance(datos, dict):
+        raise ValueError('Operación no válida')
+    rutina_id = datos.get('rutina_id')
+    dia_semana = datos.get('dia_semana')
+    ejercicio = datos.get('ejercicio')
+    completado = datos.get('completado')
+    marca = datos.get('marca')
+    if not all([rutina_id, dia_semana, ejercicio, datos.get('fecha')]) or not isinstance(completado, bool):
+        raise ValueError('Datos incompletos')
+    if not isinstance(rutina_id, int) or (marca is not None and not isinstance(marca, int)):
+        raise ValueError('rutina_id y marca deben ser enteros')
+    return OperacionEjercicio(
+        rutina_id=rutina_id,
+        fecha=datetime.strptime(datos['fecha'], '%Y-%m-%d').date(),
+        dia_semana=str(dia_semana),
+        ejercicio=str(ejercicio)[:200],
+        completado=completado,
+        marca=marca,
+    )
+
+
+@login_required
+def marcar_ejercicios_lote(request: HttpRequest) -> HttpResponse:
+    """
+    API endpoint para sincronizar en un solo POST los ejercicios marcados sin conexión.
+
+    Recibe {"operaciones": [{rutina_id, fecha, dia_semana, ejercicio,
+    completado, marca}]}, donde `completado` es el estado final (no una
+    alternancia) y `marca` el momento del toque en el cliente (ms desde epoch).
+    Reenviar el mismo lote no cambia nada. Devuelve el progreso de cada día
+    afectado una sola vez.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        operaciones = data.get('operaciones') if isinstance(data, dict) else None
+        if not isinstance(operaciones, list) or not operaciones:
+            return JsonResponse({'error': 'Datos incompletos'}, status=400)
+        if len(operaciones) > MAX_OPERACIONES_LOTE:
+            return JsonResponse(
+                {'error': f'Máximo {MAX_OPERACIONES_LOTE} operaciones por lote'}, status=400
+            )
+        operaciones = list(map(_leer_operacion, operaciones))
+    except (ValueError, TypeError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        usuario = request.user
+        rutinas = Rutina.objects.in_bulk({operacion.rutina_id for operacion in operaciones})
+        rutinas = {pk: rutina for pk, rutina in rutinas.items() if rutina.activa}
+        if len(rutinas) != len({operacion.rutina_id for operacion in operaciones}):
+            return JsonResponse({'error': 'Rutina no encontrada'}, status=404)
+
+        aplicadas, dias = registrar_lote(usuario, operaciones, rutinas)
+
+        progreso = []
+        for rutina_id, fecha, dia_semana in sorted(dias):
+            resultado = progreso_ejercicios(usuario, rutinas[rutina_id], fecha, dia_semana)
+            progreso.append({
+                'rutina_id': rutina_id,
+                'fecha': fecha.isoformat(),
+                'dia_semana': dia_semana,
+                'progreso_dia': resultado.progreso_dia,
+                'progreso_semanal': resultado.progreso_semanal,
+                'ejercicios_completados': resultado.completados_dia,
+                'ejercicios_totales': resultado.totales_dia,
+                'completado': resultado.completado,
+                'ejercicios_completados_semana': resultado.completados_semana,
+                'total_ejercicios_semana': resultado.totales_semana
+            })
+
+        return JsonResponse({
+            'success': True,
+            'aplicadas': aplicadas,
+            'recibidas': len(operaciones),
+            'progreso': progreso
+        })
+
+    except Exception as e:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.error(f"Error en marcar_ejercicios_lote: {str(e)}", exc_info=True)
+        return JsonResponse({'error': str(e)}, status=500)